@@ -0,0 +1,176 @@
+"""Archivo de datos fríos en una base SQLite adjunta.
+
+Los animales inactivos desde hace tiempo (con sus tratamientos e historial de
+estados) y los conteos antiguos (con sus alertas ya resueltas y animales
+faltantes) se mueven a `<base>_archivo.db`, que cada conexión adjunta como
+esquema `archivo`. Así las tablas calientes sólo guardan filas vivas y caben
+en la caché de páginas.
+
+Cada conexión crea además vistas temporales `<tabla>_historico` que unen la
+tabla caliente con la archivada (columna extra `archivado`); las usan las
+exportaciones, el historial médico, los reportes y las reconstrucciones.
+
+Con la base principal en WAL, SQLite no garantiza que un commit que toca dos
+archivos sea atómico entre ambos. Por eso el traslado se hace en dos
+transacciones: primero se copian las filas al archivo y después se borran de
+la base principal sólo las que ya están archivadas. Si el proceso se
+interrumpe entre ambas, quedan duplicadas (las vistas las muestran una vez) y
+la siguiente ejecución termina el trabajo. La copia nunca pisa filas
+archivadas: si el archivo ya tiene otra fila con la misma clave, falla.
+
+    flask archivar [--programar]
+"""
+import os
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import IntegrityError
+
+ESQUEMA = 'archivo'
+
+TablaArchivable = namedtuple('TablaArchivable', 'nombre columnas clave indices')
+Resultado = namedtuple('Resultado', 'animales conteos filas')
+
+
+def tabla_archivable(tabla):
+    """Describe una Table de SQLAlchemy: columnas con su tipo SQL, clave primaria e índices."""
+    dialecto = sqlite.dialect()
+    return TablaArchivable(
+        tabla.name,
+        tuple((columna.name, columna.type.compile(dialect=dialecto)) for columna in tabla.columns),
+        tuple(columna.name for columna in tabla.primary_key.columns),
+        tuple((indice.name, tuple(columna.name for columna in indice.columns)) for indice in tabla.indexes),
+    )
+
+
+def ruta_archivo(ruta_principal):
+    raiz, extension = os.path.splitext(ruta_principal)
+    return f'{raiz}_archivo{extension or ".db"}'
+
+
+def _ruta_principal(cursor):
+    for _, nombre, ruta in cursor.execute('PRAGMA database_list').fetchall():
+        if nombre == 'main':
+            return ruta
+    return ''
+
+
+def _sincronizar_esquema(cursor, tablas):
+    for tabla in tablas:
+        columnas = ', '.join(f'"{nombre}" {tipo}' for nombre, tipo in tabla.columnas)
+        clave = ', '.join(tabla.clave)
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {ESQUEMA}."{tabla.nombre}" ({columnas}, PRIMARY KEY ({clave}))')
+        # Columnas agregadas a la tabla caliente por migraciones posteriores.
+        existentes = {fila[1] for fila in cursor.execute(f'PRAGMA {ESQUEMA}.table_info("{tabla.nombre}")')}
+        for nombre, tipo in tabla.columnas:
+            if nombre not in existentes:
+                cursor.execute(f'ALTER TABLE {ESQUEMA}."{tabla.nombre}" ADD COLUMN "{nombre}" {tipo}')
+        for indice, columnas_indice in tabla.indices:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {ESQUEMA}."{indice}" ON "{tabla.nombre}" ({", ".join(columnas_indice)})')
+
+
+def crear_vistas(cursor, tablas, adjunto):
+    for tabla in tablas:
+        columnas = ', '.join(f'"{nombre}"' for nombre, _ in tabla.columnas)
+        sentencia = f'SELECT {columnas}, 0 AS archivado FROM main."{tabla.nombre}"'
+        if adjunto:
+            # Una fila copiada pero aún no borrada de la tabla caliente se muestra una sola vez.
+            duplicada = ' AND '.join(f'm."{columna}" = a."{columna}"' for columna in tabla.clave)
+            sentencia += (
+                f' UNION ALL SELECT {columnas}, 1 FROM {ESQUEMA}."{tabla.nombre}" a'
+                f' WHERE NOT EXISTS (SELECT 1 FROM main."{tabla.nombre}" m WHERE {duplicada})'
+            )
+        cursor.execute(f'DROP VIEW IF EXISTS temp."{tabla.nombre}_historico"')
+        cursor.execute(f'CREATE TEMP VIEW "{tabla.nombre}_historico" AS {sentencia}')
+
+
+def preparar_conexion(conexion_dbapi, tablas, ruta=None):
+    """Adjunta el archivo y crea las vistas `<tabla>_historico` en una conexión sqlite3 nueva.
+
+    Sin `ruta` se usa `<base>_archivo.db` junto a la base principal; una base
+    en memoria no tiene archivo y sus vistas sólo leen las tablas calientes.
+    """
+    cursor = conexion_dbapi.cursor()
+    try:
+        principal = _ruta_principal(cursor)
+        ruta = ruta or (ruta_archivo(principal) if principal else None)
+        if ruta:
+            cursor.execute(f'ATTACH DATABASE ? AS {ESQUEMA}', (ruta,))
+            cursor.execute(f'PRAGMA {ESQUEMA}.journal_mode = WAL')
+            _sincronizar_esquema(cursor, tablas)
+        crear_vistas(cursor, tablas, adjunto=bool(ruta))
+    finally:
+        cursor.close()
+
+
+def esta_adjunto(conexion):
+    return any(fila[1] == ESQUEMA for fila in conexion.exec_driver_sql('PRAGMA database_list'))
+
+
+# Filas a mover por tabla, en función de los animales y conteos elegidos.
+_FILTROS = {
+    'animal': 'id IN (SELECT id FROM temp.archivar_animal)',
+    'tratamiento': 'animal_id IN (SELECT id FROM temp.archivar_animal)',
+    'historial_estado_animal': 'animal_id IN (SELECT id FROM temp.archivar_animal)',
+    'conteo': 'id IN (SELECT id FROM temp.archivar_conteo)',
+    'alerta': 'conteo_id IN (SELECT id FROM temp.archivar_conteo)',
+    'animal_faltante': 'conteo_id IN (SELECT id FROM temp.archivar_conteo)',
+}
+
+
+def archivar(engine, tablas, ahora, dias_inactivo, dias_conteos, al_borrar=None):
+    """Mueve al archivo los animales inactivos desde hace `dias_inactivo` días y los
+    conteos de más de `dias_conteos` días sin alertas pendientes.
+
+    `al_borrar(conexion, nombres)` se llama en la transacción del borrado con las
+    tablas principales que perdieron filas.
+    """
+    corte_animales = (ahora - timedelta(days=dias_inactivo)).strftime('%Y-%m-%d %H:%M:%S.%f')
+    corte_conteos = (ahora - timedelta(days=dias_conteos)).strftime('%Y-%m-%d %H:%M:%S.%f')
+    filas = {}
+    with engine.connect() as conexion:
+        with conexion.begin():
+            if not esta_adjunto(conexion):
+                raise RuntimeError('La base principal está en memoria: no hay archivo adjunto.')
+            conexion.exec_driver_sql('DROP TABLE IF EXISTS temp.archivar_animal')
+            conexion.exec_driver_sql('DROP TABLE IF EXISTS temp.archivar_conteo')
+            # Inactivo sin cambios de estado desde el corte.
+            conexion.exec_driver_sql(
+                "CREATE TEMP TABLE archivar_animal AS SELECT id FROM main.animal WHERE estado = 'Inactivo' "
+                'AND NOT EXISTS (SELECT 1 FROM main.historial_estado_animal h WHERE h.animal_id = animal.id AND h.valido_desde > ?)',
+                (corte_animales,),
+            )
+            conexion.exec_driver_sql(
+                'CREATE TEMP TABLE archivar_conteo AS SELECT id FROM main.conteo WHERE fecha_hora < ? '
+                'AND NOT EXISTS (SELECT 1 FROM main.alerta WHERE alerta.conteo_id = conteo.id AND NOT alerta.resuelta)',
+                (corte_conteos,),
+            )
+            for tabla in tablas:
+                columnas = ', '.join(f'"{nombre}"' for nombre, _ in tabla.columnas)
+                # Las filas idénticas ya archivadas (traslado interrumpido) se saltan;
+                # una fila distinta con la misma clave es un conflicto y aborta la copia.
+                iguales = ' AND '.join(f'a."{nombre}" IS m."{nombre}"' for nombre, _ in tabla.columnas)
+                try:
+                    conexion.exec_driver_sql(
+                        f'INSERT INTO {ESQUEMA}."{tabla.nombre}" ({columnas}) '
+                        f'SELECT {columnas} FROM main."{tabla.nombre}" AS m WHERE {_FILTROS[tabla.nombre]} '
+                        f'AND NOT EXISTS (SELECT 1 FROM {ESQUEMA}."{tabla.nombre}" AS a WHERE {iguales})'
+                    )
+                except IntegrityError as error:
+                    raise RuntimeError(
+                        f'El archivo ya tiene otra fila de {tabla.nombre} con la misma clave; no se archivó nada.'
+                    ) from error
+        with conexion.begin():
+            for tabla in reversed(tablas):
+                clave = ', '.join(tabla.clave)
+                filas[tabla.nombre] = conexion.exec_driver_sql(
+                    f'DELETE FROM main."{tabla.nombre}" WHERE {_FILTROS[tabla.nombre]} '
+                    f'AND ({clave}) IN (SELECT {clave} FROM {ESQUEMA}."{tabla.nombre}")'
+                ).rowcount
+            conexion.exec_driver_sql('DROP TABLE temp.archivar_animal')
+            conexion.exec_driver_sql('DROP TABLE temp.archivar_conteo')
+            modificadas = sorted(nombre for nombre, cantidad in filas.items() if cantidad)
+            if al_borrar and modificadas:
+                al_borrar(conexion, modificadas)
+    return Resultado(filas.get('animal', 0), filas.get('conteo', 0), filas)
@@ -0,0 +1,380 @@
+"""Benchmark de rutas sobre una base sintética de gran tamaño.
+
+Genera (una sola vez) una base SQLite con el volumen indicado, recorre las
+rutas de la aplicación con el cliente de pruebas de Flask en varios niveles de
+concurrencia y reporta por ruta la latencia p50/p95/p99, el throughput, las
+consultas SQL por petición y el pico de memoria (RSS) del proceso. Con
+--linea-base compara contra un resultado anterior y termina con código 1 si
+alguna ruta empeoró más allá de la tolerancia, para usarlo como control de
+regresiones.
+
+    python benchmark.py --animales 100000 --conteos 1000000 --tratamientos 200000 \\
+        --alertas 5000 --concurrencia 1,8 --guardar benchmark_base.json
+    python benchmark.py --linea-base benchmark_base.json
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+TIPOS = ('Vaca', 'Cerdo', 'Chivo', 'Cordero', 'Pollo')
+TAMANO_LOTE_SEMILLA = 50000
+CUIDADORES = 20
+
+
+def _fecha(valor):
+    return valor.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _en_lotes(conexion, sentencia, filas):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= TAMANO_LOTE_SEMILLA:
+            conexion.executemany(sentencia, lote)
+            lote = []
+    if lote:
+        conexion.executemany(sentencia, lote)
+
+
+def sembrar(ruta, animales, conteos, tratamientos, alertas, abiertas, semilla=1):
+    """Llena las tablas principales con datos sintéticos, sin pasar por el ORM."""
+    azar = random.Random(semilla)
+    ahora = datetime.utcnow()
+    conexion = sqlite3.connect(ruta)
+    conexion.execute('PRAGMA journal_mode = WAL')
+    conexion.execute('PRAGMA synchronous = OFF')
+    from werkzeug.security import generate_password_hash
+    clave = generate_password_hash('benchmark')
+    conexion.executemany('INSERT INTO user (id, username, password_hash, rol) VALUES (?, ?, ?, ?)',
+                         [(1, 'admin', clave, 'Administrador')] +
+                         [(id_, f'cuidador{id_ - 1}', clave, 'Cuidador') for id_ in range(2, CUIDADORES + 2)])
+    correlativos = dict.fromkeys(TIPOS, 0)
+
+    def filas_animales():
+        for id_ in range(1, animales + 1):
+            tipo = TIPOS[id_ % len(TIPOS)]
+            correlativos[tipo] += 1
+            estado = 'En rebaño' if azar.random() < 0.9 else azar.choice(('En cuarentena', 'Vendido', 'Inactivo'))
+            yield id_, f'{tipo[:3].upper()}-{correlativos[tipo]:03d}', tipo, f'Animal {id_}', estado
+    _en_lotes(conexion, 'INSERT INTO animal (id, codigo_unico, tipo, nombre, estado) VALUES (?, ?, ?, ?, ?)', filas_animales())
+
+    # Conteos repartidos en los últimos dos años, en orden cronológico.
+    intervalo = timedelta(days=730) / max(conteos, 1)
+    inicio = ahora - timedelta(days=730)
+    _en_lotes(conexion, 'INSERT INTO conteo (id, fecha_hora, animales_esperados, animales_contados, user_id) VALUES (?, ?, ?, ?, ?)',
+              ((id_, _fecha(inicio + intervalo * id_), animales, animales, azar.randint(2, CUIDADORES + 1)) for id_ in range(1, conteos + 1)))
+
+    ids_conteo = azar.sample(range(1, conteos + 1), min(alertas, conteos))
+
+    def filas_alertas():
+        for numero, conteo_id in enumerate(ids_conteo):
+            faltantes = azar.sample(range(1, animales + 1), min(3, animales))
+            resuelta = numero >= abiertas
+            yield conteo_id, faltantes, resuelta
+    filas = list(filas_alertas())
+    _en_lotes(conexion, 'INSERT INTO alerta (mensaje, resuelta, resuelta_en, conteo_id) '
+                        "VALUES (?, ?, CASE WHEN ? THEN (SELECT datetime(fecha_hora, '+2 hours') FROM conteo WHERE id = ?) END, ?)",
+              ((f'Discrepancia en conteo. Faltan {len(faltantes)} animales: ' + ', '.join(f'#{id_}' for id_ in faltantes),
+                resuelta, resuelta, conteo_id, conteo_id) for conteo_id, faltantes, resuelta in filas))
+    _en_lotes(conexion, 'INSERT OR IGNORE INTO animal_faltante (conteo_id, animal_id, fecha) '
+                        'SELECT ?, ?, date(fecha_hora) FROM conteo WHERE id = ?',
+              ((conteo_id, animal_id, conteo_id) for conteo_id, faltantes, _ in filas for animal_id in faltantes))
+    conexion.execute('UPDATE conteo SET animales_contados = animales_esperados - '
+                     '(SELECT COUNT(*) FROM animal_faltante WHERE conteo_id = conteo.id) '
+                     'WHERE id IN (SELECT conteo_id FROM alerta)')
+
+    _en_lotes(conexion, 'INSERT INTO tratamiento (nombre_tratamiento, descripcion, fecha_aplicacion, animal_id) VALUES (?, ?, ?, ?)',
+              ((azar.choice(('Vacuna aftosa', 'Desparasitación', 'Vitaminas', 'Antibiótico')), 'Generado para benchmark',
+                (inicio + timedelta(days=azar.randint(0, 730))).date().isoformat(), azar.randint(1, animales))
+               for _ in range(tratamientos)))
+
+    conexion.executemany('INSERT INTO corral (nombre, capacidad, tipo_corral) VALUES (?, ?, ?)',
+                         [(f'Corral {n}', 200, 'Engorda') for n in range(1, 51)])
+    conexion.executemany('INSERT INTO potrero (nombre, area_hectareas, estado_pasto, ultimo_uso) VALUES (?, ?, ?, ?)',
+                         [(f'Potrero {n}', 10.0 + n, 'Bueno', ahora.date().isoformat()) for n in range(1, 101)])
+    conexion.executemany('INSERT INTO proveedor (nombre, contacto, telefono, direccion) VALUES (?, ?, ?, ?)',
+                         [(f'Proveedor {n}', 'Contacto', '555-0000', 'Camino rural') for n in range(1, 51)])
+    conexion.executemany('INSERT INTO alimento (nombre, descripcion, stock_kg) VALUES (?, ?, ?)',
+                         [(f'Alimento {n}', None, 1000.0) for n in range(1, 101)])
+    conexion.executemany('INSERT INTO equipamiento (nombre, estado, fecha_adquisicion, proximo_mantenimiento) VALUES (?, ?, ?, ?)',
+                         [(f'Equipo {n}', 'Operativo', ahora.date().isoformat(), ahora.date().isoformat()) for n in range(1, 101)])
+    conexion.commit()
+    conexion.close()
+
+
+def preparar_base(ruta, args):
+    existe = os.path.exists(ruta)
+    if existe and args.resembrar:
+        for sufijo in ('', '-wal', '-shm'):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+        existe = False
+    os.environ['GANADERIA_DATABASE_URI'] = f'sqlite:///{ruta}'
+    if args.sin_cache:
+        os.environ['CACHE_BACKEND'] = 'nulo'
+    # La aplicación se crea recién aquí para que tome la base del benchmark.
+    from app import crear_app
+    from extensiones import db
+    from migraciones import aplicar_migraciones
+    import resumenes
+    aplicacion = crear_app()
+    with aplicacion.app_context():
+        db.create_all()
+        if not existe:
+            inicio = time.perf_counter()
+            print(f'Generando base sintética en {ruta}...', file=sys.stderr)
+            sembrar(ruta, args.animales, args.conteos, args.tratamientos, args.alertas, args.abiertas)
+            with db.engine.begin() as conexion:
+                resumenes.reconstruir(conexion)
+            print(f'Base generada en {time.perf_counter() - inicio:.1f} s.', file=sys.stderr)
+        aplicar_migraciones(db.engine)
+    return aplicacion
+
+
+# `url` y `datos` reciben el número de petición `i`, para que las rutas de
+# escritura no repitan siempre el mismo registro. `maximo` acota las
+# peticiones de las rutas costosas (exportaciones completas, conteos del
+# rebaño entero).
+Ruta = namedtuple('Ruta', 'nombre rol metodo url datos maximo json', defaults=(None, None, False))
+
+
+def rutas_benchmark(ctx):
+    return [Ruta(*ruta) for ruta in (
+        ('index', None, 'GET', lambda i: '/', None, None),
+        ('login', None, 'GET', lambda i: '/login', None, None),
+        ('dashboard_admin', 'Administrador', 'GET', lambda i: '/dashboard_admin', None, None),
+        ('dashboard_cuidador', 'Cuidador', 'GET', lambda i: '/dashboard_cuidador', None, None),
+        ('gestionar_animales', 'Administrador', 'GET', lambda i: '/gestionar_animales', None, None),
+        ('gestionar_animales?tipo', 'Administrador', 'GET', lambda i: '/gestionar_animales?tipo=Vaca&orden=codigo', None, None),
+        ('edit_animal', 'Administrador', 'GET', lambda i: f"/animal/edit/{ctx['animal']}", None, None),
+        ('historial_medico', 'Administrador', 'GET', lambda i: f"/animal/{ctx['animal_tratado']}/historial", None, None),
+        ('iniciar_conteo', 'Cuidador', 'GET', lambda i: '/iniciar_conteo', None, 5),
+        ('guardar_conteo', 'Cuidador', 'POST', lambda i: '/guardar_conteo',
+         lambda i: {'animales_presentes': ctx['presentes']}, 5),
+        ('abrir_sesion_conteo', 'Cuidador', 'POST', lambda i: '/conteo/sesion', lambda i: {}, 20, True),
+        ('ver_sesion_conteo', 'Cuidador', 'GET', lambda i: f"/conteo/sesion/{ctx['sesion']}", None, None),
+        ('registrar_lote_escaneo', 'Cuidador', 'POST', lambda i: f"/conteo/sesion/{ctx['sesion']}/lote",
+         lambda i: {'numero': next(ctx['lotes']), 'ids': random.sample(ctx['ids_rebano'], min(200, len(ctx['ids_rebano'])))}, None, True),
+        ('sincronizar', 'Cuidador', 'POST', lambda i: '/api/v1/sincronizar', lambda i: {
+            'conteos': [{'clave': f"{ctx['lote_sincronizacion']}-{i}-c", 'registrado_en': datetime.utcnow().isoformat(), 'presentes': ctx['ids_rebano'][5:]}],
+            'tratamientos': [{'clave': f"{ctx['lote_sincronizacion']}-{i}-t{n}", 'animal_id': id_, 'nombre_tratamiento': 'Vacuna aftosa',
+                              'fecha_aplicacion': ctx['hace_un_mes']} for n, id_ in enumerate(ctx['ids_rebano'][:200])],
+        }, 5, True),
+        ('ver_reportes', 'Administrador', 'GET', lambda i: '/ver_reportes', None, None),
+        ('ver_reportes?desde', 'Administrador', 'GET', lambda i: f"/ver_reportes?desde={ctx['hace_un_mes']}", None, None),
+        ('gestionar_alertas', 'Administrador', 'GET', lambda i: '/gestionar_alertas', None, None),
+        ('gestionar_alertas?resuelta', 'Administrador', 'GET', lambda i: '/gestionar_alertas?resuelta=1', None, None),
+        ('resolver_alerta', 'Administrador', 'GET', lambda i: f"/alerta/resolver/{ctx['alertas_abiertas'][i % len(ctx['alertas_abiertas'])]}", None, None),
+        ('buscar_animales', 'Administrador', 'GET', lambda i: '/buscar?q=vac 1', None, None),
+        ('buscar_tratamientos', 'Administrador', 'GET', lambda i: '/buscar?q=vacuna&en=tratamientos', None, None),
+        ('ver_tendencias', 'Administrador', 'GET', lambda i: '/reportes/tendencias', None, None),
+        ('exportar_conteos', 'Administrador', 'GET', lambda i: '/exportar/conteos.csv', None, 2),
+        ('exportar_alertas', 'Administrador', 'GET', lambda i: '/exportar/alertas.ndjson', None, 5),
+        ('exportar_tratamientos', 'Administrador', 'GET', lambda i: f"/exportar/tratamientos.csv?animal_id={ctx['animal_tratado']}", None, None),
+        ('gestionar_usuarios', 'Administrador', 'GET', lambda i: '/gestionar_usuarios', None, None),
+        ('gestionar_corrales', 'Administrador', 'GET', lambda i: '/gestionar_corrales', None, None),
+        ('gestionar_proveedores', 'Administrador', 'GET', lambda i: '/gestionar_proveedores', None, None),
+        ('gestionar_alimentos', 'Administrador', 'GET', lambda i: '/gestionar_alimentos', None, None),
+        ('gestionar_potreros', 'Administrador', 'GET', lambda i: '/gestionar_potreros', None, None),
+        ('gestionar_equipamiento', 'Administrador', 'GET', lambda i: '/gestionar_equipamiento', None, None),
+        ('gestionar_trabajos', 'Administrador', 'GET', lambda i: '/trabajos', None, None),
+        ('api_animales', 'Administrador', 'GET', lambda i: '/api/v1/animales?estado=En%20rebaño', None, None),
+        ('api_conteos', 'Administrador', 'GET', lambda i: '/api/v1/conteos', None, None),
+        ('api_animal', 'Administrador', 'GET', lambda i: f"/api/v1/animales/{ctx['animal']}", None, None),
+    )]
+
+
+def contexto_rutas(aplicacion):
+    from sqlalchemy import select
+    from extensiones import db
+    from modelos import Alerta, Animal, Tratamiento
+    with aplicacion.app_context():
+        sesion = db.session
+        ids_rebano = sesion.scalars(select(Animal.id).filter_by(estado='En rebaño')).all()
+        abiertas = sesion.scalars(select(Alerta.id).filter_by(resuelta=False).order_by(Alerta.id)).all()
+        tratado = sesion.scalar(select(Tratamiento.animal_id).limit(1))
+    cliente = aplicacion.test_client()
+    iniciar_sesion(cliente, 2, 'Cuidador')
+    sesion_conteo = cliente.post('/conteo/sesion', json={}).get_json()['sesion_id']
+    return {
+        'animal': ids_rebano[0] if ids_rebano else 1,
+        'animal_tratado': tratado or 1,
+        'ids_rebano': ids_rebano,
+        # Un conteo realista: todo el rebaño menos unos pocos animales.
+        'presentes': [str(id_) for id_ in ids_rebano[5:]],
+        'alertas_abiertas': abiertas or [1],
+        'sesion': sesion_conteo,
+        'lotes': itertools.count(1),
+        'hace_un_mes': (datetime.utcnow() - timedelta(days=30)).date().isoformat(),
+        # Prefijo de las claves de sincronización, distinto en cada ejecución sobre la misma base.
+        'lote_sincronizacion': f'benchmark-{time.time_ns()}',
+    }
+
+
+def iniciar_sesion(cliente, user_id, rol):
+    with cliente.session_transaction() as datos:
+        datos['user_id'] = user_id
+        datos['username'] = 'benchmark'
+        datos['user_rol'] = rol
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def en_ms(segundos):
+    # Sin muestras (p. ej. todas las peticiones fallaron antes de medirse) no hay percentil.
+    return round(segundos * 1000, 2) if segundos is not None else None
+
+
+def medir_ruta(aplicacion, ruta, concurrencia, repeticiones):
+    total = min(repeticiones, ruta.maximo) if ruta.maximo else repeticiones
+    contador = itertools.count()
+    latencias, consultas, errores = [], [], []
+    candado = threading.Lock()
+
+    def trabajar():
+        cliente = aplicacion.test_client()
+        if ruta.rol:
+            iniciar_sesion(cliente, 1 if ruta.rol == 'Administrador' else 2, ruta.rol)
+        while True:
+            i = next(contador)
+            if i >= total:
+                return
+            url = ruta.url(i)
+            cuerpo = ruta.datos(i) if ruta.datos else None
+            inicio = time.perf_counter()
+            if ruta.metodo == 'GET':
+                respuesta = cliente.get(url)
+            elif ruta.json:
+                respuesta = cliente.post(url, json=cuerpo)
+            else:
+                respuesta = cliente.post(url, data=cuerpo)
+            respuesta.get_data()
+            transcurrido = time.perf_counter() - inicio
+            with candado:
+                latencias.append(transcurrido)
+                if 'X-Consultas-SQL' in respuesta.headers:
+                    consultas.append(int(respuesta.headers['X-Consultas-SQL']))
+                if respuesta.status_code >= 400:
+                    errores.append(respuesta.status_code)
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=trabajar) for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+    return {
+        'ruta': ruta.nombre,
+        'concurrencia': concurrencia,
+        'peticiones': len(latencias),
+        'errores': len(errores),
+        'p50_ms': en_ms(percentil(latencias, 50)),
+        'p95_ms': en_ms(percentil(latencias, 95)),
+        'p99_ms': en_ms(percentil(latencias, 99)),
+        'throughput_rps': round(len(latencias) / duracion, 2) if duracion else None,
+        'consultas_sql': max(consultas) if consultas else None,
+        # ru_maxrss es el máximo del proceso (KB en Linux): crece con la ruta que más memoria pidió.
+        'rss_pico_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def comparar(resultados, linea_base, tolerancia):
+    anteriores = {(fila['ruta'], fila['concurrencia']): fila for fila in linea_base['resultados']}
+    regresiones = []
+    for fila in resultados:
+        anterior = anteriores.get((fila['ruta'], fila['concurrencia']))
+        if anterior is None:
+            continue
+        if fila['p95_ms'] is not None and anterior['p95_ms'] is not None and fila['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            regresiones.append(f"{fila['ruta']} (c={fila['concurrencia']}): p95 {anterior['p95_ms']} -> {fila['p95_ms']} ms")
+        if fila['consultas_sql'] is not None and anterior['consultas_sql'] is not None and fila['consultas_sql'] > anterior['consultas_sql']:
+            regresiones.append(f"{fila['ruta']} (c={fila['concurrencia']}): consultas SQL {anterior['consultas_sql']} -> {fila['consultas_sql']}")
+        if fila['errores'] > anterior['errores']:
+            regresiones.append(f"{fila['ruta']} (c={fila['concurrencia']}): errores {anterior['errores']} -> {fila['errores']}")
+    return regresiones
+
+
+def imprimir(resultados):
+    encabezado = f"{'ruta':32} {'c':>3} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>8} {'sql':>4} {'rss MB':>8}"
+    print(encabezado)
+    print('-' * len(encabezado))
+    for fila in resultados:
+        celda = {clave: '-' if valor is None else valor for clave, valor in fila.items()}
+        print(f"{celda['ruta']:32} {celda['concurrencia']:>3} {celda['peticiones']:>5} {celda['errores']:>4} "
+              f"{celda['p50_ms']:>9} {celda['p95_ms']:>9} {celda['p99_ms']:>9} {celda['throughput_rps']:>8} "
+              f"{celda['consultas_sql']:>4} {celda['rss_pico_mb']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'benchmark.db'),
+                        help='Archivo SQLite del benchmark (se genera si no existe).')
+    parser.add_argument('--resembrar', action='store_true', help='Regenera la base aunque exista.')
+    parser.add_argument('--animales', type=int, default=100000)
+    parser.add_argument('--conteos', type=int, default=1000000)
+    parser.add_argument('--tratamientos', type=int, default=200000)
+    parser.add_argument('--alertas', type=int, default=5000)
+    parser.add_argument('--abiertas', type=int, default=3000, help='Cuántas de las alertas quedan sin resolver.')
+    parser.add_argument('--concurrencia', default='1,4', help='Niveles de concurrencia separados por comas.')
+    parser.add_argument('--repeticiones', type=int, default=50, help='Peticiones por ruta y nivel de concurrencia.')
+    parser.add_argument('--rutas', default='', help='Sólo las rutas cuyo nombre contenga alguno de estos textos (separados por comas).')
+    parser.add_argument('--sin-cache', action='store_true', help='Desactiva la caché de lectura.')
+    parser.add_argument('--guardar', help='Guarda los resultados en este archivo JSON.')
+    parser.add_argument('--linea-base', help='Compara contra un resultado guardado con --guardar.')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Aumento de p95 permitido frente a la línea base (0.25 = 25%%).')
+    args = parser.parse_args(argv)
+
+    aplicacion = preparar_base(os.path.abspath(args.base), args)
+    # Se mide sin cortar por presupuesto: el encabezado X-Consultas-SQL basta.
+    aplicacion.config['VERIFICAR_PRESUPUESTO_CONSULTAS'] = True
+    aplicacion.config['PRESUPUESTO_CONSULTAS'] = {}
+    ctx = contexto_rutas(aplicacion)
+    filtros = [texto for texto in args.rutas.split(',') if texto]
+    rutas = [ruta for ruta in rutas_benchmark(ctx) if not filtros or any(texto in ruta.nombre for texto in filtros)]
+    resultados = []
+    for concurrencia in (int(valor) for valor in args.concurrencia.split(',')):
+        for ruta in rutas:
+            resultados.append(medir_ruta(aplicacion, ruta, concurrencia, args.repeticiones))
+            print(f"  {ruta.nombre} (c={concurrencia}) p95={resultados[-1]['p95_ms']} ms", file=sys.stderr)
+    imprimir(resultados)
+
+    informe = {
+        'fecha': datetime.utcnow().isoformat(timespec='seconds'),
+        'volumen': {'animales': args.animales, 'conteos': args.conteos, 'tratamientos': args.tratamientos, 'alertas': args.alertas},
+        'resultados': resultados,
+    }
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as archivo:
+            json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    if args.linea_base:
+        with open(args.linea_base, encoding='utf-8') as archivo:
+            regresiones = comparar(resultados, json.load(archivo), args.tolerancia)
+        if regresiones:
+            print('\nRegresiones frente a la línea base:')
+            for regresion in regresiones:
+                print(f'  {regresion}')
+            return 1
+        print('\nSin regresiones frente a la línea base.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Benchmark de arranque en frío.
+
+Cada medición corre en un proceso nuevo y registra cuánto tarda importar la
+fábrica, crear la aplicación y atender la primera y la segunda petición, con y
+sin PRECALENTAR. Con `preload_app` el costo de crear la aplicación lo paga
+una sola vez el maestro de gunicorn; lo que ve cada worker tras el fork es la
+primera petición.
+
+    python benchmark_arranque.py --repeticiones 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUTAS = ('/login', '/dashboard_admin', '/gestionar_animales')
+FASES = ('importar', 'crear_app', 'primera_peticion', 'segunda_peticion')
+
+
+def medir_proceso():
+    inicio = time.perf_counter()
+    from app import crear_app
+    tiempos = {'importar': time.perf_counter() - inicio}
+    inicio = time.perf_counter()
+    aplicacion = crear_app()
+    tiempos['crear_app'] = time.perf_counter() - inicio
+    cliente = aplicacion.test_client()
+    with cliente.session_transaction() as datos:
+        datos['user_id'] = 1
+        datos['username'] = 'benchmark'
+        datos['user_rol'] = 'Administrador'
+    for fase in ('primera_peticion', 'segunda_peticion'):
+        inicio = time.perf_counter()
+        for ruta in RUTAS:
+            respuesta = cliente.get(ruta)
+            assert respuesta.status_code == 200, (ruta, respuesta.status_code)
+        tiempos[fase] = time.perf_counter() - inicio
+    print(json.dumps(tiempos))
+
+
+def preparar_base(ruta):
+    os.environ['GANADERIA_DATABASE_URI'] = f'sqlite:///{ruta}'
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'wsgi', 'migrar'], check=True, capture_output=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir(precalentar, repeticiones):
+    entorno = dict(os.environ, GANADERIA_PRECALENTAR='true' if precalentar else 'false')
+    muestras = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, os.path.abspath(__file__), '--hijo'], check=True, capture_output=True,
+                                text=True, env=entorno, cwd=os.path.dirname(os.path.abspath(__file__)))
+        muestras.append(json.loads(salida.stdout.splitlines()[-1]))
+    return {fase: statistics.median(muestra[fase] for muestra in muestras) * 1000 for fase in FASES}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeticiones', type=int, default=10, help='Procesos por variante (se reporta la mediana).')
+    parser.add_argument('--hijo', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.hijo:
+        medir_proceso()
+        return 0
+
+    # Clave fija: no se escribe instance/secret_key durante el benchmark.
+    os.environ.setdefault('GANADERIA_SECRET_KEY', '"benchmark"')
+    with tempfile.TemporaryDirectory() as directorio:
+        preparar_base(os.path.join(directorio, 'arranque.db'))
+        resultados = {variante: medir(variante == 'precalentada', args.repeticiones) for variante in ('perezosa', 'precalentada')}
+
+    print(f"{'variante':14}" + ''.join(f'{fase:>18}' for fase in FASES))
+    for variante, tiempos in resultados.items():
+        print(f'{variante:14}' + ''.join(f'{tiempos[fase]:>15.1f} ms' for fase in FASES))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Búsqueda de texto completo sobre animales, tratamientos y alertas (SQLite FTS5).
+
+Los índices `animal_fts`, `tratamiento_fts` y `alerta_fts` son tablas FTS5 de
+contenido externo: no duplican el texto, sólo el índice invertido, y se
+mantienen al día con triggers sobre las tablas originales (migración 4). Así
+también quedan indexadas las filas que entran por sentencias masivas, que no
+pasan por los eventos de la sesión.
+"""
+import re
+
+from markupsafe import Markup, escape
+
+# Columnas indexadas por tabla. Los pesos de bm25 en CONSULTAS siguen este orden.
+INDICES = {
+    'animal': ('codigo_unico', 'nombre', 'tipo'),
+    'tratamiento': ('nombre_tratamiento', 'descripcion'),
+    'alerta': ('mensaje',),
+}
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+
+_TERMINO = re.compile(r'\w+', re.UNICODE)
+# Marcadores que no pueden venir en el texto; se reemplazan por <mark> tras escapar.
+_INICIO, _FIN = '\x02', '\x03'
+
+CONSULTAS = {
+    'animales': (
+        'SELECT animal.id, animal.codigo_unico, animal.nombre, animal.tipo, animal.estado, '
+        f"highlight(animal_fts, 0, '{_INICIO}', '{_FIN}') AS codigo_resaltado, "
+        f"highlight(animal_fts, 1, '{_INICIO}', '{_FIN}') AS resaltado "
+        'FROM animal_fts JOIN animal ON animal.id = animal_fts.rowid '
+        'WHERE animal_fts MATCH ? ORDER BY bm25(animal_fts, 10.0, 5.0, 1.0), animal.id LIMIT ? OFFSET ?'
+    ),
+    'tratamientos': (
+        'SELECT tratamiento.id, tratamiento.animal_id, animal.codigo_unico, tratamiento.fecha_aplicacion, '
+        'tratamiento.nombre_tratamiento, '
+        f"snippet(tratamiento_fts, -1, '{_INICIO}', '{_FIN}', '…', 16) AS resaltado "
+        'FROM tratamiento_fts JOIN tratamiento ON tratamiento.id = tratamiento_fts.rowid '
+        'JOIN animal ON animal.id = tratamiento.animal_id '
+        'WHERE tratamiento_fts MATCH ? ORDER BY bm25(tratamiento_fts, 5.0, 1.0), tratamiento.id DESC LIMIT ? OFFSET ?'
+    ),
+    'alertas': (
+        'SELECT alerta.id, alerta.resuelta, conteo.fecha_hora, '
+        f"snippet(alerta_fts, 0, '{_INICIO}', '{_FIN}', '…', 24) AS resaltado "
+        'FROM alerta_fts JOIN alerta ON alerta.id = alerta_fts.rowid '
+        'JOIN conteo ON conteo.id = alerta.conteo_id '
+        'WHERE alerta_fts MATCH ? ORDER BY bm25(alerta_fts), alerta.id DESC LIMIT ? OFFSET ?'
+    ),
+}
+TOTALES = (
+    'SELECT (SELECT COUNT(*) FROM animal_fts WHERE animal_fts MATCH ?), '
+    '(SELECT COUNT(*) FROM tratamiento_fts WHERE tratamiento_fts MATCH ?), '
+    '(SELECT COUNT(*) FROM alerta_fts WHERE alerta_fts MATCH ?)'
+)
+
+
+def expresion_fts(texto):
+    """Convierte el texto del usuario en una consulta FTS5 segura.
+
+    Cada palabra se busca como prefijo ("vac 00" encuentra VAC-001) y todas
+    deben aparecer. Se descarta la sintaxis de FTS5 (comillas, NEAR, OR, *)
+    para que ninguna entrada produzca un error de consulta.
+    """
+    terminos = _TERMINO.findall(texto or '')
+    return ' '.join(f'"{termino}"*' for termino in terminos)
+
+
+def resaltar(texto):
+    return Markup(escape(texto or '')).replace(_INICIO, Markup('<mark>')).replace(_FIN, Markup('</mark>'))
+
+
+def totales(conexion, expresion):
+    animales, tratamientos, alertas = conexion.exec_driver_sql(TOTALES, (expresion,) * 3).one()
+    return {'animales': animales, 'tratamientos': tratamientos, 'alertas': alertas}
+
+
+def buscar(conexion, entidad, expresion, limite, desplazamiento=0):
+    filas = conexion.exec_driver_sql(CONSULTAS[entidad], (expresion, limite, desplazamiento)).mappings().all()
+    return [{clave: resaltar(valor) if clave.endswith('resaltado') else valor for clave, valor in fila.items()} for fila in filas]
+
+
+def crear_indices(conexion):
+    for tabla, columnas in INDICES.items():
+        nombres = ', '.join(columnas)
+        nuevos = ', '.join(f'new.{columna}' for columna in columnas)
+        viejos = ', '.join(f'old.{columna}' for columna in columnas)
+        conexion.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla}_fts USING fts5({nombres}, "
+            f"content='{tabla}', content_rowid='id', tokenize='{TOKENIZADOR}', prefix='2 3')"
+        )
+        conexion.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ai AFTER INSERT ON {tabla} BEGIN '
+            f'INSERT INTO {tabla}_fts (rowid, {nombres}) VALUES (new.id, {nuevos}); END'
+        )
+        conexion.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ad AFTER DELETE ON {tabla} BEGIN '
+            f"INSERT INTO {tabla}_fts ({tabla}_fts, rowid, {nombres}) VALUES ('delete', old.id, {viejos}); END"
+        )
+        # Sólo se reindexa si cambió alguna columna indexada (no al resolver una alerta, por ejemplo).
+        conexion.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_au AFTER UPDATE OF {nombres} ON {tabla} BEGIN '
+            f"INSERT INTO {tabla}_fts ({tabla}_fts, rowid, {nombres}) VALUES ('delete', old.id, {viejos}); "
+            f'INSERT INTO {tabla}_fts (rowid, {nombres}) VALUES (new.id, {nuevos}); END'
+        )
+        conexion.exec_driver_sql(f"INSERT INTO {tabla}_fts ({tabla}_fts) VALUES ('rebuild')")
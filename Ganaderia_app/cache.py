@@ -0,0 +1,223 @@
+"""Caché de lectura con invalidación por etiquetas.
+
+Cada entrada se guarda con las tablas de las que depende (sus etiquetas). Al
+confirmarse una transacción que modificó alguna de esas tablas, las entradas
+correspondientes se eliminan (ver `registrar_invalidacion`).
+
+Backends disponibles (configuración CACHE_BACKEND):
+- 'memoria': LRU con TTL dentro del proceso.
+- 'sqlite': archivo SQLite compartido por todos los workers de la máquina,
+  de modo que una invalidación en un proceso se ve en los demás.
+- 'nulo': desactiva la caché.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_AUSENTE = object()
+
+
+class BackendNulo:
+    def obtener(self, clave):
+        return _AUSENTE
+
+    def guardar(self, clave, valor, etiquetas, ttl):
+        pass
+
+    def invalidar(self, etiquetas):
+        return 0
+
+    def limpiar(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class BackendMemoria:
+    def __init__(self, max_entradas=1024):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return _AUSENTE
+            valor, etiquetas, expira = entrada
+            if expira < time.monotonic():
+                del self._entradas[clave]
+                return _AUSENTE
+            self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, etiquetas, ttl):
+        with self._lock:
+            self._entradas[clave] = (valor, frozenset(etiquetas), time.monotonic() + ttl)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, etiquetas):
+        etiquetas = set(etiquetas)
+        with self._lock:
+            claves = [clave for clave, (_, suyas, _) in self._entradas.items() if suyas & etiquetas]
+            for clave in claves:
+                del self._entradas[clave]
+        return len(claves)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class BackendSQLite:
+    def __init__(self, ruta, max_entradas=10000):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        with self._conexion() as conexion:
+            conexion.execute('CREATE TABLE IF NOT EXISTS entrada (clave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)')
+            conexion.execute('CREATE TABLE IF NOT EXISTS etiqueta (etiqueta TEXT NOT NULL, clave TEXT NOT NULL, PRIMARY KEY (etiqueta, clave))')
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso: la que abrió el maestro antes del
+        # fork de los workers no se reutiliza en los hijos.
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None or self._local.pid != os.getpid():
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode = WAL')
+            conexion.execute('PRAGMA synchronous = OFF')
+            self._local.conexion, self._local.pid = conexion, os.getpid()
+        return conexion
+
+    def obtener(self, clave):
+        fila = self._conexion().execute('SELECT valor, expira FROM entrada WHERE clave = ?', (clave,)).fetchone()
+        if fila is None or fila[1] < time.time():
+            return _AUSENTE
+        return pickle.loads(fila[0])
+
+    def guardar(self, clave, valor, etiquetas, ttl):
+        conexion = self._conexion()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            conexion.execute('INSERT OR REPLACE INTO entrada (clave, valor, expira) VALUES (?, ?, ?)',
+                             (clave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), time.time() + ttl))
+            conexion.executemany('INSERT OR IGNORE INTO etiqueta (etiqueta, clave) VALUES (?, ?)',
+                                 [(etiqueta, clave) for etiqueta in etiquetas])
+            # Limpieza oportunista para acotar el tamaño del archivo.
+            conexion.execute('DELETE FROM entrada WHERE expira < ?', (time.time(),))
+            conexion.execute('DELETE FROM entrada WHERE clave IN (SELECT clave FROM entrada ORDER BY expira DESC LIMIT -1 OFFSET ?)',
+                             (self.max_entradas,))
+            conexion.execute('COMMIT')
+        except sqlite3.Error:
+            conexion.execute('ROLLBACK')
+
+    def invalidar(self, etiquetas):
+        conexion = self._conexion()
+        marcadores = ', '.join('?' for _ in etiquetas)
+        conexion.execute('BEGIN IMMEDIATE')
+        cursor = conexion.execute(f'DELETE FROM entrada WHERE clave IN (SELECT clave FROM etiqueta WHERE etiqueta IN ({marcadores}))', list(etiquetas))
+        conexion.execute(f'DELETE FROM etiqueta WHERE etiqueta IN ({marcadores}) OR clave NOT IN (SELECT clave FROM entrada)', list(etiquetas))
+        conexion.execute('COMMIT')
+        return cursor.rowcount
+
+    def limpiar(self):
+        conexion = self._conexion()
+        conexion.execute('DELETE FROM entrada')
+        conexion.execute('DELETE FROM etiqueta')
+
+    def __len__(self):
+        return self._conexion().execute('SELECT COUNT(*) FROM entrada').fetchone()[0]
+
+
+class Cache:
+    def __init__(self, backend=None, ttl=300):
+        self.backend = BackendNulo() if backend is None else backend
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def memorizar(self, clave, etiquetas, funcion, ttl=None):
+        valor = self.backend.obtener(clave)
+        if valor is not _AUSENTE:
+            self.aciertos += 1
+            return valor
+        self.fallos += 1
+        valor = funcion()
+        self.backend.guardar(clave, valor, etiquetas, ttl or self.ttl)
+        return valor
+
+    def init_app(self, app):
+        self.backend = crear_backend(app.config)
+        self.ttl = app.config.get('CACHE_TTL', 300)
+        app.extensions['cache'] = self
+
+    def invalidar(self, etiquetas):
+        if etiquetas:
+            self.invalidaciones += self.backend.invalidar(etiquetas)
+
+    def limpiar(self):
+        self.backend.limpiar()
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'backend': type(self.backend).__name__,
+            'entradas': len(self.backend),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+            'invalidaciones': self.invalidaciones,
+        }
+
+
+def crear_backend(config):
+    tipo = config.get('CACHE_BACKEND', 'memoria')
+    if tipo == 'sqlite':
+        return BackendSQLite(config['CACHE_RUTA_SQLITE'], config.get('CACHE_MAX_ENTRADAS', 10000))
+    if tipo == 'memoria':
+        return BackendMemoria(config.get('CACHE_MAX_ENTRADAS', 1024))
+    return BackendNulo()
+
+
+def crear_cache(config):
+    return Cache(crear_backend(config), config.get('CACHE_TTL', 300))
+
+
+def registrar_invalidacion(cache, session_factory=Session):
+    # Se anotan las tablas tocadas por cada flush y por cada INSERT/UPDATE/DELETE
+    # emitido como sentencia (cargas masivas, upserts) y se invalidan sólo si la
+    # transacción se confirma.
+    @event.listens_for(session_factory, 'after_flush')
+    def anotar_flush(sesion, contexto):
+        tablas = sesion.info.setdefault('tablas_modificadas', set())
+        for objeto in (*sesion.new, *sesion.dirty, *sesion.deleted):
+            tablas.add(objeto.__table__.name)
+
+    @event.listens_for(session_factory, 'do_orm_execute')
+    def anotar_sentencia(estado):
+        if estado.is_insert or estado.is_update or estado.is_delete:
+            tabla = getattr(estado.statement, 'table', None)
+            if tabla is not None:
+                estado.session.info.setdefault('tablas_modificadas', set()).add(tabla.name)
+
+    @event.listens_for(session_factory, 'after_commit')
+    def invalidar(sesion):
+        cache.invalidar(sesion.info.pop('tablas_modificadas', set()))
+
+    @event.listens_for(session_factory, 'after_soft_rollback')
+    def descartar(sesion, transaccion_previa):
+        sesion.info.pop('tablas_modificadas', None)
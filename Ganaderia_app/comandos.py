@@ -0,0 +1,113 @@
+"""Comandos de la CLI (`flask --app wsgi <comando>`) y tareas de mantenimiento
+que corren fuera de las peticiones.
+
+Se registran siempre, con cualquier selección de BLUEPRINTS, para que el
+trabajador tenga los manejadores de todos sus tipos de trabajo.
+"""
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, insert, select
+
+import archivo
+import resumenes
+import trabajos
+from extensiones import cache, db
+from importacion import FORMATOS, detectar_formato
+from migraciones import aplicar_migraciones
+from modelos import TABLAS_ARCHIVO, ClaveSincronizacion, Trabajo, incrementar_versiones
+
+
+def archivar_datos_frios():
+    ahora = datetime.utcnow()
+    # Las tablas que pierden filas cambian de versión: los GET condicionales de la API no responden 304 con datos ya archivados.
+    resultado = archivo.archivar(db.engine, TABLAS_ARCHIVO, ahora, current_app.config['ARCHIVO_DIAS_INACTIVO'], current_app.config['ARCHIVO_DIAS_CONTEOS'],
+                                 al_borrar=incrementar_versiones)
+    # Pasado ese plazo ningún dispositivo reintenta el envío: la clave ya no protege nada.
+    with db.engine.begin() as conexion:
+        conexion.execute(delete(ClaveSincronizacion).where(ClaveSincronizacion.recibida_en < ahora - timedelta(days=current_app.config['SINCRONIZACION_DIAS_CLAVES'])))
+    # Las filas borradas por SQL no pasan por la sesión: se invalida toda la caché.
+    cache.limpiar()
+    return resultado
+
+def programar_archivado(conexion, demora):
+    # Sólo una ejecución pendiente a la vez (la que está en curso se reprograma al terminar).
+    if conexion.execute(select(Trabajo.id).where(Trabajo.tipo == 'archivar', Trabajo.estado == 'Pendiente')).first():
+        return False
+    conexion.execute(insert(Trabajo).values(tipo='archivar', payload='{}', max_intentos=3, proximo_intento=datetime.utcnow() + demora))
+    return True
+
+@trabajos.manejador('archivar')
+def archivar_programado(payload, config):
+    # Corre en el hilo del trabajador, dentro del contexto de la aplicación;
+    # al terminar deja programada la siguiente ejecución.
+    resultado = archivar_datos_frios()
+    current_app.logger.info('Archivado: %s animales y %s conteos.', resultado.animales, resultado.conteos)
+    with db.engine.begin() as conexion:
+        programar_archivado(conexion, timedelta(hours=config['ARCHIVO_INTERVALO_HORAS']))
+
+@click.command('migrar')
+@with_appcontext
+def migrar():
+    db.create_all()
+    for version, descripcion in aplicar_migraciones(db.engine):
+        print(f'Migración {version} aplicada: {descripcion}')
+
+@click.command('importar-animales')
+@click.argument('archivo', type=click.File('rb'))
+@click.option('--formato', type=click.Choice(FORMATOS), default=None)
+@click.option('--lote', 'tamano_lote', type=int, default=None, help='Filas por transacción.')
+@with_appcontext
+def importar_animales_cli(archivo, formato, tamano_lote):
+    from rutas.animales import procesar_importacion_animales
+
+    informe = procesar_importacion_animales(archivo, formato or detectar_formato(archivo.name), tamano_lote)
+    print(f'{informe.insertados} animales insertados en {informe.lotes} lote(s), {informe.total_errores} fila(s) con errores.')
+    for error in informe.errores:
+        print(f"  línea {error['linea']}: {error['error']}")
+
+@click.command('trabajador')
+@click.option('--hilos', type=int, default=None, help='Hilos que procesan trabajos en paralelo.')
+@click.option('--una-vez', is_flag=True, help='Procesa los trabajos disponibles y termina.')
+@with_appcontext
+def trabajador_cli(hilos, una_vez):
+    aplicacion = current_app._get_current_object()
+    if una_vez:
+        print(f'{trabajos.procesar_pendientes(db.engine, aplicacion.config, contexto=aplicacion.app_context)} trabajo(s) procesado(s).')
+        return
+    trabajador = trabajos.Trabajador(db.engine, aplicacion.config, hilos or aplicacion.config['TRABAJOS_HILOS'], contexto=aplicacion.app_context).iniciar()
+    print(f'Trabajador iniciado con {trabajador.hilos} hilo(s). Ctrl+C para detener.')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        trabajador.detener()
+
+@click.command('archivar')
+@click.option('--programar', is_flag=True, help='Programa el archivado periódico en la cola de trabajos en lugar de ejecutarlo ahora.')
+@with_appcontext
+def archivar_cli(programar):
+    if programar:
+        with db.engine.begin() as conexion:
+            programado = programar_archivado(conexion, timedelta(0))
+        print('Archivado periódico programado.' if programado else 'El archivado ya estaba programado.')
+        return
+    resultado = archivar_datos_frios()
+    print(f'{resultado.animales} animales y {resultado.conteos} conteos archivados.')
+    for tabla, filas in resultado.filas.items():
+        print(f'  {tabla}: {filas} fila(s)')
+
+@click.command('reconstruir-resumenes')
+@with_appcontext
+def reconstruir_resumenes():
+    with db.engine.begin() as conexion:
+        insertados = resumenes.reconstruir(conexion)
+    cache.limpiar()
+    print(f'Resúmenes reconstruidos ({insertados} animales faltantes recuperados de alertas antiguas).')
+
+def registrar(app):
+    for comando in (migrar, importar_animales_cli, trabajador_cli, archivar_cli, reconstruir_resumenes):
+        app.cli.add_command(comando)
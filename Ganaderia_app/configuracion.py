@@ -0,0 +1,167 @@
+"""Configuración de la aplicación.
+
+Orden de carga (cada paso sobrescribe al anterior):
+
+1. Valores por defecto de `por_defecto`, que ya leen algunas variables de
+   entorno históricas (GANADERIA_DATABASE_URI, CACHE_BACKEND, SQLITE_*...).
+2. Un archivo indicado en GANADERIA_CONFIG: `.py` (claves en mayúsculas),
+   `.json` o `.toml`.
+3. Variables de entorno GANADERIA_<CLAVE>; el valor se interpreta como JSON
+   si es posible (GANADERIA_CACHE_TTL=600, GANADERIA_BLUEPRINTS='["api"]').
+4. El diccionario pasado a `crear_app` (pruebas, benchmarks).
+
+SECRET_KEY debe ser la misma en todos los workers y entre reinicios, o las
+sesiones firmadas por un proceso no valen en otro. Si no se define por
+ninguno de esos medios se genera una vez y se guarda en `instance/secret_key`.
+"""
+import json
+import os
+
+import planificador
+import pronostico
+
+
+def por_defecto(instance_path):
+    return {
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('GANADERIA_DATABASE_URI', 'sqlite:///database.db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # Blueprints que se cargan (ver rutas/__init__.py).
+        'BLUEPRINTS': ('auth', 'animales', 'conteos', 'inventario', 'infraestructura', 'api', 'sincronizacion', 'operaciones'),
+        # Compila plantillas y configura los mappers al crear la app en lugar de
+        # hacerlo en la primera petición (lo activa gunicorn.conf.py).
+        'PRECALENTAR': False,
+        # Límite de sentencias SQL por endpoint. Se verifica siempre en modo testing
+        # para detectar regresiones N+1 (consultas perezosas dentro de los templates).
+        'VERIFICAR_PRESUPUESTO_CONSULTAS': False,
+        'PRESUPUESTO_CONSULTAS': {
+            'auth.dashboard_cuidador': 1,
+            'conteos.iniciar_conteo': 1,
+            'conteos.guardar_conteo': 9,
+            'conteos.abrir_sesion_conteo': 5,
+            'conteos.registrar_lote_escaneo': 8,
+            'conteos.finalizar_sesion_conteo': 15,
+            'conteos.resolver_alerta': 5,
+            'conteos.ver_tendencias': 3,
+            'conteos.ver_reportes': 2,
+            'conteos.gestionar_alertas': 1,
+            'animales.historial_medico': 3,
+            'animales.campanas_tratamiento': 8,
+            'animales.ver_tratamientos_pendientes': 1,
+            'animales.buscar': 2,
+            'inventario.registrar_movimiento_alimento': 5,
+            'inventario.pronostico_alimentos': 3,
+            'infraestructura.planificacion_pastoreo': 4,
+            'animales.composicion_rebano': 3,
+            'infraestructura.generar_plan_rotacion': 7,
+        },
+        # Perfil de SQLite aplicado a cada conexión. WAL permite que los administradores
+        # lean reportes mientras los cuidadores guardan conteos. Cada valor puede
+        # sobrescribirse con la variable de entorno SQLITE_<CLAVE>.
+        'SQLITE_PRAGMAS': {
+            clave: os.environ.get(f'SQLITE_{clave.upper()}', valor)
+            for clave, valor in {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'cache_size': -20000,
+                'mmap_size': 268435456,
+                'busy_timeout': 5000,
+                'temp_store': 'MEMORY',
+            }.items()
+        },
+        'IMPORTACION_TAMANO_LOTE': 500,
+        'IMPORTACION_TAMANO_LOTE_MAXIMO': 5000,
+        'EXPORTACION_PARTICION': 1000,
+        # Caché de lectura para dashboards y listas de referencia. CACHE_BACKEND puede
+        # ser 'memoria', 'sqlite' (compartida entre workers) o 'nulo'.
+        'CACHE_BACKEND': os.environ.get('CACHE_BACKEND', 'memoria'),
+        'CACHE_TTL': int(os.environ.get('CACHE_TTL', 300)),
+        'CACHE_MAX_ENTRADAS': 1024,
+        'CACHE_RUTA_SQLITE': os.path.join(instance_path, 'cache.db'),
+        # Notificaciones de alertas, enviadas por la cola de trabajos. Cada canal
+        # recibe una lista de destinos separados por comas (NOTIFICAR_EMAIL, etc.).
+        'NOTIFICACIONES_ALERTA': {
+            canal: [destino.strip() for destino in os.environ.get(f'NOTIFICAR_{canal.upper()}', '').split(',') if destino.strip()]
+            for canal in ('email', 'webhook', 'sms')
+        },
+        'SMTP_HOST': os.environ.get('SMTP_HOST', 'localhost'),
+        'SMTP_PUERTO': int(os.environ.get('SMTP_PUERTO', 1025)),
+        'TRABAJOS_HILOS': int(os.environ.get('TRABAJOS_HILOS', 2)),
+        # /metrics acepta administradores con sesión o `Authorization: Bearer <METRICAS_TOKEN>`.
+        'METRICAS_TOKEN': os.environ.get('METRICAS_TOKEN'),
+        # Perfilado opcional: con PERFILADO_UMBRAL_MS definido se perfila una fracción
+        # PERFILADO_MUESTREO de las peticiones y se guardan las que superan el umbral.
+        # PERFILADO_MODO es 'pilas' (pilas colapsadas para flamegraph) o 'cprofile'.
+        'PERFILADO_UMBRAL_MS': float(os.environ['PERFILADO_UMBRAL_MS']) if os.environ.get('PERFILADO_UMBRAL_MS') else None,
+        'PERFILADO_MUESTREO': float(os.environ.get('PERFILADO_MUESTREO', 1.0)),
+        'PERFILADO_MODO': os.environ.get('PERFILADO_MODO', 'pilas'),
+        'PERFILADO_DIRECTORIO': os.path.join(instance_path, 'perfiles'),
+        'PRONOSTICO_VENTANA_DIAS': pronostico.VENTANA_DIAS,
+        'PRONOSTICO_PLAZO_ENTREGA_DIAS': pronostico.PLAZO_ENTREGA_DIAS,
+        'ROTACION_DESCANSO_DIAS': planificador.DESCANSO_DIAS,
+        'ROTACION_CARGA_POR_HECTAREA': planificador.CARGA_POR_HECTAREA,
+        'ROTACION_MAX_SEMANAS': 52,
+        # Un conteo se compara con el rebaño del momento en que se abrió el formulario,
+        # salvo que el formulario tenga más de estas horas.
+        'CONTEO_VIGENCIA_FORMULARIO_HORAS': 12,
+        # Códigos por lote de escaneo: se buscan con un solo IN (...) y SQLite
+        # limita los parámetros por sentencia.
+        'CONTEO_LOTE_MAX_CODIGOS': 1000,
+        # Archivo de datos fríos (ver archivo.py). Sin ARCHIVO_RUTA se usa
+        # <base>_archivo.db junto a la base principal.
+        'ARCHIVO_RUTA': os.environ.get('ARCHIVO_RUTA'),
+        'ARCHIVO_DIAS_INACTIVO': int(os.environ.get('ARCHIVO_DIAS_INACTIVO', 90)),
+        'ARCHIVO_DIAS_CONTEOS': int(os.environ.get('ARCHIVO_DIAS_CONTEOS', 365)),
+        'ARCHIVO_INTERVALO_HORAS': int(os.environ.get('ARCHIVO_INTERVALO_HORAS', 24)),
+        # Sincronización sin conexión (ver sincronizacion.py). Las claves de
+        # idempotencia se borran al archivar, pasados SINCRONIZACION_DIAS_CLAVES.
+        'SINCRONIZACION_MAX_BYTES': 16 * 1024 * 1024,
+        'SINCRONIZACION_MAX_REGISTROS': 5000,
+        'SINCRONIZACION_DIAS_CLAVES': 30,
+        # Días hacia adelante en que una dosis de refuerzo se muestra como pendiente.
+        'TRATAMIENTOS_HORIZONTE_DIAS': 7,
+    }
+
+
+def cargar_archivo(app, ruta):
+    if ruta.endswith('.json'):
+        app.config.from_file(ruta, load=json.load)
+    elif ruta.endswith('.toml'):
+        import tomllib
+
+        app.config.from_file(ruta, load=tomllib.load, text=False)
+    else:
+        app.config.from_pyfile(ruta)
+
+
+def clave_secreta(directorio):
+    """Lee la clave de `directorio/secret_key`, creándola si no existe.
+
+    Varios workers pueden arrancar a la vez: cada uno escribe su candidata en un
+    archivo propio y la enlaza con os.link, que falla si otro ya publicó la
+    suya; todos terminan leyendo la misma.
+    """
+    ruta = os.path.join(directorio, 'secret_key')
+    if not os.path.exists(ruta):
+        os.makedirs(directorio, exist_ok=True)
+        candidata = f'{ruta}.{os.getpid()}'
+        descriptor = os.open(candidata, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(os.urandom(32).hex().encode())
+        try:
+            os.link(candidata, ruta)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(candidata)
+    with open(ruta, 'rb') as archivo:
+        return archivo.read().strip()
+
+
+def cargar_configuracion(app, config=None):
+    app.config.update(por_defecto(app.instance_path))
+    if os.environ.get('GANADERIA_CONFIG'):
+        cargar_archivo(app, os.environ['GANADERIA_CONFIG'])
+    app.config.from_prefixed_env('GANADERIA')
+    app.config.update(config or {})
+    if not app.config.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = clave_secreta(app.instance_path)
@@ -0,0 +1,66 @@
+"""Serialización en streaming de exportaciones CSV y NDJSON.
+
+Los generadores reciben un iterable de filas (normalmente un resultado de
+SQLAlchemy leído por particiones) y emiten bloques de texto a medida que los
+van completando, sin acumular el resultado completo en memoria.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+# Tamaño aproximado de cada bloque enviado al cliente.
+TAMANO_BLOQUE = 64 * 1024
+
+
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f'Tipo no serializable: {type(valor).__name__}')
+
+
+def generar_csv(columnas, filas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    # El encabezado sale de inmediato para que el cliente empiece a recibir.
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for fila in filas:
+        escritor.writerow(fila)
+        if buffer.tell() >= TAMANO_BLOQUE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def generar_ndjson(columnas, filas):
+    lineas = (json.dumps(dict(zip(columnas, fila)), default=_valor_json, ensure_ascii=False, separators=(',', ':')) for fila in filas)
+    # La primera línea sale de inmediato, como el encabezado del CSV; el resto por bloques.
+    primera = next(lineas, None)
+    if primera is None:
+        return
+    yield primera + '\n'
+    bloque = []
+    tamano = 0
+    for linea in lineas:
+        bloque.append(linea)
+        tamano += len(linea) + 1
+        if tamano >= TAMANO_BLOQUE:
+            yield '\n'.join(bloque) + '\n'
+            bloque, tamano = [], 0
+    if bloque:
+        yield '\n'.join(bloque) + '\n'
+
+
+def generar(formato, columnas, filas):
+    if formato == 'csv':
+        return generar_csv(columnas, filas)
+    return generar_ndjson(columnas, filas)
@@ -0,0 +1,15 @@
+"""Extensiones compartidas por la fábrica de la aplicación, los modelos y los blueprints.
+
+Se crean sin aplicación y `crear_app` las inicializa (`init_app`), así los
+módulos pueden importarlas sin crear la app y varias apps (pruebas, CLI)
+conviven en un mismo proceso.
+"""
+from flask_sqlalchemy import SQLAlchemy
+
+from cache import Cache, registrar_invalidacion
+from metricas import Registro
+
+db = SQLAlchemy()
+cache = Cache()
+registrar_invalidacion(cache)
+metricas = Registro()
@@ -0,0 +1,49 @@
+"""Perfil de producción: `gunicorn -c gunicorn.conf.py wsgi:app`.
+
+Antes de arrancar, en cada despliegue: `flask --app wsgi migrar`. El maestro
+comprueba al iniciar que no queden migraciones pendientes (`on_starting`).
+
+Con `preload_app` el maestro crea la aplicación una sola vez (configuración,
+blueprints, mappers y plantillas compiladas, ver `precalentar`) y los workers
+la heredan al hacer fork en lugar de repetir ese trabajo cada uno. Todo lo que
+no debe compartirse entre procesos se recrea en el hijo: las conexiones del
+pool (`post_fork`) y las de la caché SQLite (ver cache.py).
+"""
+import multiprocessing
+import os
+
+# Con varios workers la caché en memoria quedaría repartida entre procesos y
+# cada uno invalidaría sólo la suya.
+os.environ.setdefault('CACHE_BACKEND', 'sqlite')
+os.environ.setdefault('GANADERIA_PRECALENTAR', 'true')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+
+def on_starting(server):
+    # Con preload_app la aplicación ya está cargada. La conexión de la
+    # comprobación se cierra antes del fork.
+    from extensiones import db
+    from migraciones import migraciones_pendientes
+
+    with server.app.wsgi().app_context():
+        pendientes = migraciones_pendientes(db.engine)
+        db.engine.dispose()
+    if pendientes:
+        versiones = ', '.join(str(version) for version, _ in pendientes)
+        server.log.error('Faltan migraciones (%s): ejecuta `flask --app wsgi migrar` antes de arrancar.', versiones)
+        raise SystemExit(1)
+
+
+def post_fork(server, worker):
+    # El maestro no debería haber abierto conexiones, pero si lo hizo (p. ej. un
+    # hook de arranque) el hijo descarta el pool heredado sin cerrarlas: siguen
+    # siendo del maestro.
+    from extensiones import db
+
+    aplicacion = server.app.wsgi()
+    with aplicacion.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
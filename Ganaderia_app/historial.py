@@ -0,0 +1,71 @@
+"""Historial de estados de los animales y composición del rebaño en una fecha.
+
+`historial_estado_animal` sólo recibe filas: una al crear cada animal y otra
+cada vez que cambia su estado, escritas por triggers sobre `animal`
+(migración 6), así que también quedan registradas las altas masivas y los
+cambios hechos por la API. El estado de un animal en un momento dado es el de
+su última fila con `valido_desde` anterior o igual a ese momento; se obtiene
+con una búsqueda en el índice (animal_id, valido_desde) por animal, sin
+recorrer los eventos.
+"""
+from datetime import datetime
+
+# Mismo formato que SQLAlchemy usa para DateTime en SQLite, para que las
+# comparaciones de texto entre fechas de la aplicación y de los triggers valgan.
+FORMATO_MOMENTO = '%Y-%m-%d %H:%M:%S.%f'
+_AHORA_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'"
+
+_ESTADO_EN = (
+    '(SELECT h.estado FROM {historial} h WHERE h.animal_id = animal.id AND h.valido_desde <= ? '
+    'ORDER BY h.valido_desde DESC, h.id DESC LIMIT 1)'
+)
+REBANO_EN = 'SELECT id, codigo_unico FROM {animal} animal WHERE ' + _ESTADO_EN + ' = ? ORDER BY id'
+COMPOSICION_EN = (
+    'SELECT estado, COUNT(*) FROM (SELECT ' + _ESTADO_EN + ' AS estado FROM {animal} animal) '
+    'WHERE estado IS NOT NULL GROUP BY estado ORDER BY estado'
+)
+
+
+def _momento(momento):
+    return momento.strftime(FORMATO_MOMENTO)
+
+
+def _tablas(historico):
+    # Con `historico` se leen también los animales archivados (vistas de archivo.py).
+    if historico:
+        return {'animal': 'animal_historico', 'historial': 'historial_estado_animal_historico'}
+    return {'animal': 'animal', 'historial': 'historial_estado_animal'}
+
+
+def rebano_en(conexion, momento, estado='En rebaño', historico=False):
+    """[(id, codigo_unico)] de los animales que tenían `estado` en `momento`."""
+    return conexion.exec_driver_sql(REBANO_EN.format(**_tablas(historico)), (_momento(momento), estado)).all()
+
+
+def composicion_en(conexion, momento, historico=False):
+    """{estado: cabezas} del rebaño en `momento`."""
+    return dict(conexion.exec_driver_sql(COMPOSICION_EN.format(**_tablas(historico)), (_momento(momento),)).all())
+
+
+def inicio_historial(conexion, historico=False):
+    valor = conexion.exec_driver_sql('SELECT MIN(valido_desde) FROM {historial}'.format(**_tablas(historico))).scalar()
+    return datetime.strptime(valor, FORMATO_MOMENTO) if valor else None
+
+
+def crear_historial(conexion):
+    conexion.exec_driver_sql(
+        'CREATE TRIGGER IF NOT EXISTS animal_historial_ai AFTER INSERT ON animal BEGIN '
+        f'INSERT INTO historial_estado_animal (animal_id, estado, valido_desde) VALUES (new.id, new.estado, {_AHORA_SQL}); END'
+    )
+    conexion.exec_driver_sql(
+        'CREATE TRIGGER IF NOT EXISTS animal_historial_au AFTER UPDATE OF estado ON animal '
+        'WHEN new.estado IS NOT old.estado BEGIN '
+        f'INSERT INTO historial_estado_animal (animal_id, estado, valido_desde) VALUES (new.id, new.estado, {_AHORA_SQL}); END'
+    )
+    # Los animales anteriores al historial parten con su estado actual: no hay
+    # registro de cuándo lo tomaron, así que su historial empieza hoy.
+    conexion.exec_driver_sql(
+        'INSERT INTO historial_estado_animal (animal_id, estado, valido_desde) '
+        f'SELECT id, estado, {_AHORA_SQL} FROM animal '
+        'WHERE NOT EXISTS (SELECT 1 FROM historial_estado_animal h WHERE h.animal_id = animal.id)'
+    )
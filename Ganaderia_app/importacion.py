@@ -0,0 +1,104 @@
+"""Lectura y validación en streaming de archivos de ingreso masivo de animales.
+
+Los archivos (CSV con encabezado o NDJSON, un objeto por línea) se recorren
+fila por fila sin cargarlos completos en memoria. Cada fila se valida de forma
+independiente para que un error no detenga el resto del ingreso.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+TIPOS_VALIDOS = ('Vaca', 'Cerdo', 'Chivo', 'Cordero', 'Pollo')
+ESTADOS_VALIDOS = ('En rebaño', 'En cuarentena', 'Vendido')
+FORMATOS = ('csv', 'ndjson')
+# Sólo se conserva el detalle de los primeros errores; el total se cuenta igual.
+MAX_ERRORES_REPORTADOS = 1000
+
+
+class FilaInvalida(Exception):
+    pass
+
+
+def detectar_formato(nombre_archivo):
+    nombre = (nombre_archivo or '').lower()
+    if nombre.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+
+def leer_filas(flujo, formato):
+    """Genera (numero_de_linea, dict | FilaInvalida) a partir de un flujo binario."""
+    texto = io.TextIOWrapper(flujo, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            yield lector.line_num, fila
+        return
+    for numero, linea in enumerate(texto, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError:
+            yield numero, FilaInvalida('JSON mal formado.')
+            continue
+        if not isinstance(fila, dict):
+            yield numero, FilaInvalida('Se esperaba un objeto JSON por línea.')
+            continue
+        yield numero, fila
+
+
+def _texto(fila, campo):
+    # En NDJSON un campo puede traer cualquier tipo JSON.
+    valor = fila.get(campo)
+    if valor is None:
+        return ''
+    if not isinstance(valor, str):
+        raise FilaInvalida(f"'{campo}' debe ser texto.")
+    return valor.strip()
+
+
+def validar_fila(fila):
+    if isinstance(fila, FilaInvalida):
+        raise fila
+    tipo = _texto(fila, 'tipo')
+    estado = _texto(fila, 'estado')
+    nombre = _texto(fila, 'nombre')
+    if tipo not in TIPOS_VALIDOS:
+        raise FilaInvalida(f"Tipo inválido: '{tipo}'.")
+    if estado not in ESTADOS_VALIDOS:
+        raise FilaInvalida(f"Estado inválido: '{estado}'.")
+    if len(nombre) > 100:
+        raise FilaInvalida('El nombre supera los 100 caracteres.')
+    return {'tipo': tipo, 'estado': estado, 'nombre': nombre or None}
+
+
+def en_lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+class InformeImportacion:
+    def __init__(self):
+        self.insertados = 0
+        self.total_errores = 0
+        self.errores = []
+        self.lotes = 0
+
+    def registrar_error(self, linea, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append({'linea': linea, 'error': mensaje})
+
+    def como_dict(self):
+        return {
+            'insertados': self.insertados,
+            'lotes': self.lotes,
+            'total_errores': self.total_errores,
+            'errores': self.errores,
+        }
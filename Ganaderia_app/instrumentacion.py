@@ -0,0 +1,107 @@
+"""Instrumentación de peticiones: conteo de consultas SQL, presupuesto por
+endpoint, métricas, perfilado y perfil de SQLite de cada conexión.
+
+`registrar(app)` la engancha a una aplicación creada por `crear_app`.
+"""
+import random
+import sqlite3
+import time
+from datetime import datetime
+from functools import partial
+
+from flask import current_app, g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import archivo
+from extensiones import db, metricas
+from metricas import BUCKETS_BYTES, BUCKETS_CONSULTAS, Perfilador
+from modelos import TABLAS_ARCHIVO
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    pass
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def contar_consulta(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.consultas_sql = g.get('consultas_sql', 0) + 1
+        # En el contexto de ejecución y no en la conexión: si la sentencia falla
+        # after_cursor_execute no corre y el inicio se descarta con el contexto.
+        if context is not None:
+            context._inicio_consulta = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def medir_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_inicio_consulta', None)
+    if has_request_context() and inicio is not None:
+        g.tiempo_sql = g.get('tiempo_sql', 0.0) + time.perf_counter() - inicio
+
+def configurar_sqlite(config, dbapi_connection, connection_record):
+    # Recibe la configuración y no usa current_app: el trabajador abre
+    # conexiones fuera de cualquier contexto de aplicación.
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for clave, valor in config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f'PRAGMA {clave} = {valor}')
+    cursor.close()
+    archivo.preparar_conexion(dbapi_connection, TABLAS_ARCHIVO, config['ARCHIVO_RUTA'])
+
+def verificar_presupuesto_consultas(response):
+    if current_app.testing or current_app.config['VERIFICAR_PRESUPUESTO_CONSULTAS']:
+        consultas = g.get('consultas_sql', 0)
+        response.headers['X-Consultas-SQL'] = str(consultas)
+        presupuesto = current_app.config['PRESUPUESTO_CONSULTAS'].get(request.endpoint)
+        if presupuesto is not None and consultas > presupuesto:
+            raise PresupuestoConsultasExcedido(f"La ruta '{request.endpoint}' ejecutó {consultas} consultas SQL (presupuesto: {presupuesto}).")
+    return response
+
+# --- MÉTRICAS Y PERFILADO ---
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+    umbral = current_app.config['PERFILADO_UMBRAL_MS']
+    if umbral is not None and random.random() < current_app.config['PERFILADO_MUESTREO']:
+        g.perfilador = Perfilador(current_app.config['PERFILADO_MODO'])
+
+def iniciar_plantilla(sender, template, context, **extra):
+    g.inicio_plantilla = time.perf_counter()
+
+def medir_plantilla(sender, template, context, **extra):
+    duracion = time.perf_counter() - g.pop('inicio_plantilla', time.perf_counter())
+    g.tiempo_plantillas = g.get('tiempo_plantillas', 0.0) + duracion
+    metricas.observar('plantilla_duracion_segundos', duracion, 'Tiempo de render_template por plantilla.', plantilla=template.name)
+
+def registrar_metricas(response):
+    endpoint = request.endpoint or 'sin_ruta'
+    duracion = time.perf_counter() - g.get('inicio_peticion', time.perf_counter())
+    metricas.incrementar('peticiones_total', 'Peticiones atendidas.', endpoint=endpoint, metodo=request.method, estado=response.status_code)
+    metricas.observar('peticion_duracion_segundos', duracion, 'Latencia por endpoint (hasta el primer byte en respuestas en streaming).', endpoint=endpoint, metodo=request.method)
+    metricas.observar('sql_consultas_por_peticion', g.get('consultas_sql', 0), 'Sentencias SQL por petición.', buckets=BUCKETS_CONSULTAS, endpoint=endpoint)
+    metricas.observar('sql_duracion_segundos', g.get('tiempo_sql', 0.0), 'Tiempo total en la base de datos por petición.', endpoint=endpoint)
+    metricas.observar('plantillas_duracion_segundos', g.get('tiempo_plantillas', 0.0), 'Tiempo total de render de plantillas por petición.', endpoint=endpoint)
+    if response.content_length is not None:
+        metricas.observar('respuesta_bytes', response.content_length, 'Tamaño del cuerpo de la respuesta.', buckets=BUCKETS_BYTES, endpoint=endpoint)
+    return response
+
+def guardar_perfil(error=None):
+    perfilador = g.pop('perfilador', None)
+    if perfilador is None:
+        return
+    duracion = perfilador.detener()
+    if duracion * 1000 >= current_app.config['PERFILADO_UMBRAL_MS']:
+        nombre = f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{request.endpoint or 'sin_ruta'}-{round(duracion * 1000)}ms"
+        ruta = perfilador.guardar(current_app.config['PERFILADO_DIRECTORIO'], nombre)
+        if ruta:
+            current_app.logger.info('Perfil de %s %s (%.0f ms) guardado en %s', request.method, request.path, duracion * 1000, ruta)
+
+def registrar(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'connect', partial(configurar_sqlite, app.config))
+    app.before_request(iniciar_medicion)
+    app.after_request(verificar_presupuesto_consultas)
+    app.after_request(registrar_metricas)
+    app.teardown_request(guardar_perfil)
+    before_render_template.connect(iniciar_plantilla, app)
+    template_rendered.connect(medir_plantilla, app)
@@ -0,0 +1,186 @@
+"""Métricas de peticiones en formato de texto de Prometheus y perfilado opcional.
+
+`Registro` acumula contadores, indicadores e histogramas en memoria del
+proceso (con varios workers cada uno expone los suyos; Prometheus los
+distingue por instancia). `Perfilador` mide una petición con cProfile o
+muestreando la pila del hilo cada pocos milisegundos; el resultado se guarda
+sólo si la petición superó el umbral configurado.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+BUCKETS_BYTES = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(pares, extra=()):
+    pares = tuple(pares) + tuple(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares) + '}'
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class Registro:
+    def __init__(self, prefijo='ganaderia'):
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._tipos = {}
+        self._ayudas = {}
+        self._valores = defaultdict(float)
+        self._histogramas = {}
+        self._buckets = {}
+
+    def _declarar(self, nombre, tipo, ayuda):
+        nombre = f'{self.prefijo}_{nombre}'
+        if nombre not in self._tipos:
+            self._tipos[nombre] = tipo
+            self._ayudas[nombre] = ayuda
+        return nombre
+
+    def incrementar(self, nombre, ayuda='', valor=1, **etiquetas):
+        nombre = self._declarar(nombre, 'counter', ayuda)
+        with self._lock:
+            self._valores[nombre, tuple(sorted(etiquetas.items()))] += valor
+
+    def fijar(self, nombre, valor, ayuda='', **etiquetas):
+        nombre = self._declarar(nombre, 'gauge', ayuda)
+        with self._lock:
+            self._valores[nombre, tuple(sorted(etiquetas.items()))] = valor
+
+    def observar(self, nombre, valor, ayuda='', buckets=BUCKETS_SEGUNDOS, **etiquetas):
+        nombre = self._declarar(nombre, 'histogram', ayuda)
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._buckets.setdefault(nombre, buckets)
+            conteos = self._histogramas.get(clave)
+            if conteos is None:
+                # Por cada límite: [observaciones <= límite ..., suma, total]
+                conteos = self._histogramas[clave] = [0] * len(self._buckets[nombre]) + [0.0, 0]
+            for posicion, limite in enumerate(self._buckets[nombre]):
+                if valor <= limite:
+                    conteos[posicion] += 1
+            conteos[-2] += valor
+            conteos[-1] += 1
+
+    @contextmanager
+    def medir(self, seccion):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar('seccion_duracion_segundos', time.perf_counter() - inicio,
+                          'Duración de secciones de código instrumentadas.', seccion=seccion)
+
+    def exponer(self):
+        with self._lock:
+            valores = dict(self._valores)
+            histogramas = {clave: list(conteos) for clave, conteos in self._histogramas.items()}
+        lineas = []
+        for nombre in sorted(self._tipos):
+            lineas.append(f'# HELP {nombre} {self._ayudas[nombre]}')
+            lineas.append(f'# TYPE {nombre} {self._tipos[nombre]}')
+            if self._tipos[nombre] != 'histogram':
+                for (metrica, etiquetas), valor in sorted(valores.items()):
+                    if metrica == nombre:
+                        lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+                continue
+            for (metrica, etiquetas), conteos in sorted(histogramas.items()):
+                if metrica != nombre:
+                    continue
+                for limite, cantidad in zip(self._buckets[nombre], conteos):
+                    lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas, [("le", _numero(limite))])} {cantidad}')
+                lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas, [("le", "+Inf")])} {conteos[-1]}')
+                lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(conteos[-2])}')
+                lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {conteos[-1]}')
+        return '\n'.join(lineas) + '\n'
+
+
+class MuestreadorPilas:
+    """Toma la pila de un hilo cada `intervalo` segundos y cuenta las repetidas."""
+
+    def __init__(self, id_hilo, intervalo=0.005):
+        self.id_hilo = id_hilo
+        self.intervalo = intervalo
+        self.muestras = Counter()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+        return self.muestras
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            marco = sys._current_frames().get(self.id_hilo)
+            pila = []
+            while marco is not None:
+                codigo = marco.f_code
+                pila.append(f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})')
+                marco = marco.f_back
+            if pila:
+                self.muestras[';'.join(reversed(pila))] += 1
+
+
+class Perfilador:
+    """Perfil de una petición: 'cprofile' (archivo .prof para pstats/snakeviz) o
+    'pilas' (pilas colapsadas .folded, listas para flamegraph.pl o speedscope)."""
+
+    def __init__(self, modo='pilas', intervalo=0.005):
+        self.modo = modo
+        self.inicio = time.perf_counter()
+        if modo == 'cprofile':
+            import cProfile
+
+            self._perfil = cProfile.Profile()
+            # Sólo puede haber un perfilador activo; si otro hilo lo tiene, se omite.
+            try:
+                self._perfil.enable()
+            except ValueError:
+                self._perfil = None
+        else:
+            self._perfil = MuestreadorPilas(threading.get_ident(), intervalo).iniciar()
+
+    def detener(self):
+        """Detiene el perfil y devuelve la duración de la petición en segundos."""
+        if self.modo == 'cprofile':
+            if self._perfil is not None:
+                self._perfil.disable()
+        else:
+            self._perfil.detener()
+        return time.perf_counter() - self.inicio
+
+    def guardar(self, directorio, nombre):
+        if self._perfil is None or (self.modo == 'pilas' and not self._perfil.muestras):
+            return None
+        os.makedirs(directorio, exist_ok=True)
+        if self.modo == 'cprofile':
+            ruta = os.path.join(directorio, f'{nombre}.prof')
+            self._perfil.dump_stats(ruta)
+            return ruta
+        ruta = os.path.join(directorio, f'{nombre}.folded')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            for pila, cantidad in self._perfil.muestras.most_common():
+                archivo.write(f'{pila} {cantidad}\n')
+        return ruta
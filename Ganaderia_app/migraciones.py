@@ -0,0 +1,184 @@
+"""Migraciones versionadas del esquema.
+
+`db.create_all()` sólo crea tablas nuevas; no agrega columnas ni índices a
+tablas que ya existen. Cada migración se registra con un número de versión y
+se aplica una sola vez, en su propia transacción, dejando constancia en la
+tabla `migracion`. Las migraciones deben ser idempotentes respecto de
+`create_all()`, que en una base nueva ya habrá creado lo declarado en los
+modelos.
+"""
+from datetime import datetime
+
+from sqlalchemy.schema import CreateTable
+
+import archivo
+import busqueda
+import historial
+from extensiones import db
+from modelos import TABLAS_ARCHIVO
+
+MIGRACIONES = []
+
+
+def migracion(version, descripcion):
+    def registrar(funcion):
+        MIGRACIONES.append((version, descripcion, funcion))
+        return funcion
+    return registrar
+
+
+def columnas_de(conexion, tabla):
+    return {fila[1] for fila in conexion.exec_driver_sql(f'PRAGMA table_info("{tabla}")')}
+
+
+def agregar_columna(conexion, tabla, columna, definicion):
+    if columna not in columnas_de(conexion, tabla):
+        conexion.exec_driver_sql(f'ALTER TABLE "{tabla}" ADD COLUMN {columna} {definicion}')
+
+
+def aplicar_migraciones(engine):
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(
+            'CREATE TABLE IF NOT EXISTS migracion ('
+            'version INTEGER PRIMARY KEY, descripcion VARCHAR(200) NOT NULL, aplicada_en DATETIME NOT NULL)'
+        )
+        aplicadas = {fila[0] for fila in conexion.exec_driver_sql('SELECT version FROM migracion')}
+    nuevas = []
+    for version, descripcion, funcion in sorted(MIGRACIONES, key=lambda m: m[0]):
+        if version in aplicadas:
+            continue
+        with engine.begin() as conexion:
+            funcion(conexion)
+            conexion.exec_driver_sql(
+                'INSERT INTO migracion (version, descripcion, aplicada_en) VALUES (?, ?, ?)',
+                (version, descripcion, datetime.utcnow()),
+            )
+        nuevas.append((version, descripcion))
+    return nuevas
+
+
+def migraciones_pendientes(engine):
+    """(version, descripcion) de las migraciones que faltan aplicar, en orden."""
+    with engine.connect() as conexion:
+        existe = conexion.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'migracion'").first()
+        aplicadas = {fila[0] for fila in conexion.exec_driver_sql('SELECT version FROM migracion')} if existe else set()
+    return [(version, descripcion) for version, descripcion, _ in sorted(MIGRACIONES, key=lambda m: m[0]) if version not in aplicadas]
+
+
+@migracion(1, 'Índices compuestos para las rutas más consultadas')
+def indices_rutas_calientes(conexion):
+    for sentencia in (
+        'CREATE INDEX IF NOT EXISTS ix_animal_estado_codigo ON animal (estado, codigo_unico)',
+        'CREATE INDEX IF NOT EXISTS ix_animal_tipo_codigo ON animal (tipo, codigo_unico)',
+        'CREATE INDEX IF NOT EXISTS ix_conteo_user_fecha ON conteo (user_id, fecha_hora)',
+        'CREATE INDEX IF NOT EXISTS ix_conteo_fecha ON conteo (fecha_hora, id)',
+        'CREATE INDEX IF NOT EXISTS ix_alerta_resuelta ON alerta (resuelta, id)',
+        'CREATE INDEX IF NOT EXISTS ix_alerta_conteo ON alerta (conteo_id)',
+        'CREATE INDEX IF NOT EXISTS ix_tratamiento_animal_fecha ON tratamiento (animal_id, fecha_aplicacion)',
+    ):
+        conexion.exec_driver_sql(sentencia)
+    conexion.exec_driver_sql('ANALYZE')
+
+
+@migracion(2, 'Secuencia de codigo_unico por prefijo de tipo')
+def secuencia_codigos(conexion):
+    conexion.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS secuencia_codigo ('
+        'prefijo VARCHAR(10) NOT NULL PRIMARY KEY, ultimo_valor INTEGER NOT NULL)'
+    )
+    # Se parte del mayor número ya emitido, incluidos animales inactivos, para
+    # que ningún código se vuelva a entregar.
+    conexion.exec_driver_sql(
+        "INSERT INTO secuencia_codigo (prefijo, ultimo_valor) "
+        "SELECT substr(codigo_unico, 1, instr(codigo_unico, '-') - 1), "
+        "MAX(CAST(substr(codigo_unico, instr(codigo_unico, '-') + 1) AS INTEGER)) "
+        "FROM animal WHERE instr(codigo_unico, '-') > 0 GROUP BY 1 "
+        "ON CONFLICT (prefijo) DO UPDATE SET ultimo_valor = max(ultimo_valor, excluded.ultimo_valor)"
+    )
+
+
+@migracion(3, 'Fecha de resolución de alertas')
+def alerta_resuelta_en(conexion):
+    agregar_columna(conexion, 'alerta', 'resuelta_en', 'DATETIME')
+
+
+@migracion(4, 'Índices de texto completo (FTS5) para animales, tratamientos y alertas')
+def indices_texto_completo(conexion):
+    busqueda.crear_indices(conexion)
+
+
+@migracion(5, 'Saldo inicial del libro de movimientos de alimento')
+def saldo_inicial_alimentos(conexion):
+    # El stock previo al libro queda como un ajuste, para que la suma de
+    # movimientos coincida con Alimento.stock_kg.
+    conexion.exec_driver_sql(
+        'INSERT INTO movimiento_alimento (alimento_id, tipo, cantidad_kg, stock_resultante, fecha, nota) '
+        "SELECT id, 'Ajuste', stock_kg, stock_kg, ?, 'Saldo inicial' FROM alimento "
+        'WHERE stock_kg <> 0 AND NOT EXISTS (SELECT 1 FROM movimiento_alimento m WHERE m.alimento_id = alimento.id)',
+        (datetime.utcnow(),),
+    )
+
+
+@migracion(6, 'Historial de estados de animales y referencia de los conteos')
+def historial_estados(conexion):
+    historial.crear_historial(conexion)
+    # Los conteos previos no guardaron contra qué rebaño se compararon.
+    agregar_columna(conexion, 'conteo', 'referencia_en', 'DATETIME')
+
+
+@migracion(7, 'Campañas de tratamiento, períodos de retiro y corral de cada animal')
+def campanas_tratamiento(conexion):
+    agregar_columna(conexion, 'tratamiento', 'campana_id', 'INTEGER REFERENCES campana_tratamiento (id)')
+    agregar_columna(conexion, 'tratamiento', 'retiro_hasta', 'DATE')
+    agregar_columna(conexion, 'tratamiento', 'proxima_dosis', 'DATE')
+    agregar_columna(conexion, 'animal', 'corral_id', 'INTEGER REFERENCES corral (id)')
+    for sentencia in (
+        'CREATE INDEX IF NOT EXISTS ix_tratamiento_retiro ON tratamiento (retiro_hasta) WHERE retiro_hasta IS NOT NULL',
+        'CREATE INDEX IF NOT EXISTS ix_tratamiento_proxima_dosis ON tratamiento (proxima_dosis) WHERE proxima_dosis IS NOT NULL',
+        'CREATE INDEX IF NOT EXISTS ix_animal_corral ON animal (corral_id)',
+    ):
+        conexion.exec_driver_sql(sentencia)
+
+
+# Tablas archivables con id propio (animal_faltante tiene clave compuesta).
+TABLAS_AUTOINCREMENT = ('animal', 'tratamiento', 'historial_estado_animal', 'conteo', 'alerta')
+
+
+def reconstruir_con_autoincrement(conexion, tabla):
+    # SQLite no agrega AUTOINCREMENT con ALTER TABLE: se crea la tabla con la
+    # definición del modelo, se copian las filas y se reponen los índices y
+    # triggers de la anterior (FTS e historial incluidos), que DROP TABLE borra.
+    nombre = tabla.name
+    dependientes = [fila[0] for fila in conexion.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL ORDER BY type", (nombre,))]
+    definicion = str(CreateTable(tabla).compile(dialect=conexion.dialect))
+    conexion.exec_driver_sql(definicion.replace(f'CREATE TABLE {nombre} (', f'CREATE TABLE {nombre}_nueva (', 1))
+    existentes = columnas_de(conexion, nombre)
+    columnas = ', '.join(f'"{columna.name}"' for columna in tabla.columns if columna.name in existentes)
+    conexion.exec_driver_sql(f'INSERT INTO "{nombre}_nueva" ({columnas}) SELECT {columnas} FROM "{nombre}"')
+    conexion.exec_driver_sql(f'DROP TABLE "{nombre}"')
+    conexion.exec_driver_sql(f'ALTER TABLE "{nombre}_nueva" RENAME TO "{nombre}"')
+    for sentencia in dependientes:
+        conexion.exec_driver_sql(sentencia)
+
+
+@migracion(8, 'Ids sin reutilizar en las tablas archivables (AUTOINCREMENT)')
+def ids_sin_reutilizar(conexion):
+    # Sin AUTOINCREMENT SQLite vuelve a entregar el id más alto si esa fila se
+    # borró, y el archivado borra justamente filas de la base principal: un
+    # animal nuevo heredaría el historial archivado de otro. La secuencia de
+    # cada tabla parte del mayor id entre la base y el archivo.
+    adjunto = archivo.esta_adjunto(conexion)
+    # SQLite no deja renombrar una tabla mientras una vista apunta a otra inexistente.
+    for tabla in TABLAS_ARCHIVO:
+        conexion.exec_driver_sql(f'DROP VIEW IF EXISTS temp."{tabla.nombre}_historico"')
+    for nombre in TABLAS_AUTOINCREMENT:
+        definicion = conexion.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (nombre,)).scalar()
+        if 'AUTOINCREMENT' not in definicion.upper():
+            reconstruir_con_autoincrement(conexion, db.metadata.tables[nombre])
+        maximo = conexion.exec_driver_sql(f'SELECT MAX(id) FROM main."{nombre}"').scalar() or 0
+        if adjunto:
+            maximo = max(maximo, conexion.exec_driver_sql(f'SELECT MAX(id) FROM {archivo.ESQUEMA}."{nombre}"').scalar() or 0)
+        if not conexion.exec_driver_sql('UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?', (maximo, nombre)).rowcount:
+            conexion.exec_driver_sql('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (nombre, maximo))
+    archivo.crear_vistas(conexion.connection.cursor(), TABLAS_ARCHIVO, adjunto)
@@ -0,0 +1,462 @@
+"""Modelos de la aplicación y operaciones de escritura que comparten las rutas, la API y los comandos."""
+import json
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import MetaData, Table, and_, delete, event, func, insert, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased, foreign
+
+import archivo
+from extensiones import db
+
+class Animal(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    codigo_unico = db.Column(db.String(20), unique=True, nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    nombre = db.Column(db.String(100), nullable=True)
+    estado = db.Column(db.String(50), nullable=False)
+    corral_id = db.Column(db.Integer, db.ForeignKey('corral.id'), nullable=True)
+    __table_args__ = (
+        db.Index('ix_animal_estado_codigo', 'estado', 'codigo_unico'),
+        db.Index('ix_animal_tipo_codigo', 'tipo', 'codigo_unico'),
+        db.Index('ix_animal_corral', 'corral_id'),
+        # Ids sin reutilizar: un animal nuevo no hereda el historial de uno archivado (migración 8).
+        {'sqlite_autoincrement': True},
+    )
+    tratamientos = db.relationship('Tratamiento', backref='animal', lazy=True, cascade="all, delete-orphan")
+
+# Cambios de Animal.estado, escritos por triggers (ver historial.py).
+class HistorialEstadoAnimal(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animal.id'), nullable=False)
+    estado = db.Column(db.String(50), nullable=False)
+    valido_desde = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_historial_estado_animal_desde', 'animal_id', 'valido_desde'), {'sqlite_autoincrement': True})
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password_hash = db.Column(db.String(128), nullable=False)
+    rol = db.Column(db.String(50), nullable=False)
+    conteos = db.relationship('Conteo', backref='cuidador', lazy=True)
+
+class Conteo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    fecha_hora = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    animales_esperados = db.Column(db.Integer, nullable=False)
+    animales_contados = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Momento del rebaño contra el que se comparó (nulo en conteos anteriores al historial).
+    referencia_en = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (
+        db.Index('ix_conteo_user_fecha', 'user_id', 'fecha_hora'),
+        db.Index('ix_conteo_fecha', 'fecha_hora', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+    alerta = db.relationship('Alerta', backref='conteo', uselist=False, cascade="all, delete-orphan")
+
+class Alerta(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    mensaje = db.Column(db.Text, nullable=False)
+    resuelta = db.Column(db.Boolean, default=False, nullable=False)
+    resuelta_en = db.Column(db.DateTime, nullable=True)
+    conteo_id = db.Column(db.Integer, db.ForeignKey('conteo.id'), nullable=False)
+    __table_args__ = (
+        db.Index('ix_alerta_resuelta', 'resuelta', 'id'),
+        db.Index('ix_alerta_conteo', 'conteo_id'),
+        {'sqlite_autoincrement': True},
+    )
+
+class Corral(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), unique=True, nullable=False)
+    capacidad = db.Column(db.Integer, nullable=True)
+    tipo_corral = db.Column(db.String(100), nullable=True)
+
+class Tratamiento(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre_tratamiento = db.Column(db.String(150), nullable=False)
+    descripcion = db.Column(db.Text, nullable=True)
+    fecha_aplicacion = db.Column(db.Date, nullable=False)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animal.id'), nullable=False)
+    campana_id = db.Column(db.Integer, db.ForeignKey('campana_tratamiento.id'), nullable=True)
+    # Fin del período de retiro (no se vende ni se ordeña para consumo) y fecha
+    # de la dosis siguiente. proxima_dosis se anula al aplicar esa dosis (ver
+    # cerrar_dosis_pendientes), así los índices parciales sólo guardan lo vigente.
+    retiro_hasta = db.Column(db.Date, nullable=True)
+    proxima_dosis = db.Column(db.Date, nullable=True)
+    __table_args__ = (
+        db.Index('ix_tratamiento_animal_fecha', 'animal_id', 'fecha_aplicacion'),
+        db.Index('ix_tratamiento_retiro', 'retiro_hasta', sqlite_where=db.text('retiro_hasta IS NOT NULL')),
+        db.Index('ix_tratamiento_proxima_dosis', 'proxima_dosis', sqlite_where=db.text('proxima_dosis IS NOT NULL')),
+        {'sqlite_autoincrement': True},
+    )
+
+# Un mismo tratamiento aplicado de una vez a una selección de animales.
+class CampanaTratamiento(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre_tratamiento = db.Column(db.String(150), nullable=False)
+    descripcion = db.Column(db.Text, nullable=True)
+    fecha_aplicacion = db.Column(db.Date, nullable=False)
+    dias_retiro = db.Column(db.Integer, nullable=True)
+    dias_refuerzo = db.Column(db.Integer, nullable=True)
+    # Descripción legible de la selección (tipo, estado, corral, códigos).
+    criterio = db.Column(db.Text, nullable=False)
+    animales = db.Column(db.Integer, nullable=False, default=0)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    creada_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Tope de los períodos de retiro y refuerzo (diez años).
+MAX_DIAS_TRATAMIENTO = 3650
+
+def periodos_tratamiento(fecha, dias_retiro=None, dias_refuerzo=None):
+    if any(dias and not 0 < dias <= MAX_DIAS_TRATAMIENTO for dias in (dias_retiro, dias_refuerzo)):
+        raise ValueError(f'Los días de retiro y de refuerzo deben estar entre 1 y {MAX_DIAS_TRATAMIENTO}.')
+    try:
+        return {
+            'retiro_hasta': fecha + timedelta(days=dias_retiro) if dias_retiro else None,
+            'proxima_dosis': fecha + timedelta(days=dias_refuerzo) if dias_refuerzo else None,
+        }
+    except OverflowError:
+        raise ValueError('El período de retiro o de refuerzo termina fuera del calendario.')
+
+def cerrar_dosis_pendientes(animales):
+    # Anula la próxima dosis de los tratamientos que ya tienen una dosis
+    # posterior del mismo nombre. `animales` es una lista de ids o un SELECT de
+    # Animal.id; se llama después de insertar, así también se cierran las dosis
+    # anteriores llegadas en el mismo lote y no queda pendiente una dosis cargada
+    # con fecha atrasada.
+    posterior = aliased(Tratamiento)
+    db.session.execute(
+        update(Tratamiento)
+        .where(Tratamiento.proxima_dosis.is_not(None), Tratamiento.animal_id.in_(animales),
+               select(posterior.id).where(posterior.animal_id == Tratamiento.animal_id,
+                                          posterior.nombre_tratamiento == Tratamiento.nombre_tratamiento,
+                                          or_(posterior.fecha_aplicacion > Tratamiento.fecha_aplicacion,
+                                              and_(posterior.fecha_aplicacion == Tratamiento.fecha_aplicacion, posterior.id > Tratamiento.id))).exists())
+        .values(proxima_dosis=None)
+        .execution_options(synchronize_session=False)
+    )
+
+def tratamientos_pendientes(hoy, hasta, animal_id=None):
+    """Tratamientos con retiro vigente en `hoy` o dosis siguiente hasta `hasta`, con su animal.
+
+    Una sola consulta para todo el rebaño: cada condición recorre su índice parcial.
+    """
+    consulta = (select(Tratamiento.id, Tratamiento.animal_id, Animal.codigo_unico, Animal.tipo, Animal.estado, Tratamiento.nombre_tratamiento,
+                       Tratamiento.fecha_aplicacion, Tratamiento.retiro_hasta, Tratamiento.proxima_dosis)
+                .join(Animal, Animal.id == Tratamiento.animal_id)
+                .where(or_(Tratamiento.retiro_hasta >= hoy, Tratamiento.proxima_dosis <= hasta), Animal.estado != 'Inactivo'))
+    if animal_id is not None:
+        consulta = consulta.where(Tratamiento.animal_id == animal_id)
+    return db.session.execute(consulta.order_by(Animal.codigo_unico, Tratamiento.fecha_aplicacion)).all()
+
+# Animales faltantes de cada conteo, en forma estructurada (la alerta sólo
+# guarda el texto). `fecha` se copia del conteo para consultar por rango.
+class AnimalFaltante(db.Model):
+    conteo_id = db.Column(db.Integer, db.ForeignKey('conteo.id'), primary_key=True)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animal.id'), primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)
+    __table_args__ = (
+        db.Index('ix_animal_faltante_animal_fecha', 'animal_id', 'fecha'),
+        db.Index('ix_animal_faltante_fecha', 'fecha'),
+    )
+
+# Tablas que `flask archivar` traslada al archivo, de padres a hijas. Las clases
+# *Historico leen las vistas temporales que unen cada tabla con su archivo; sus
+# tablas van en otro MetaData para que create_all() no las cree.
+TABLAS_ARCHIVO = [archivo.tabla_archivable(modelo.__table__) for modelo in (Animal, Tratamiento, HistorialEstadoAnimal, Conteo, Alerta, AnimalFaltante)]
+
+metadata_vistas = MetaData()
+
+def vista_historica(modelo):
+    columnas = [db.Column(columna.name, columna.type, primary_key=columna.primary_key) for columna in modelo.__table__.columns]
+    return Table(f'{modelo.__tablename__}_historico', metadata_vistas, *columnas, db.Column('archivado', db.Boolean))
+
+class AnimalHistorico(db.Model):
+    __table__ = vista_historica(Animal)
+
+class TratamientoHistorico(db.Model):
+    __table__ = vista_historica(Tratamiento)
+
+class AlertaHistorica(db.Model):
+    __table__ = vista_historica(Alerta)
+
+class ConteoHistorico(db.Model):
+    __table__ = vista_historica(Conteo)
+    cuidador = db.relationship(User, primaryjoin=lambda: foreign(ConteoHistorico.user_id) == User.id, viewonly=True)
+    alerta = db.relationship(AlertaHistorica, primaryjoin=lambda: foreign(AlertaHistorica.conteo_id) == ConteoHistorico.id, uselist=False, viewonly=True)
+
+class AnimalFaltanteHistorico(db.Model):
+    __table__ = vista_historica(AnimalFaltante)
+
+# Resúmenes mantenidos de forma incremental (ver resumenes.py para reconstruirlos)
+class ResumenDiarioCuidador(db.Model):
+    fecha = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    conteos = db.Column(db.Integer, nullable=False, default=0)
+    conteos_con_discrepancia = db.Column(db.Integer, nullable=False, default=0)
+    animales_faltantes = db.Column(db.Integer, nullable=False, default=0)
+
+class ResumenFaltasAnimal(db.Model):
+    animal_id = db.Column(db.Integer, db.ForeignKey('animal.id'), primary_key=True)
+    veces = db.Column(db.Integer, nullable=False, default=0)
+    ultima_vez = db.Column(db.Date, nullable=False)
+    __table_args__ = (
+        db.Index('ix_resumen_faltas_animal_veces', 'veces'),
+    )
+
+class ResumenDiarioAlertas(db.Model):
+    fecha = db.Column(db.Date, primary_key=True)
+    alertas_creadas = db.Column(db.Integer, nullable=False, default=0)
+    alertas_resueltas = db.Column(db.Integer, nullable=False, default=0)
+    segundos_resolucion = db.Column(db.Integer, nullable=False, default=0)
+
+def acumular_resumen(modelo, filas, claves, maximos=()):
+    # Upsert en una sola sentencia: las columnas que no son clave se suman a la
+    # fila existente, salvo las de `maximos`, que conservan el mayor valor.
+    sentencia = sqlite_insert(modelo)
+    valores = {
+        columna: func.max(getattr(modelo, columna), sentencia.excluded[columna]) if columna in maximos
+        else getattr(modelo, columna) + sentencia.excluded[columna]
+        for columna in filas[0] if columna not in claves
+    }
+    db.session.execute(sentencia.on_conflict_do_update(index_elements=list(claves), set_=valores), filas)
+
+class VersionTabla(db.Model):
+    tabla = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    modificada_en = db.Column(db.DateTime, nullable=False)
+
+# Versión por tabla: se incrementa en cada commit que la modifica y permite
+# responder GETs condicionales de la API sin volver a consultar los datos.
+@event.listens_for(Session, 'before_commit')
+def versionar_tablas_modificadas(sesion):
+    sesion.flush()
+    # Las tablas las anota registrar_invalidacion (cache.py) en cada flush o sentencia DML.
+    tablas = sorted(sesion.info.get('tablas_modificadas', ()))
+    if tablas:
+        incrementar_versiones(sesion, tablas)
+
+def incrementar_versiones(ejecutor, tablas):
+    # `ejecutor` es la sesión o una conexión: lo que escribe SQL fuera de la
+    # sesión (p. ej. archivo.archivar) incrementa las versiones en su misma transacción.
+    ahora = datetime.utcnow()
+    sentencia = sqlite_insert(VersionTabla)
+    ejecutor.execute(sentencia.on_conflict_do_update(
+        index_elements=[VersionTabla.tabla],
+        set_={'version': VersionTabla.version + 1, 'modificada_en': sentencia.excluded.modificada_en},
+    ), [{'tabla': tabla, 'version': 1, 'modificada_en': ahora} for tabla in tablas])
+
+def como_dict(objeto):
+    return {columna.name: getattr(objeto, columna.name) for columna in objeto.__table__.columns}
+
+# Sesión de conteo incremental: los conjuntos esperados y presentes se guardan
+# como mapas de bits sobre Animal.id (ver conjunto_bits).
+class SesionConteo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    iniciada_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    estado = db.Column(db.String(20), nullable=False, default='Abierta')
+    esperados = db.Column(db.LargeBinary, nullable=False)
+    presentes = db.Column(db.LargeBinary, nullable=False, default=b'')
+    conteo_id = db.Column(db.Integer, db.ForeignKey('conteo.id'), nullable=True)
+    lotes = db.relationship('LoteEscaneo', backref='sesion', lazy='dynamic', cascade="all, delete-orphan")
+
+def ids_escaneados_validos(ids, esperados=b''):
+    """True si todos los ids están en 1..max(Animal.id).
+
+    El mapa de bits reserva un bit por id hasta el mayor, así que un id
+    arbitrario pediría gigabytes. Los que caben en `esperados` no necesitan consulta.
+    """
+    if not ids:
+        return True
+    if min(ids) < 1:
+        return False
+    return max(ids) < len(esperados or b'') * 8 or max(ids) <= (db.session.scalar(select(func.max(Animal.id))) or 0)
+
+class LoteEscaneo(db.Model):
+    sesion_id = db.Column(db.Integer, db.ForeignKey('sesion_conteo.id'), primary_key=True)
+    numero = db.Column(db.Integer, primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False)
+    recibido_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Claves de idempotencia de los registros subidos por sincronización (ver
+# sincronizacion.py): una clave ya recibida no se vuelve a aplicar.
+class ClaveSincronizacion(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    clave = db.Column(db.String(64), primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=True)
+    recibida_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_clave_sincronizacion_recibida', 'recibida_en'),)
+
+# Contador por prefijo de tipo para generar codigo_unico sin contar la tabla animal.
+class SecuenciaCodigo(db.Model):
+    prefijo = db.Column(db.String(10), primary_key=True)
+    ultimo_valor = db.Column(db.Integer, nullable=False, default=0)
+
+def reservar_codigos(tipo, cantidad=1):
+    # El upsert incrementa y devuelve el contador en una sola sentencia; el
+    # bloqueo de escritura de SQLite lo serializa hasta el commit, así dos
+    # altas simultáneas nunca reciben el mismo número.
+    prefijo = tipo[:3].upper()
+    sentencia = sqlite_insert(SecuenciaCodigo).values(prefijo=prefijo, ultimo_valor=cantidad)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=[SecuenciaCodigo.prefijo],
+        set_={'ultimo_valor': SecuenciaCodigo.ultimo_valor + cantidad},
+    ).returning(SecuenciaCodigo.ultimo_valor)
+    ultimo = db.session.execute(sentencia).scalar_one()
+    return [f"{prefijo}-{numero:03d}" for numero in range(ultimo - cantidad + 1, ultimo + 1)]
+
+# Cola de trabajos en segundo plano (ver trabajos.py).
+class Trabajo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    estado = db.Column(db.String(20), nullable=False, default='Pendiente')
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    max_intentos = db.Column(db.Integer, nullable=False, default=5)
+    proximo_intento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    reservado_por = db.Column(db.String(100), nullable=True)
+    reservado_hasta = db.Column(db.DateTime, nullable=True)
+    creado_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    terminado_en = db.Column(db.DateTime, nullable=True)
+    ultimo_error = db.Column(db.Text, nullable=True)
+    __table_args__ = (db.Index('ix_trabajo_estado_proximo', 'estado', 'proximo_intento'),)
+
+def encolar_notificaciones_alerta(alerta, conteo):
+    # Se insertan en la misma transacción que la alerta; el envío lo hace el trabajador.
+    filas = [{
+        'tipo': canal,
+        'payload': json.dumps({
+            'destino': destino,
+            'asunto': f'Alerta #{alerta.id}: discrepancia en conteo',
+            'mensaje': alerta.mensaje,
+            'alerta_id': alerta.id,
+            'conteo_id': conteo.id,
+        }, ensure_ascii=False),
+    } for canal, destinos in current_app.config['NOTIFICACIONES_ALERTA'].items() for destino in destinos]
+    if filas:
+        db.session.execute(insert(Trabajo), filas)
+
+# --- NUEVOS MODELOS ---
+class Proveedor(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    contacto = db.Column(db.String(100))
+    telefono = db.Column(db.String(20))
+    direccion = db.Column(db.String(200))
+
+class Alimento(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    descripcion = db.Column(db.Text)
+    stock_kg = db.Column(db.Float, nullable=False, default=0)
+
+# Libro de movimientos de alimento (sólo se agregan filas). `cantidad_kg` lleva
+# signo: negativa en consumos. Alimento.stock_kg se actualiza en la misma
+# transacción con un UPDATE atómico, nunca sobrescribiendo el valor leído.
+class MovimientoAlimento(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    alimento_id = db.Column(db.Integer, db.ForeignKey('alimento.id'), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False) # Consumo, Reposición, Ajuste
+    cantidad_kg = db.Column(db.Float, nullable=False)
+    stock_resultante = db.Column(db.Float, nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedor.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    nota = db.Column(db.String(200), nullable=True)
+    __table_args__ = (
+        db.Index('ix_movimiento_alimento_alimento_fecha', 'alimento_id', 'fecha'),
+        db.Index('ix_movimiento_alimento_tipo_fecha', 'tipo', 'fecha'),
+    )
+    alimento = db.relationship('Alimento')
+    proveedor = db.relationship('Proveedor')
+
+class StockInsuficiente(Exception):
+    pass
+
+class AlimentoNoEncontrado(LookupError):
+    pass
+
+def aplicar_movimiento_alimento(alimento_id, tipo, cantidad_kg, user_id=None, proveedor_id=None, nota=None):
+    # `cantidad_kg` es positiva; el tipo decide si descuenta o suma.
+    delta = -cantidad_kg if tipo == 'Consumo' else cantidad_kg
+    stock = db.session.execute(
+        update(Alimento)
+        .where(Alimento.id == alimento_id, Alimento.stock_kg + delta >= 0)
+        .values(stock_kg=Alimento.stock_kg + delta)
+        .returning(Alimento.stock_kg)
+    ).scalar()
+    if stock is None:
+        # El UPDATE no distingue un alimento inexistente de uno sin stock.
+        if db.session.scalar(select(Alimento.id).where(Alimento.id == alimento_id)) is None:
+            raise AlimentoNoEncontrado(f'El alimento {alimento_id} no existe.')
+        raise StockInsuficiente(f'No hay stock suficiente para descontar {cantidad_kg} kg.')
+    movimiento = MovimientoAlimento(alimento_id=alimento_id, tipo=tipo, cantidad_kg=delta, stock_resultante=stock,
+                                    user_id=user_id, proveedor_id=proveedor_id, nota=nota)
+    db.session.add(movimiento)
+    return movimiento
+
+def ajustar_stock_alimento(alimento_id, stock_leido, stock_nuevo, user_id=None, nota=None):
+    # Fija un valor absoluto (inventario físico) sólo si nadie movió el stock
+    # desde que se leyó; si no, devuelve None y el llamador informa el conflicto.
+    if stock_nuevo == stock_leido:
+        return False
+    actualizado = db.session.execute(
+        update(Alimento)
+        .where(Alimento.id == alimento_id, Alimento.stock_kg == stock_leido)
+        .values(stock_kg=stock_nuevo)
+    ).rowcount
+    if not actualizado:
+        return None
+    db.session.add(MovimientoAlimento(alimento_id=alimento_id, tipo='Ajuste', cantidad_kg=stock_nuevo - stock_leido,
+                                      stock_resultante=stock_nuevo, user_id=user_id, nota=nota))
+    return True
+
+def borrar_alimento(alimento):
+    db.session.execute(delete(MovimientoAlimento).where(MovimientoAlimento.alimento_id == alimento.id))
+    db.session.delete(alimento)
+
+class Potrero(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), unique=True, nullable=False)
+    area_hectareas = db.Column(db.Float)
+    estado_pasto = db.Column(db.String(50)) # Ej: Bueno, Regular, Malo
+    ultimo_uso = db.Column(db.Date)
+
+# Rotación de pastoreo: grupos de animales que se mueven juntos y planes
+# semanales generados por planificador.py. Cada asignación lleva un potrero o,
+# si no quedó ninguno disponible, un corral; ambos nulos = grupo sin lugar.
+class GrupoPastoreo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), unique=True, nullable=False)
+    cabezas = db.Column(db.Integer, nullable=False)
+
+class PlanRotacion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    creado_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    fecha_inicio = db.Column(db.Date, nullable=False)
+    semanas = db.Column(db.Integer, nullable=False)
+    descanso_dias = db.Column(db.Integer, nullable=False)
+    carga_por_hectarea = db.Column(db.Float, nullable=False)
+    puntaje = db.Column(db.Float, nullable=False)
+    sin_asignar = db.Column(db.Integer, nullable=False, default=0)
+    duracion_ms = db.Column(db.Float, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+
+class AsignacionRotacion(db.Model):
+    plan_id = db.Column(db.Integer, db.ForeignKey('plan_rotacion.id'), primary_key=True)
+    semana = db.Column(db.Integer, primary_key=True)
+    grupo_id = db.Column(db.Integer, db.ForeignKey('grupo_pastoreo.id'), primary_key=True)
+    potrero_id = db.Column(db.Integer, db.ForeignKey('potrero.id'), nullable=True)
+    corral_id = db.Column(db.Integer, db.ForeignKey('corral.id'), nullable=True)
+
+class Equipamiento(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    estado = db.Column(db.String(50)) # Ej: Operativo, En mantenimiento, Roto
+    fecha_adquisicion = db.Column(db.Date)
+    proximo_mantenimiento = db.Column(db.Date)
@@ -0,0 +1,159 @@
+"""Paginación por cursor (keyset) compartida por los listados gestionar_*.
+
+En lugar de OFFSET, cada página continúa a partir de los valores de orden de
+la última fila mostrada, de modo que el costo de una página no depende del
+número total de filas de la tabla.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from flask import abort, request, url_for
+from sqlalchemy import and_, or_
+
+TAMANO_PAGINA_POR_DEFECTO = 50
+TAMANO_PAGINA_MAXIMO = 200
+
+
+class Pagina:
+    def __init__(self, elementos, tamano, siguiente_cursor=None, cursor_actual=None):
+        self.elementos = elementos
+        self.tamano = tamano
+        self.siguiente_cursor = siguiente_cursor
+        self.cursor_actual = cursor_actual
+
+    @property
+    def hay_siguiente(self):
+        return self.siguiente_cursor is not None
+
+    @property
+    def es_primera(self):
+        return self.cursor_actual is None
+
+    def url_siguiente(self):
+        args = request.args.to_dict()
+        args['cursor'] = self.siguiente_cursor
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    def url_inicio(self):
+        args = request.args.to_dict()
+        args.pop('cursor', None)
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    def __iter__(self):
+        return iter(self.elementos)
+
+    def __len__(self):
+        return len(self.elementos)
+
+
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return {'dt': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'d': valor.isoformat()}
+    return valor
+
+
+def _deserializar(valor):
+    if isinstance(valor, dict):
+        if 'dt' in valor:
+            return datetime.fromisoformat(valor['dt'])
+        if 'd' in valor:
+            return date.fromisoformat(valor['d'])
+    return valor
+
+
+def codificar_cursor(orden, valores):
+    datos = json.dumps({'o': orden, 'v': [_serializar(v) for v in valores]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, orden):
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        valores = [_deserializar(v) for v in datos['v']]
+    except (ValueError, KeyError, TypeError):
+        abort(400, description='Cursor de paginación inválido.')
+    # Un cursor generado con otro orden no es aplicable; se vuelve al inicio.
+    if datos.get('o') != orden:
+        return None
+    return valores
+
+
+def leer_tamano_pagina():
+    try:
+        tamano = int(request.args.get('tamano', TAMANO_PAGINA_POR_DEFECTO))
+    except ValueError:
+        tamano = TAMANO_PAGINA_POR_DEFECTO
+    return max(1, min(tamano, TAMANO_PAGINA_MAXIMO))
+
+
+def leer_fecha(nombre, fin_de_dia=False):
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    try:
+        fecha = datetime.strptime(valor, '%Y-%m-%d')
+    except ValueError:
+        abort(400, description=f"Fecha inválida en '{nombre}', se espera AAAA-MM-DD.")
+    if fin_de_dia:
+        fecha = fecha.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return fecha
+
+
+def leer_orden(ordenes_permitidos, por_defecto):
+    """Devuelve (orden, columna, descendente) según ?orden= y ?dir=.
+
+    `ordenes_permitidos` asocia cada nombre de orden a (columna, descendente
+    por defecto). El nombre devuelto incluye la dirección y se guarda en el
+    cursor para invalidarlo si el usuario cambia el orden.
+    """
+    nombre = request.args.get('orden', por_defecto)
+    if nombre not in ordenes_permitidos:
+        nombre = por_defecto
+    columna, descendente = ordenes_permitidos[nombre]
+    direccion = request.args.get('dir')
+    if direccion in ('asc', 'desc'):
+        descendente = direccion == 'desc'
+    return f"{nombre}:{'desc' if descendente else 'asc'}", columna, descendente
+
+
+def _condicion_keyset(columnas, valores):
+    condiciones = []
+    for i, (columna, descendente) in enumerate(columnas):
+        previas = [c == v for (c, _), v in zip(columnas[:i], valores[:i])]
+        siguiente = columna < valores[i] if descendente else columna > valores[i]
+        condiciones.append(and_(*previas, siguiente))
+    return or_(*condiciones)
+
+
+def paginar(consulta, ordenes_permitidos, por_defecto, clave_primaria):
+    """Aplica orden, cursor y límite a `consulta` y devuelve una Pagina.
+
+    La clave primaria se añade como desempate para que el cursor sea único.
+    Las columnas ordenables deben ser NOT NULL para que la comparación por
+    tuplas sea total.
+    """
+    nombre_orden, columna, descendente = leer_orden(ordenes_permitidos, por_defecto)
+    columnas = [(columna, descendente)]
+    if columna is not clave_primaria:
+        columnas.append((clave_primaria, descendente))
+    tamano = leer_tamano_pagina()
+    cursor = request.args.get('cursor')
+    valores = decodificar_cursor(cursor, nombre_orden)
+    if valores is not None:
+        if len(valores) != len(columnas):
+            abort(400, description='Cursor de paginación inválido.')
+        consulta = consulta.filter(_condicion_keyset(columnas, valores))
+    consulta = consulta.order_by(*[c.desc() if desc else c.asc() for c, desc in columnas])
+    filas = consulta.limit(tamano + 1).all()
+    siguiente_cursor = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        ultima = filas[-1]
+        siguiente_cursor = codificar_cursor(nombre_orden, [getattr(ultima, c.key) for c, _ in columnas])
+    return Pagina(filas, tamano, siguiente_cursor, cursor if valores is not None else None)
@@ -0,0 +1,128 @@
+"""Planificador de rotación de pastoreo.
+
+Cada semana del horizonte se asigna a cada grupo de animales un potrero libre
+que lo soporte y que haya cumplido su descanso; si no queda ninguno, el grupo
+pasa a un corral con capacidad disponible. La asignación semanal es:
+
+1. Puntaje vectorizado de todas las combinaciones grupo × potrero: ajuste
+   entre la capacidad del potrero y el tamaño del grupo (no desperdiciar un
+   potrero grande en un grupo chico), días de descanso acumulados y estado
+   del pasto. Las combinaciones inviables (potrero chico o en descanso)
+   quedan en -inf.
+2. Asignación voraz, de los grupos más grandes a los más chicos.
+3. Búsqueda local: intercambios entre pares de grupos y cambios a potreros
+   libres mientras alguno mejore el puntaje total (evaluados todos a la vez
+   con NumPy).
+
+NumPy se importa al planificar, no al cargar la aplicación.
+"""
+from collections import namedtuple
+
+CALIDAD_PASTO = {'Bueno': 1.0, 'Regular': 0.7, 'Malo': 0.4}
+CALIDAD_POR_DEFECTO = 0.7
+# Cabezas que soporta una hectárea de pasto bueno durante una semana.
+CARGA_POR_HECTAREA = 2.0
+DESCANSO_DIAS = 35
+PESO_AJUSTE = 1.0
+PESO_DESCANSO = 0.5
+PESO_CALIDAD = 0.5
+MAX_ITERACIONES_BUSQUEDA = 200
+
+Grupo = namedtuple('Grupo', 'id cabezas')
+PotreroPlan = namedtuple('PotreroPlan', 'id area_hectareas estado_pasto dias_sin_uso')
+CorralPlan = namedtuple('CorralPlan', 'id capacidad')
+Asignacion = namedtuple('Asignacion', 'semana grupo_id potrero_id corral_id')
+
+
+def puntajes(np, cabezas, capacidad, descanso, calidad, descanso_dias):
+    """Matriz grupos × potreros; -inf donde el potrero no sirve esta semana."""
+    ajuste = capacidad[None, :] / cabezas[:, None]
+    viable = (ajuste >= 1) & (descanso[None, :] >= descanso_dias)
+    with np.errstate(divide='ignore'):
+        puntaje = (
+            -PESO_AJUSTE * np.abs(np.log(ajuste))
+            + PESO_DESCANSO * np.minimum(descanso / descanso_dias, 2)[None, :]
+            + PESO_CALIDAD * calidad[None, :]
+        )
+    return np.where(viable, puntaje, -np.inf)
+
+
+def asignar_semana(np, puntaje, orden):
+    """Voraz + búsqueda local. Devuelve el índice de potrero de cada grupo (-1 si ninguno)."""
+    grupos, potreros = puntaje.shape
+    asignado = np.full(grupos, -1)
+    libre = np.ones(potreros, dtype=bool)
+    for grupo in orden:
+        fila = np.where(libre, puntaje[grupo], -np.inf)
+        mejor = int(np.argmax(fila)) if potreros else 0
+        if potreros and np.isfinite(fila[mejor]):
+            asignado[grupo] = mejor
+            libre[mejor] = False
+
+    for _ in range(MAX_ITERACIONES_BUSQUEDA):
+        con_potrero = np.flatnonzero(asignado >= 0)
+        if not len(con_potrero):
+            break
+        actual = puntaje[con_potrero, asignado[con_potrero]]
+        # Intercambio entre pares: ganancia[i, j] de que i y j se cambien de potrero.
+        cruzado = puntaje[np.ix_(con_potrero, asignado[con_potrero])]
+        ganancia_par = cruzado + cruzado.T - actual[:, None] - actual[None, :]
+        np.fill_diagonal(ganancia_par, -np.inf)
+        # Cambio a un potrero libre.
+        libres = np.flatnonzero(libre)
+        ganancia_libre = puntaje[np.ix_(con_potrero, libres)] - actual[:, None] if len(libres) else np.empty((len(con_potrero), 0))
+        mejor_par = np.unravel_index(np.argmax(ganancia_par), ganancia_par.shape)
+        valor_par = ganancia_par[mejor_par]
+        valor_libre = -np.inf
+        if ganancia_libre.size:
+            mejor_libre = np.unravel_index(np.argmax(ganancia_libre), ganancia_libre.shape)
+            valor_libre = ganancia_libre[mejor_libre]
+        if max(valor_par, valor_libre) <= 1e-9:
+            break
+        if valor_par >= valor_libre:
+            i, j = con_potrero[mejor_par[0]], con_potrero[mejor_par[1]]
+            asignado[i], asignado[j] = asignado[j], asignado[i]
+        else:
+            grupo, destino = con_potrero[mejor_libre[0]], libres[mejor_libre[1]]
+            libre[asignado[grupo]] = True
+            libre[destino] = False
+            asignado[grupo] = destino
+    return asignado
+
+
+def planificar(grupos, potreros, corrales, semanas, descanso_dias=DESCANSO_DIAS, carga_por_hectarea=CARGA_POR_HECTAREA):
+    """Devuelve (asignaciones, puntaje_total, sin_asignar) para `semanas` semanas."""
+    import numpy as np
+
+    if not grupos:
+        return [], 0.0, 0
+    cabezas = np.array([max(grupo.cabezas, 1) for grupo in grupos], dtype=float)
+    calidad = np.array([CALIDAD_PASTO.get(potrero.estado_pasto, CALIDAD_POR_DEFECTO) for potrero in potreros], dtype=float)
+    capacidad = np.array([(potrero.area_hectareas or 0) for potrero in potreros], dtype=float) * calidad * carga_por_hectarea
+    # Sin fecha de último uso se asume descansado.
+    descanso = np.array([descanso_dias if potrero.dias_sin_uso is None else potrero.dias_sin_uso for potrero in potreros], dtype=float)
+    orden = np.argsort(-cabezas, kind='stable')
+
+    asignaciones, total, sin_asignar = [], 0.0, 0
+    for semana in range(semanas):
+        puntaje = puntajes(np, cabezas, capacidad, descanso, calidad, descanso_dias)
+        asignado = asignar_semana(np, puntaje, orden)
+        con_potrero = asignado >= 0
+        total += float(puntaje[np.flatnonzero(con_potrero), asignado[con_potrero]].sum())
+        ocupacion = {corral.id: 0 for corral in corrales}
+        for posicion in orden.tolist():
+            grupo = grupos[posicion]
+            if con_potrero[posicion]:
+                asignaciones.append(Asignacion(semana, grupo.id, potreros[asignado[posicion]].id, None))
+                continue
+            corral = next((corral for corral in corrales if ocupacion[corral.id] + grupo.cabezas <= (corral.capacidad or 0)), None)
+            if corral is None:
+                sin_asignar += 1
+                asignaciones.append(Asignacion(semana, grupo.id, None, None))
+            else:
+                ocupacion[corral.id] += grupo.cabezas
+                asignaciones.append(Asignacion(semana, grupo.id, None, corral.id))
+        usados = np.zeros(len(potreros), dtype=bool)
+        usados[asignado[con_potrero]] = True
+        descanso = np.where(usados, 0, descanso + 7)
+    return asignaciones, round(total, 3), sin_asignar
@@ -0,0 +1,70 @@
+"""Reconstrucción de las tablas de resumen de conteos y alertas.
+
+En operación normal los resúmenes se actualizan de forma incremental desde
+`registrar_conteo` y `resolver_alerta`. Este módulo los recalcula desde el
+historial completo (comando `flask reconstruir-resumenes`), útil tras importar
+datos antiguos o si se sospecha de una inconsistencia. Se leen las vistas
+*_historico (archivo.py) para no perder lo que ya se movió al archivo.
+"""
+import re
+
+PATRON_CODIGOS = re.compile(r'Faltan \d+ animales: (.*)$', re.DOTALL)
+
+
+def codigos_en_mensaje(mensaje):
+    coincidencia = PATRON_CODIGOS.search(mensaje or '')
+    if not coincidencia:
+        return []
+    return [codigo.strip() for codigo in coincidencia.group(1).split(',') if codigo.strip()]
+
+
+def completar_animales_faltantes(conexion):
+    # Los conteos anteriores a la tabla animal_faltante sólo tienen los códigos
+    # dentro del texto de la alerta.
+    pendientes = conexion.exec_driver_sql(
+        'SELECT alerta.conteo_id, alerta.mensaje, conteo.fecha_hora FROM alerta '
+        'JOIN conteo ON conteo.id = alerta.conteo_id '
+        'WHERE NOT EXISTS (SELECT 1 FROM animal_faltante af WHERE af.conteo_id = alerta.conteo_id)'
+    ).all()
+    if not pendientes:
+        return 0
+    ids_por_codigo = dict(conexion.exec_driver_sql('SELECT codigo_unico, id FROM animal').all())
+    filas = []
+    for conteo_id, mensaje, fecha_hora in pendientes:
+        for codigo in codigos_en_mensaje(mensaje):
+            if codigo in ids_por_codigo:
+                filas.append((conteo_id, ids_por_codigo[codigo], str(fecha_hora)[:10]))
+    if filas:
+        conexion.exec_driver_sql(
+            'INSERT OR IGNORE INTO animal_faltante (conteo_id, animal_id, fecha) VALUES (?, ?, ?)', filas
+        )
+    return len(filas)
+
+
+def reconstruir(conexion):
+    insertados = completar_animales_faltantes(conexion)
+    for tabla in ('resumen_diario_cuidador', 'resumen_faltas_animal', 'resumen_diario_alertas'):
+        conexion.exec_driver_sql(f'DELETE FROM {tabla}')
+    conexion.exec_driver_sql(
+        'INSERT INTO resumen_diario_cuidador (fecha, user_id, conteos, conteos_con_discrepancia, animales_faltantes) '
+        'SELECT date(conteo.fecha_hora), conteo.user_id, COUNT(*), COUNT(alerta.id), '
+        'COALESCE(SUM((SELECT COUNT(*) FROM animal_faltante_historico af WHERE af.conteo_id = conteo.id)), 0) '
+        'FROM conteo_historico conteo LEFT JOIN alerta_historico alerta ON alerta.conteo_id = conteo.id '
+        'GROUP BY date(conteo.fecha_hora), conteo.user_id'
+    )
+    conexion.exec_driver_sql(
+        'INSERT INTO resumen_faltas_animal (animal_id, veces, ultima_vez) '
+        'SELECT animal_id, COUNT(*), MAX(fecha) FROM animal_faltante_historico GROUP BY animal_id'
+    )
+    conexion.exec_driver_sql(
+        'INSERT INTO resumen_diario_alertas (fecha, alertas_creadas, alertas_resueltas, segundos_resolucion) '
+        'SELECT fecha, SUM(creadas), SUM(resueltas), SUM(segundos) FROM ('
+        '  SELECT date(conteo.fecha_hora) AS fecha, 1 AS creadas, 0 AS resueltas, 0 AS segundos '
+        '  FROM alerta_historico alerta JOIN conteo_historico conteo ON conteo.id = alerta.conteo_id '
+        '  UNION ALL '
+        '  SELECT date(alerta.resuelta_en), 0, 1, '
+        "  CAST(round((julianday(alerta.resuelta_en) - julianday(conteo.fecha_hora)) * 86400) AS INTEGER) "
+        '  FROM alerta_historico alerta JOIN conteo_historico conteo ON conteo.id = alerta.conteo_id WHERE alerta.resuelta_en IS NOT NULL'
+        ') GROUP BY fecha'
+    )
+    return insertados
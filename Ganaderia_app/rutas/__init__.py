@@ -0,0 +1,37 @@
+"""Blueprints de la aplicación, uno por dominio.
+
+- auth: inicio de sesión, registro, dashboards y usuarios.
+- animales: animales, importación, historial médico, composición del rebaño y búsqueda.
+- conteos: conteos, sesiones de escaneo, alertas, reportes, tendencias y exportaciones.
+- inventario: proveedores, alimentos (movimientos y pronóstico) y equipamiento.
+- infraestructura: corrales, potreros y planificación de pastoreo.
+- api: API JSON v1.
+- sincronizacion: subida en lote del trabajo hecho sin conexión (/api/v1/sincronizar).
+- operaciones: cola de trabajos, caché y /metrics.
+
+`crear_app` importa sólo los módulos listados en la configuración BLUEPRINTS,
+al crear la aplicación y no al importar app.py. Las plantillas HTML enlazan
+entre dominios, así que un subconjunto sólo sirve para procesos dedicados a la
+API (GANADERIA_BLUEPRINTS='["api"]').
+"""
+import importlib
+
+from flask import request
+
+from extensiones import cache
+from modelos import como_dict
+
+
+def registrar_blueprints(app):
+    for nombre in app.config['BLUEPRINTS']:
+        app.register_blueprint(importlib.import_module(f'rutas.{nombre}').bp)
+
+
+def pagina_en_cache(etiquetas, construir, serializar=como_dict):
+    # Guarda la página ya serializada; los templates acceden igual a
+    # `fila.campo` sobre diccionarios que sobre modelos.
+    def cargar():
+        pagina = construir()
+        pagina.elementos = [serializar(elemento) for elemento in pagina.elementos]
+        return pagina
+    return cache.memorizar(f'{request.endpoint}:{request.query_string.decode()}', etiquetas, cargar)
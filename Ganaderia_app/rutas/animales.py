@@ -0,0 +1,317 @@
+"""Animales, importación masiva, historial médico, composición del rebaño y búsqueda."""
+import csv
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+from sqlalchemy import insert, literal, select
+
+import busqueda
+import historial
+from extensiones import db
+from importacion import FORMATOS, FilaInvalida, InformeImportacion, detectar_formato, en_lotes, leer_filas, validar_fila
+from modelos import Animal, AnimalHistorico, CampanaTratamiento, Corral, Tratamiento, TratamientoHistorico, cerrar_dosis_pendientes, periodos_tratamiento, reservar_codigos, tratamientos_pendientes
+from paginacion import paginar, leer_tamano_pagina
+
+bp = Blueprint('animales', __name__)
+
+# CRUD Animales
+@bp.route('/gestionar_animales')
+def gestionar_animales():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    consulta = Animal.query
+    estado = request.args.get('estado')
+    consulta = consulta.filter(Animal.estado == estado) if estado else consulta.filter(Animal.estado != 'Inactivo')
+    if request.args.get('tipo'):
+        consulta = consulta.filter(Animal.tipo == request.args['tipo'])
+    pagina = paginar(consulta, {
+        'codigo': (Animal.codigo_unico, False),
+        'tipo': (Animal.tipo, False),
+        'estado': (Animal.estado, False),
+        'id': (Animal.id, True),
+    }, 'codigo', Animal.id)
+    return render_template('gestionar_animales.html', animales=pagina.elementos, pagina=pagina)
+
+@bp.route('/animal/add', methods=['GET', 'POST'])
+def add_animal():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        tipo = request.form['tipo']
+        codigo_unico = reservar_codigos(tipo)[0]
+        nuevo_animal = Animal(codigo_unico=codigo_unico, tipo=tipo, nombre=request.form['nombre'] or None, estado=request.form['estado'],
+                              corral_id=request.form.get('corral_id', type=int))
+        db.session.add(nuevo_animal)
+        db.session.commit()
+        return redirect(url_for('animales.gestionar_animales'))
+    return render_template('add_animal.html', corrales=Corral.query.order_by(Corral.nombre).all())
+
+def procesar_importacion_animales(flujo, formato, tamano_lote=None):
+    # Cada lote es una transacción: un solo INSERT multi-fila y un commit, en
+    # lugar de un commit por animal.
+    tamano_lote = max(1, min(tamano_lote or current_app.config['IMPORTACION_TAMANO_LOTE'], current_app.config['IMPORTACION_TAMANO_LOTE_MAXIMO']))
+    informe = InformeImportacion()
+    try:
+        for lote in en_lotes(leer_filas(flujo, formato), tamano_lote):
+            validas = []
+            for linea, fila in lote:
+                try:
+                    validas.append(validar_fila(fila))
+                except FilaInvalida as error:
+                    informe.registrar_error(linea, str(error))
+            if not validas:
+                continue
+            por_tipo = defaultdict(list)
+            for datos in validas:
+                por_tipo[datos['tipo']].append(datos)
+            for tipo, filas in por_tipo.items():
+                for datos, codigo in zip(filas, reservar_codigos(tipo, len(filas))):
+                    datos['codigo_unico'] = codigo
+            db.session.execute(insert(Animal), validas)
+            db.session.commit()
+            informe.insertados += len(validas)
+            informe.lotes += 1
+    except (UnicodeDecodeError, csv.Error) as error:
+        db.session.rollback()
+        informe.registrar_error(None, f'Archivo ilegible, importación detenida: {error}')
+    return informe
+
+@bp.route('/animal/importar', methods=['GET', 'POST'])
+def importar_animales():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if not archivo or not archivo.filename:
+            flash('Selecciona un archivo CSV o NDJSON.', 'warning')
+            return redirect(url_for('animales.importar_animales'))
+        formato = request.form.get('formato') or detectar_formato(archivo.filename)
+        if formato not in FORMATOS:
+            flash('Formato de archivo no soportado.', 'danger')
+            return redirect(url_for('animales.importar_animales'))
+        tamano_lote = request.form.get('tamano_lote', type=int)
+        informe = procesar_importacion_animales(archivo.stream, formato, tamano_lote)
+        if request.accept_mimetypes.best == 'application/json':
+            return informe.como_dict()
+        return render_template('importar_animales.html', informe=informe)
+    return render_template('importar_animales.html', informe=None)
+
+@bp.route('/animal/edit/<int:animal_id>', methods=['GET', 'POST'])
+def edit_animal(animal_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    animal_a_editar = Animal.query.get_or_404(animal_id)
+    if request.method == 'POST':
+        animal_a_editar.tipo, animal_a_editar.nombre, animal_a_editar.estado = request.form['tipo'], request.form['nombre'] or None, request.form['estado']
+        animal_a_editar.corral_id = request.form.get('corral_id', type=int)
+        db.session.commit()
+        return redirect(url_for('animales.gestionar_animales'))
+    return render_template('edit_animal.html', animal=animal_a_editar, corrales=Corral.query.order_by(Corral.nombre).all())
+
+@bp.route('/animal/delete/<int:animal_id>')
+def delete_animal(animal_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    animal_a_borrar = Animal.query.get_or_404(animal_id)
+    animal_a_borrar.estado = 'Inactivo'
+    db.session.commit()
+    flash(f'El animal {animal_a_borrar.codigo_unico} ha sido marcado como inactivo.', 'success')
+    return redirect(url_for('animales.gestionar_animales'))
+
+# CRUD Tratamientos (Historial Médico)
+def leer_dias(campo):
+    dias = request.form.get(campo, type=int)
+    return dias if dias and dias > 0 else None
+
+def leer_periodos(fecha):
+    # Los días fuera de rango se informan con un flash; devuelve None en ese caso.
+    try:
+        return periodos_tratamiento(fecha, leer_dias('dias_retiro'), leer_dias('dias_refuerzo'))
+    except ValueError as error:
+        flash(str(error), 'warning')
+        return None
+
+def leer_fecha_formulario(campo):
+    try:
+        return datetime.strptime(request.form.get(campo, ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+@bp.route('/animal/<int:animal_id>/historial')
+def historial_medico(animal_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    # Por las vistas históricas: también abre el historial de animales archivados (sólo lectura).
+    animal = AnimalHistorico.query.get_or_404(animal_id)
+    consulta = TratamientoHistorico.query.filter_by(animal_id=animal.id)
+    pagina = paginar(consulta, {'fecha': (TratamientoHistorico.fecha_aplicacion, True)}, 'fecha', TratamientoHistorico.id)
+    # Retiros y dosis pendientes del animal por los índices parciales, aunque
+    # el tratamiento que los fija no esté en la página mostrada.
+    hoy = datetime.utcnow().date()
+    pendientes = tratamientos_pendientes(hoy, hoy + timedelta(days=current_app.config['TRATAMIENTOS_HORIZONTE_DIAS']), animal.id)
+    return render_template('historial_medico.html', animal=animal, tratamientos=pagina.elementos, pagina=pagina, pendientes=pendientes, hoy=hoy)
+
+@bp.route('/animal/<int:animal_id>/add_tratamiento', methods=['GET', 'POST'])
+def add_tratamiento(animal_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    animal = Animal.query.get_or_404(animal_id)
+    if request.method == 'POST':
+        fecha_str = request.form['fecha_aplicacion']
+        fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
+        periodos = leer_periodos(fecha)
+        if periodos is None:
+            return redirect(url_for('animales.add_tratamiento', animal_id=animal.id))
+        nuevo_tratamiento = Tratamiento(nombre_tratamiento=request.form['nombre_tratamiento'], descripcion=request.form['descripcion'], fecha_aplicacion=fecha, animal_id=animal.id, **periodos)
+        db.session.add(nuevo_tratamiento)
+        db.session.flush()
+        cerrar_dosis_pendientes([animal.id])
+        db.session.commit()
+        flash('Tratamiento añadido al historial exitosamente.', 'success')
+        return redirect(url_for('animales.historial_medico', animal_id=animal.id))
+    return render_template('add_tratamiento.html', animal=animal)
+
+@bp.route('/tratamiento/edit/<int:tratamiento_id>', methods=['GET', 'POST'])
+def edit_tratamiento(tratamiento_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    tratamiento_a_editar = Tratamiento.query.get_or_404(tratamiento_id)
+    if request.method == 'POST':
+        fecha_str = request.form['fecha_aplicacion']
+        tratamiento_a_editar.fecha_aplicacion = datetime.strptime(fecha_str, '%Y-%m-%d').date()
+        tratamiento_a_editar.nombre_tratamiento = request.form['nombre_tratamiento']
+        tratamiento_a_editar.descripcion = request.form['descripcion']
+        tratamiento_a_editar.retiro_hasta = leer_fecha_formulario('retiro_hasta')
+        tratamiento_a_editar.proxima_dosis = leer_fecha_formulario('proxima_dosis')
+        # Con la fecha o el nombre cambiados puede quedar antes de otra dosis (o dejar atrás a otra).
+        db.session.flush()
+        cerrar_dosis_pendientes([tratamiento_a_editar.animal_id])
+        db.session.commit()
+        flash('Tratamiento actualizado.', 'success')
+        return redirect(url_for('animales.historial_medico', animal_id=tratamiento_a_editar.animal_id))
+    return render_template('edit_tratamiento.html', tratamiento=tratamiento_a_editar)
+
+@bp.route('/tratamiento/delete/<int:tratamiento_id>')
+def delete_tratamiento(tratamiento_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    tratamiento_a_borrar = Tratamiento.query.get_or_404(tratamiento_id)
+    animal_id = tratamiento_a_borrar.animal_id
+    db.session.delete(tratamiento_a_borrar)
+    db.session.commit()
+    flash('Registro de tratamiento borrado permanentemente.', 'success')
+    return redirect(url_for('animales.historial_medico', animal_id=animal_id))
+
+# Campañas: un tratamiento para toda una selección de animales
+def seleccion_campana(formulario):
+    # Devuelve las condiciones sobre Animal, los códigos pedidos y el criterio legible.
+    condiciones, criterio = [], []
+    if formulario.get('tipo'):
+        condiciones.append(Animal.tipo == formulario['tipo'])
+        criterio.append(f"tipo {formulario['tipo']}")
+    if formulario.get('estado'):
+        condiciones.append(Animal.estado == formulario['estado'])
+        criterio.append(f"estado {formulario['estado']}")
+    else:
+        condiciones.append(Animal.estado != 'Inactivo')
+    corral = db.session.get(Corral, formulario.get('corral_id', type=int)) if formulario.get('corral_id', type=int) else None
+    if corral:
+        condiciones.append(Animal.corral_id == corral.id)
+        criterio.append(f'corral {corral.nombre}')
+    codigos = sorted(set(formulario.get('codigos', '').replace(',', ' ').split()))
+    if codigos:
+        condiciones.append(Animal.codigo_unico.in_(codigos))
+        criterio.append(f'{len(codigos)} código(s)')
+    return condiciones, codigos, ', '.join(criterio) or 'todos los animales activos'
+
+@bp.route('/tratamiento/campanas', methods=['GET', 'POST'])
+def campanas_tratamiento():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        nombre = request.form['nombre_tratamiento'].strip()
+        try:
+            fecha = datetime.strptime(request.form['fecha_aplicacion'], '%Y-%m-%d').date()
+        except ValueError:
+            fecha = None
+        if not nombre or not fecha:
+            flash('Indica el tratamiento y la fecha de aplicación.', 'warning')
+            return redirect(url_for('animales.campanas_tratamiento'))
+        periodos = leer_periodos(fecha)
+        if periodos is None:
+            return redirect(url_for('animales.campanas_tratamiento'))
+        condiciones, codigos, criterio = seleccion_campana(request.form)
+        desconocidos = sorted(set(codigos) - set(db.session.scalars(select(Animal.codigo_unico).where(Animal.codigo_unico.in_(codigos))))) if codigos else []
+        dias_retiro, dias_refuerzo = leer_dias('dias_retiro'), leer_dias('dias_refuerzo')
+        campana = CampanaTratamiento(nombre_tratamiento=nombre, descripcion=request.form.get('descripcion') or None, fecha_aplicacion=fecha,
+                                     dias_retiro=dias_retiro, dias_refuerzo=dias_refuerzo, criterio=criterio, user_id=session['user_id'])
+        db.session.add(campana)
+        db.session.flush()
+        # Un solo INSERT ... SELECT: la base genera una fila por animal seleccionado.
+        tabla = Tratamiento.__table__
+        valores = {'nombre_tratamiento': nombre, 'descripcion': campana.descripcion, 'fecha_aplicacion': fecha, 'campana_id': campana.id,
+                   **periodos}
+        seleccion = select(Animal.id, *[literal(valor, tabla.c[columna].type) for columna, valor in valores.items()]).where(*condiciones)
+        campana.animales = db.session.execute(insert(tabla).from_select(['animal_id', *valores], seleccion)).rowcount
+        if not campana.animales:
+            db.session.rollback()
+            flash('Ningún animal coincide con la selección; no se registró la campaña.', 'warning')
+            return redirect(url_for('animales.campanas_tratamiento'))
+        cerrar_dosis_pendientes(select(Animal.id).where(*condiciones))
+        db.session.commit()
+        flash(f'Campaña "{nombre}" aplicada a {campana.animales} animal(es).', 'success')
+        if desconocidos:
+            flash(f"Códigos no encontrados: {', '.join(desconocidos)}.", 'warning')
+        return redirect(url_for('animales.campanas_tratamiento'))
+    pagina = paginar(CampanaTratamiento.query, {'id': (CampanaTratamiento.id, True)}, 'id', CampanaTratamiento.id)
+    return render_template('campanas_tratamiento.html', campanas=pagina.elementos, pagina=pagina, corrales=Corral.query.order_by(Corral.nombre).all())
+
+@bp.route('/tratamiento/pendientes')
+def ver_tratamientos_pendientes():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    hoy = datetime.utcnow().date()
+    dias = max(0, min(request.args.get('dias', current_app.config['TRATAMIENTOS_HORIZONTE_DIAS'], type=int), 365))
+    hasta = hoy + timedelta(days=dias)
+    filas = tratamientos_pendientes(hoy, hasta)
+    en_retiro = [fila for fila in filas if fila.retiro_hasta and fila.retiro_hasta >= hoy]
+    dosis = [fila for fila in filas if fila.proxima_dosis and fila.proxima_dosis <= hasta]
+    if request.accept_mimetypes.best == 'application/json':
+        serializar = lambda fila: {clave: valor.isoformat() if isinstance(valor, date) else valor for clave, valor in fila._mapping.items()}
+        return jsonify({'hoy': hoy.isoformat(), 'hasta': hasta.isoformat(), 'en_retiro': [serializar(fila) for fila in en_retiro], 'dosis': [serializar(fila) for fila in dosis]})
+    return render_template('tratamientos_pendientes.html', en_retiro=en_retiro, dosis=dosis, hoy=hoy, hasta=hasta, dias=dias)
+
+@bp.route('/rebano/composicion')
+def composicion_rebano():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    valor = request.args.get('momento')
+    try:
+        momento = datetime.fromisoformat(valor) if valor else datetime.utcnow()
+    except ValueError:
+        abort(400, description="Momento inválido en 'momento', se espera AAAA-MM-DD o AAAA-MM-DDTHH:MM.")
+    if valor and len(valor) == 10:
+        # Una fecha sola se entiende como el cierre de ese día.
+        momento = momento.replace(hour=23, minute=59, second=59, microsecond=999999)
+    conexion = db.session.connection()
+    composicion = historial.composicion_en(conexion, momento, historico=True)
+    en_rebano = historial.rebano_en(conexion, momento, historico=True)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'momento': momento.isoformat(), 'composicion': composicion, 'en_rebano': [{'id': id_, 'codigo_unico': codigo} for id_, codigo in en_rebano]})
+    return render_template('composicion_rebano.html', momento=momento, composicion=composicion, en_rebano=en_rebano,
+                           inicio_historial=historial.inicio_historial(conexion, historico=True))
+
+# Búsqueda de texto completo (ver busqueda.py). Los resultados van ordenados
+# por relevancia, así que se paginan por número de página.
+@bp.route('/buscar')
+def buscar():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    texto = request.args.get('q', '').strip()
+    entidad = request.args.get('en', 'animales')
+    if entidad not in busqueda.CONSULTAS:
+        abort(404)
+    tamano = leer_tamano_pagina()
+    numero_pagina = max(request.args.get('pagina', 1, type=int), 1)
+    expresion = busqueda.expresion_fts(texto)
+    resultados, totales = [], {}
+    if expresion:
+        conexion = db.session.connection()
+        totales = busqueda.totales(conexion, expresion)
+        resultados = busqueda.buscar(conexion, entidad, expresion, tamano + 1, (numero_pagina - 1) * tamano)
+    hay_siguiente = len(resultados) > tamano
+    resultados = resultados[:tamano]
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'q': texto, 'en': entidad, 'pagina': numero_pagina, 'totales': totales,
+                        'resultados': [{clave: str(valor) if clave.endswith('resaltado') else valor for clave, valor in fila.items()} for fila in resultados],
+                        'hay_siguiente': hay_siguiente})
+    return render_template('buscar.html', texto=texto, entidad=entidad, resultados=resultados, totales=totales,
+                           numero_pagina=numero_pagina, hay_siguiente=hay_siguiente)
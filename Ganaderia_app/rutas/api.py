@@ -0,0 +1,239 @@
+"""API JSON v1 sobre los modelos principales."""
+import zlib
+from datetime import date, datetime, timezone
+
+from flask import Blueprint, Response, abort, jsonify, request, session
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
+
+from extensiones import db
+from modelos import Alerta, Alimento, AlimentoNoEncontrado, Animal, Conteo, Corral, Equipamiento, GrupoPastoreo, MovimientoAlimento, Potrero, Proveedor, StockInsuficiente, Tratamiento, VersionTabla, ajustar_stock_alimento, aplicar_movimiento_alimento, borrar_alimento, cerrar_dosis_pendientes, como_dict, reservar_codigos
+from paginacion import paginar
+from rutas.conteos import marcar_alerta_resuelta, registrar_conteo
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Cada recurso declara su modelo, los roles que pueden leerlo y escribirlo,
+# los campos editables y los filtros por igualdad que acepta el listado.
+RECURSOS_API = {
+    'animales': {'modelo': Animal, 'lectura': ('Administrador', 'Cuidador'), 'escritura': ('Administrador',),
+                 'metodos': ('GET', 'POST', 'PATCH', 'DELETE'), 'campos': ('tipo', 'nombre', 'estado', 'corral_id'), 'filtros': ('estado', 'tipo', 'corral_id')},
+    'conteos': {'modelo': Conteo, 'lectura': ('Administrador', 'Cuidador'), 'escritura': ('Cuidador',),
+                'metodos': ('GET', 'POST'), 'campos': (), 'filtros': ('user_id',)},
+    'alertas': {'modelo': Alerta, 'lectura': ('Administrador',), 'escritura': ('Administrador',),
+                'metodos': ('GET', 'PATCH'), 'campos': ('resuelta',), 'filtros': ('resuelta', 'conteo_id')},
+    'tratamientos': {'modelo': Tratamiento, 'lectura': ('Administrador',), 'escritura': ('Administrador',),
+                     'metodos': ('GET', 'POST', 'PATCH', 'DELETE'), 'campos': ('nombre_tratamiento', 'descripcion', 'fecha_aplicacion', 'animal_id', 'retiro_hasta', 'proxima_dosis'),
+                     'filtros': ('animal_id', 'campana_id')},
+    'corrales': {'modelo': Corral, 'lectura': ('Administrador',), 'escritura': ('Administrador',),
+                 'metodos': ('GET', 'POST', 'PATCH', 'DELETE'), 'campos': ('nombre', 'capacidad', 'tipo_corral'), 'filtros': ('tipo_corral',)},
+    'potreros': {'modelo': Potrero, 'lectura': ('Administrador',), 'escritura': ('Administrador',),
+                 'metodos': ('GET', 'POST', 'PATCH', 'DELETE'), 'campos': ('nombre', 'area_hectareas', 'estado_pasto', 'ultimo_uso'), 'filtros': ('estado_pasto',)},
+    'grupos_pastoreo': {'modelo': GrupoPastoreo, 'lectura': ('Administrador',), 'escritura': ('Administrador',),
+                        'metodos': ('GET', 'POST', 'PATCH'), 'campos': ('nombre', 'cabezas'), 'filtros': ()},
+    'alimentos': {'modelo': Alimento, 'lectura': ('Administrador',), 'escritura': ('Administrador',),
+                  'metodos': ('GET', 'POST', 'PATCH', 'DELETE'), 'campos': ('nombre', 'descripcion', 'stock_kg'), 'filtros': ()},
+    'movimientos_alimento': {'modelo': MovimientoAlimento, 'lectura': ('Administrador',), 'escritura': ('Administrador', 'Cuidador'),
+                             'metodos': ('GET', 'POST'), 'campos': ('alimento_id', 'tipo', 'cantidad_kg', 'proveedor_id', 'nota'), 'filtros': ('alimento_id', 'tipo')},
+    'equipamiento': {'modelo': Equipamiento, 'lectura': ('Administrador',), 'escritura': ('Administrador',),
+                     'metodos': ('GET', 'POST', 'PATCH', 'DELETE'), 'campos': ('nombre', 'estado', 'fecha_adquisicion', 'proximo_mantenimiento'), 'filtros': ('estado',)},
+    'proveedores': {'modelo': Proveedor, 'lectura': ('Administrador',), 'escritura': ('Administrador',),
+                    'metodos': ('GET', 'POST', 'PATCH', 'DELETE'), 'campos': ('nombre', 'contacto', 'telefono', 'direccion'), 'filtros': ()},
+}
+
+# Para toda la aplicación: también cubre las URLs /api/ que no llegan a ninguna vista.
+@bp.app_errorhandler(HTTPException)
+def manejar_error_http(error):
+    if not request.path.startswith('/api/'):
+        return error
+    return jsonify({'error': error.description}), error.code
+
+def recurso_api(nombre, metodo):
+    recurso = RECURSOS_API.get(nombre)
+    if recurso is None:
+        abort(404, description=f"Recurso desconocido: '{nombre}'.")
+    if 'user_id' not in session:
+        abort(401, description='Inicia sesión para usar la API.')
+    if metodo not in recurso['metodos']:
+        abort(405, description=f'Método {metodo} no permitido sobre {nombre}.')
+    roles = recurso['lectura'] if metodo == 'GET' else recurso['escritura']
+    if session['user_rol'] not in roles:
+        abort(403, description='Tu rol no tiene acceso a este recurso.')
+    return recurso
+
+def valor_api(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+def serializar_api(objeto):
+    return {clave: valor_api(valor) for clave, valor in como_dict(objeto).items()}
+
+def convertir_campo(modelo, campo, valor):
+    if valor is None or valor == '':
+        return None
+    tipo = modelo.__table__.columns[campo].type.python_type
+    try:
+        if tipo is datetime:
+            return datetime.fromisoformat(valor)
+        if tipo is date:
+            return date.fromisoformat(valor)
+        if tipo is bool:
+            return valor if isinstance(valor, bool) else str(valor).lower() in ('1', 'true', 'si', 'sí')
+        return tipo(valor)
+    except (TypeError, ValueError):
+        abort(400, description=f"Valor inválido para '{campo}'.")
+
+def datos_api(recurso):
+    datos = request.get_json(silent=True)
+    if not isinstance(datos, dict):
+        abort(400, description='Se esperaba un objeto JSON.')
+    desconocidos = set(datos) - set(recurso['campos'])
+    if desconocidos:
+        abort(400, description=f"Campos no editables: {', '.join(sorted(desconocidos))}.")
+    return {campo: convertir_campo(recurso['modelo'], campo, valor) for campo, valor in datos.items()}
+
+def respuesta_condicional(tabla, construir):
+    # El ETag combina la versión de la tabla con la consulta y el usuario; si
+    # el cliente ya tiene esa versión se responde 304 sin tocar los datos.
+    version = db.session.get(VersionTabla, tabla)
+    numero = version.version if version else 0
+    ultima_modificacion = version.modificada_en.replace(microsecond=0, tzinfo=timezone.utc) if version else None
+    # Last-Modified tiene precisión de segundos: mientras no termine el segundo
+    # de la última modificación puede llegar otra en ese mismo segundo, así que
+    # no se anuncia (y un If-Modified-Since recibido nunca la cubre por error).
+    if ultima_modificacion and ultima_modificacion >= datetime.now(timezone.utc).replace(microsecond=0):
+        ultima_modificacion = None
+    firma = zlib.crc32(f"{request.full_path}|{session.get('user_id')}".encode())
+    etag = f'{tabla}-{numero}-{firma:08x}'
+    if request.if_none_match:
+        sin_cambios = request.if_none_match.contains_weak(etag)
+    else:
+        sin_cambios = bool(ultima_modificacion and request.if_modified_since and ultima_modificacion <= request.if_modified_since)
+    respuesta = Response(status=304) if sin_cambios else jsonify(construir())
+    respuesta.set_etag(etag, weak=True)
+    if ultima_modificacion:
+        respuesta.last_modified = ultima_modificacion
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+def consulta_api(nombre, recurso):
+    modelo = recurso['modelo']
+    consulta = modelo.query
+    for campo in recurso['filtros']:
+        if campo in request.args:
+            consulta = consulta.filter(getattr(modelo, campo) == convertir_campo(modelo, campo, request.args[campo]))
+    if nombre == 'conteos' and session['user_rol'] == 'Cuidador':
+        consulta = consulta.filter(Conteo.user_id == session['user_id'])
+    return consulta
+
+@bp.route('/<recurso>', methods=['GET'])
+def api_listar(recurso):
+    config = recurso_api(recurso, 'GET')
+    modelo = config['modelo']
+    def construir():
+        pagina = paginar(consulta_api(recurso, config), {'id': (modelo.id, False)}, 'id', modelo.id)
+        return {'datos': [serializar_api(elemento) for elemento in pagina.elementos], 'siguiente': pagina.siguiente_cursor}
+    return respuesta_condicional(modelo.__tablename__, construir)
+
+@bp.route('/<recurso>/<int:id>', methods=['GET'])
+def api_obtener(recurso, id):
+    config = recurso_api(recurso, 'GET')
+    modelo = config['modelo']
+    return respuesta_condicional(modelo.__tablename__, lambda: serializar_api(consulta_api(recurso, config).filter(modelo.id == id).first_or_404()))
+
+def cerrar_dosis_tratamiento(tratamiento):
+    # Como en los formularios: un tratamiento nuevo o con la fecha cambiada
+    # cierra la próxima dosis de los anteriores del mismo nombre.
+    db.session.flush()
+    cerrar_dosis_pendientes([tratamiento.animal_id])
+
+@bp.route('/<recurso>', methods=['POST'])
+def api_crear(recurso):
+    config = recurso_api(recurso, 'POST')
+    if recurso == 'conteos':
+        datos = request.get_json(silent=True) or {}
+        ids_presentes = datos.get('presentes')
+        if not isinstance(ids_presentes, list) or not all(isinstance(id_, int) for id_ in ids_presentes):
+            abort(400, description="Se esperaba 'presentes' como lista de ids.")
+        ids_presentes = set(ids_presentes)
+        codigos_esperados = dict(db.session.query(Animal.id, Animal.codigo_unico).filter_by(estado='En rebaño').all())
+        faltantes = [(id_faltante, codigos_esperados[id_faltante]) for id_faltante in sorted(set(codigos_esperados) - ids_presentes)]
+        nuevo, _ = registrar_conteo(session['user_id'], len(codigos_esperados), len(ids_presentes), faltantes)
+    elif recurso == 'movimientos_alimento':
+        datos = datos_api(config)
+        if datos.get('tipo') not in ('Consumo', 'Reposición') or not datos.get('cantidad_kg') or datos['cantidad_kg'] <= 0:
+            abort(400, description="'tipo' debe ser Consumo o Reposición y 'cantidad_kg' mayor que cero.")
+        db.get_or_404(Alimento, datos.get('alimento_id'))
+        try:
+            nuevo = aplicar_movimiento_alimento(datos['alimento_id'], datos['tipo'], datos['cantidad_kg'], session['user_id'],
+                                                  datos.get('proveedor_id'), datos.get('nota'))
+        except AlimentoNoEncontrado as error:
+            db.session.rollback()
+            abort(404, description=str(error))
+        except StockInsuficiente as error:
+            db.session.rollback()
+            abort(409, description=str(error))
+    else:
+        datos = datos_api(config)
+        if recurso == 'animales':
+            if not datos.get('tipo') or not datos.get('estado'):
+                abort(400, description="'tipo' y 'estado' son obligatorios.")
+            datos['codigo_unico'] = reservar_codigos(datos['tipo'])[0]
+        stock_inicial = datos.pop('stock_kg', None) if recurso == 'alimentos' else None
+        nuevo = config['modelo'](**datos)
+        db.session.add(nuevo)
+        if stock_inicial:
+            nuevo.stock_kg = 0
+            db.session.flush()
+            ajustar_stock_alimento(nuevo.id, 0, stock_inicial, session['user_id'], 'Stock inicial')
+    try:
+        if recurso == 'tratamientos':
+            cerrar_dosis_tratamiento(nuevo)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        abort(409, description='El registro viola una restricción de unicidad o integridad.')
+    return jsonify(serializar_api(nuevo)), 201
+
+@bp.route('/<recurso>/<int:id>', methods=['PATCH'])
+def api_actualizar(recurso, id):
+    config = recurso_api(recurso, 'PATCH')
+    objeto = db.get_or_404(config['modelo'], id)
+    datos = datos_api(config)
+    if recurso == 'alertas':
+        if datos.get('resuelta') and not objeto.resuelta:
+            marcar_alerta_resuelta(objeto)
+    elif recurso == 'alimentos' and 'stock_kg' in datos:
+        # Un stock absoluto se registra como ajuste en el libro, relativo al valor leído.
+        stock_nuevo = datos.pop('stock_kg')
+        if ajustar_stock_alimento(objeto.id, objeto.stock_kg, stock_nuevo, session['user_id'], 'Ajuste por API') is None:
+            db.session.rollback()
+            abort(409, description='El stock cambió durante la actualización; vuelve a intentarlo.')
+        for campo, valor in datos.items():
+            setattr(objeto, campo, valor)
+    else:
+        for campo, valor in datos.items():
+            setattr(objeto, campo, valor)
+    try:
+        if recurso == 'tratamientos':
+            cerrar_dosis_tratamiento(objeto)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        abort(409, description='El registro viola una restricción de unicidad o integridad.')
+    return jsonify(serializar_api(objeto))
+
+@bp.route('/<recurso>/<int:id>', methods=['DELETE'])
+def api_borrar(recurso, id):
+    config = recurso_api(recurso, 'DELETE')
+    objeto = db.get_or_404(config['modelo'], id)
+    if recurso == 'animales':
+        objeto.estado = 'Inactivo'
+    elif recurso == 'alimentos':
+        borrar_alimento(objeto)
+    else:
+        db.session.delete(objeto)
+    db.session.commit()
+    return '', 204
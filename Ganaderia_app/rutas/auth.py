@@ -0,0 +1,111 @@
+"""Inicio de sesión, registro, dashboards y administración de usuarios."""
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from extensiones import cache, db, metricas
+from modelos import Alerta, Animal, Conteo, User, como_dict
+from paginacion import paginar
+
+bp = Blueprint('auth', __name__)
+
+# Rutas de Autenticación y Dashboards
+@bp.route('/')
+def index():
+    return render_template('landing.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        user = User.query.filter_by(username=request.form['username']).first()
+        with metricas.medir('verificar_contrasena'):
+            contrasena_valida = user is not None and check_password_hash(user.password_hash, request.form['password'])
+        if contrasena_valida:
+            session['user_id'] = user.id
+            session['username'] = user.username
+            session['user_rol'] = user.rol
+            if user.rol == 'Administrador':
+                return redirect(url_for('auth.dashboard_admin'))
+            else:
+                return redirect(url_for('auth.dashboard_cuidador'))
+        else:
+            flash('Usuario o contraseña incorrectos.', 'danger')
+    return render_template('login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username']
+        if User.query.filter_by(username=username).first():
+            flash('El nombre de usuario ya existe.', 'warning')
+            return redirect(url_for('auth.register'))
+        new_user = User(username=username, password_hash=generate_password_hash(request.form['password']), rol=request.form['rol'])
+        db.session.add(new_user)
+        db.session.commit()
+        flash('Cuenta creada exitosamente. Por favor, inicia sesión.', 'success')
+        return redirect(url_for('auth.login'))
+    return render_template('register.html')
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    flash('Has cerrado la sesión.', 'info')
+    return redirect(url_for('auth.login'))
+
+@bp.route('/dashboard_admin')
+def dashboard_admin():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador':
+        flash('Por favor, inicia sesión para acceder a esta página.', 'warning')
+        return redirect(url_for('auth.login'))
+    resumen = cache.memorizar('dashboard_admin', ('animal', 'alerta'), lambda: {
+        'animales_en_rebano': Animal.query.filter_by(estado='En rebaño').count(),
+        'alertas_activas': Alerta.query.filter_by(resuelta=False).count(),
+    })
+    return render_template('dashboard_admin.html', resumen=resumen)
+
+@bp.route('/dashboard_cuidador')
+def dashboard_cuidador():
+    if 'user_id' not in session or session['user_rol'] != 'Cuidador':
+        flash('Por favor, inicia sesión para acceder a esta página.', 'warning')
+        return redirect(url_for('auth.login'))
+    def cargar_ultimo_conteo():
+        conteo = Conteo.query.filter_by(user_id=session['user_id']).order_by(Conteo.fecha_hora.desc()).first()
+        return como_dict(conteo) if conteo else None
+    ultimo_conteo = cache.memorizar(f"ultimo_conteo:{session['user_id']}", ('conteo',), cargar_ultimo_conteo)
+    return render_template('dashboard_cuidador.html', ultimo_conteo=ultimo_conteo)
+
+# CRUD Usuarios
+@bp.route('/gestionar_usuarios')
+def gestionar_usuarios():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    consulta = User.query
+    if request.args.get('rol'):
+        consulta = consulta.filter(User.rol == request.args['rol'])
+    pagina = paginar(consulta, {
+        'username': (User.username, False),
+        'rol': (User.rol, False),
+        'id': (User.id, False),
+    }, 'id', User.id)
+    return render_template('gestionar_usuarios.html', users=pagina.elementos, pagina=pagina)
+
+@bp.route('/user/edit/<int:user_id>', methods=['GET', 'POST'])
+def edit_user(user_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    user_a_editar = User.query.get_or_404(user_id)
+    if request.method == 'POST':
+        user_a_editar.rol = request.form['rol']
+        db.session.commit()
+        flash(f'El rol del usuario {user_a_editar.username} ha sido actualizado.', 'success')
+        return redirect(url_for('auth.gestionar_usuarios'))
+    return render_template('edit_user.html', user=user_a_editar)
+
+@bp.route('/user/delete/<int:user_id>')
+def delete_user(user_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if user_id == session['user_id']:
+        flash('No puedes borrar tu propia cuenta.', 'danger')
+        return redirect(url_for('auth.gestionar_usuarios'))
+    user_a_borrar = User.query.get_or_404(user_id)
+    db.session.delete(user_a_borrar)
+    db.session.commit()
+    flash(f'El usuario {user_a_borrar.username} ha sido borrado permanentemente.', 'success')
+    return redirect(url_for('auth.gestionar_usuarios'))
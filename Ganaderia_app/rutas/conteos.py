@@ -0,0 +1,333 @@
+"""Conteos (formulario y sesiones de escaneo), alertas, reportes, tendencias y exportaciones."""
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, redirect, render_template, request, session, stream_with_context, url_for
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+import conjunto_bits
+import exportacion
+import historial
+from extensiones import db
+from modelos import Alerta, AlertaHistorica, Animal, AnimalFaltante, AnimalFaltanteHistorico, AnimalHistorico, Conteo, ConteoHistorico, LoteEscaneo, ResumenDiarioAlertas, ResumenDiarioCuidador, ResumenFaltasAnimal, SesionConteo, TratamientoHistorico, User, acumular_resumen, como_dict, encolar_notificaciones_alerta, ids_escaneados_validos
+from paginacion import paginar, leer_fecha
+from rutas import pagina_en_cache
+
+bp = Blueprint('conteos', __name__)
+
+# Rutas de Conteos y Alertas
+def registrar_conteo(user_id, animales_esperados, animales_contados, faltantes, referencia_en=None, fecha_hora=None):
+    # `faltantes` es una lista de (id, codigo_unico); si no está vacía se crea la alerta.
+    # `fecha_hora` sólo se indica para conteos hechos sin conexión y sincronizados después.
+    ahora = fecha_hora or datetime.utcnow()
+    nuevo_conteo = Conteo(fecha_hora=ahora, animales_esperados=animales_esperados, animales_contados=animales_contados,
+                          user_id=user_id, referencia_en=referencia_en or ahora)
+    db.session.add(nuevo_conteo)
+    nueva_alerta = None
+    fecha = nuevo_conteo.fecha_hora.date()
+    if faltantes:
+        codigos_faltantes = ", ".join(codigo for _, codigo in faltantes)
+        mensaje_alerta = f"Discrepancia en conteo. Faltan {len(faltantes)} animales: {codigos_faltantes}"
+        nueva_alerta = Alerta(mensaje=mensaje_alerta, conteo=nuevo_conteo)
+        db.session.add(nueva_alerta)
+        db.session.flush()
+        db.session.execute(insert(AnimalFaltante), [{'conteo_id': nuevo_conteo.id, 'animal_id': id_faltante, 'fecha': fecha} for id_faltante, _ in faltantes])
+        encolar_notificaciones_alerta(nueva_alerta, nuevo_conteo)
+        acumular_resumen(ResumenFaltasAnimal, [{'animal_id': id_faltante, 'veces': 1, 'ultima_vez': fecha} for id_faltante, _ in faltantes], ('animal_id',), maximos=('ultima_vez',))
+        acumular_resumen(ResumenDiarioAlertas, [{'fecha': fecha, 'alertas_creadas': 1, 'alertas_resueltas': 0, 'segundos_resolucion': 0}], ('fecha',))
+    acumular_resumen(ResumenDiarioCuidador, [{
+        'fecha': fecha,
+        'user_id': user_id,
+        'conteos': 1,
+        'conteos_con_discrepancia': 1 if faltantes else 0,
+        'animales_faltantes': len(faltantes),
+    }], ('fecha', 'user_id'))
+    return nuevo_conteo, nueva_alerta
+
+@bp.route('/iniciar_conteo')
+def iniciar_conteo():
+    if 'user_id' not in session or session['user_rol'] != 'Cuidador':
+        flash('Acceso no autorizado.', 'danger')
+        return redirect(url_for('auth.login'))
+    referencia_en = datetime.utcnow()
+    animales_a_contar = Animal.query.filter_by(estado='En rebaño').all()
+    return render_template('iniciar_conteo.html', animales=animales_a_contar, referencia_en=referencia_en.strftime(historial.FORMATO_MOMENTO))
+
+def leer_referencia_conteo(valor):
+    # El formulario trae el momento en que se listó el rebaño; si falta, es
+    # inválido o demasiado viejo, se compara con el rebaño actual.
+    ahora = datetime.utcnow()
+    try:
+        referencia = datetime.strptime(valor, historial.FORMATO_MOMENTO) if valor else ahora
+    except ValueError:
+        return ahora
+    if referencia > ahora or ahora - referencia > timedelta(hours=current_app.config['CONTEO_VIGENCIA_FORMULARIO_HORAS']):
+        return ahora
+    return referencia
+
+@bp.route('/guardar_conteo', methods=['POST'])
+def guardar_conteo():
+    if 'user_id' not in session or session['user_rol'] != 'Cuidador': return redirect(url_for('auth.login'))
+    ids_presentes = {int(id_str) for id_str in request.form.getlist('animales_presentes')}
+    # Se compara con el rebaño que vio el cuidador, no con el actual: un animal
+    # dado de alta o de baja mientras contaba no cambia el resultado.
+    referencia_en = leer_referencia_conteo(request.form.get('referencia_en'))
+    codigos_esperados = dict(historial.rebano_en(db.session.connection(), referencia_en))
+    faltantes = [(id_faltante, codigos_esperados[id_faltante]) for id_faltante in sorted(set(codigos_esperados) - ids_presentes)]
+    nuevo_conteo, nueva_alerta = registrar_conteo(session['user_id'], len(codigos_esperados), len(ids_presentes), faltantes, referencia_en)
+    if nueva_alerta:
+        flash(nueva_alerta.mensaje, 'danger')
+    else:
+        flash('Conteo guardado exitosamente. Todos los animales están presentes.', 'success')
+    db.session.commit()
+    return redirect(url_for('auth.dashboard_cuidador'))
+
+# Conteo incremental por lotes de escaneo
+def cargar_sesion_conteo(sesion_id):
+    sesion_conteo = SesionConteo.query.get_or_404(sesion_id)
+    if sesion_conteo.user_id != session['user_id']:
+        abort(404)
+    return sesion_conteo
+
+def estado_sesion_conteo(sesion_conteo, **extra):
+    esperados = conjunto_bits.desde_bytes(sesion_conteo.esperados)
+    presentes = conjunto_bits.desde_bytes(sesion_conteo.presentes)
+    datos = {
+        'sesion_id': sesion_conteo.id,
+        'estado': sesion_conteo.estado,
+        'esperados': conjunto_bits.contar(esperados),
+        'presentes': conjunto_bits.contar(presentes & esperados),
+        'faltantes': conjunto_bits.contar(esperados & ~presentes),
+        'lotes': sesion_conteo.lotes.count(),
+        'conteo_id': sesion_conteo.conteo_id,
+    }
+    datos.update(extra)
+    return datos
+
+@bp.route('/conteo/sesion', methods=['POST'])
+def abrir_sesion_conteo():
+    if 'user_id' not in session or session['user_rol'] != 'Cuidador': return redirect(url_for('auth.login'))
+    iniciada_en = datetime.utcnow()
+    ids_esperados = db.session.scalars(select(Animal.id).filter_by(estado='En rebaño'))
+    sesion_conteo = SesionConteo(user_id=session['user_id'], iniciada_en=iniciada_en, esperados=conjunto_bits.a_bytes(conjunto_bits.desde_ids(ids_esperados)))
+    db.session.add(sesion_conteo)
+    db.session.commit()
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify(estado_sesion_conteo(sesion_conteo)), 201
+    return redirect(url_for('conteos.ver_sesion_conteo', sesion_id=sesion_conteo.id))
+
+@bp.route('/conteo/sesion/<int:sesion_id>')
+def ver_sesion_conteo(sesion_id):
+    if 'user_id' not in session or session['user_rol'] != 'Cuidador': return redirect(url_for('auth.login'))
+    sesion_conteo = cargar_sesion_conteo(sesion_id)
+    estado = estado_sesion_conteo(sesion_conteo)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(estado)
+    return render_template('sesion_conteo.html', sesion_conteo=sesion_conteo, estado=estado)
+
+@bp.route('/conteo/sesion/<int:sesion_id>/lote', methods=['POST'])
+def registrar_lote_escaneo(sesion_id):
+    if 'user_id' not in session or session['user_rol'] != 'Cuidador': return redirect(url_for('auth.login'))
+    sesion_conteo = cargar_sesion_conteo(sesion_id)
+    if request.is_json:
+        datos = request.get_json(silent=True)
+        if not isinstance(datos, dict):
+            abort(400, description='El lote debe ser un objeto JSON.')
+        numero, ids_escaneados, codigos = datos.get('numero'), datos.get('ids') or [], datos.get('codigos') or []
+    else:
+        numero = request.form.get('numero', type=int)
+        ids_escaneados, codigos = [], request.form.get('codigos', '').replace(',', ' ').split()
+    if (not isinstance(numero, int) or isinstance(numero, bool) or not isinstance(ids_escaneados, list)
+            or not all(isinstance(id_, int) and not isinstance(id_, bool) for id_ in ids_escaneados)
+            or not isinstance(codigos, list) or not all(isinstance(codigo, str) for codigo in codigos)):
+        abort(400, description="El lote requiere un 'numero' entero, 'ids' enteros y 'codigos' de texto.")
+    if len(codigos) > current_app.config['CONTEO_LOTE_MAX_CODIGOS']:
+        abort(400, description=f"Un lote admite hasta {current_app.config['CONTEO_LOTE_MAX_CODIGOS']} códigos.")
+    if not ids_escaneados_validos(ids_escaneados, sesion_conteo.esperados):
+        abort(400, description="Los 'ids' deben ser ids de animales existentes.")
+    if sesion_conteo.estado != 'Abierta':
+        abort(409, description='La sesión de conteo ya fue finalizada.')
+    duplicado = False
+    ids_escaneados = set(ids_escaneados)
+    if codigos:
+        ids_escaneados.update(db.session.scalars(select(Animal.id).where(Animal.codigo_unico.in_(codigos))))
+    try:
+        # Insertar el lote primero toma el bloqueo de escritura, así el mapa
+        # de presentes se relee y actualiza sin carreras entre lotes.
+        db.session.add(LoteEscaneo(sesion_id=sesion_conteo.id, numero=numero, cantidad=len(ids_escaneados)))
+        db.session.flush()
+        db.session.refresh(sesion_conteo)
+        # Con el bloqueo tomado se vuelve a mirar el estado: una finalización
+        # pudo confirmarse después de la comprobación de arriba.
+        if sesion_conteo.estado != 'Abierta':
+            db.session.rollback()
+            abort(409, description='La sesión de conteo ya fue finalizada.')
+        presentes = conjunto_bits.desde_bytes(sesion_conteo.presentes) | conjunto_bits.desde_ids(ids_escaneados)
+        sesion_conteo.presentes = conjunto_bits.a_bytes(presentes)
+        db.session.commit()
+    except IntegrityError:
+        # El lote ya se había recibido (reintento del cliente): no se aplica dos veces.
+        db.session.rollback()
+        duplicado = True
+    esperados = conjunto_bits.desde_bytes(sesion_conteo.esperados)
+    fuera_del_rebano = sorted(id_ for id_ in ids_escaneados if not (esperados >> id_) & 1)
+    if request.is_json:
+        return jsonify(estado_sesion_conteo(sesion_conteo, numero=numero, duplicado=duplicado, fuera_del_rebano=fuera_del_rebano))
+    if duplicado:
+        flash(f'El lote #{numero} ya había sido registrado.', 'info')
+    else:
+        flash(f'Lote #{numero} registrado con {len(ids_escaneados)} animal(es).', 'success')
+    return redirect(url_for('conteos.ver_sesion_conteo', sesion_id=sesion_conteo.id))
+
+@bp.route('/conteo/sesion/<int:sesion_id>/finalizar', methods=['POST'])
+def finalizar_sesion_conteo(sesion_id):
+    if 'user_id' not in session or session['user_rol'] != 'Cuidador': return redirect(url_for('auth.login'))
+    sesion_conteo = cargar_sesion_conteo(sesion_id)
+    # Se reclama la sesión antes de registrar el conteo: de dos finalizaciones
+    # simultáneas (un reintento del cliente, por ejemplo) sólo una la cierra.
+    reclamada = db.session.execute(
+        update(SesionConteo).where(SesionConteo.id == sesion_conteo.id, SesionConteo.estado == 'Abierta').values(estado='Finalizada')
+    ).rowcount
+    if reclamada != 1:
+        db.session.rollback()
+        abort(409, description='La sesión de conteo ya fue finalizada.')
+    # Los lotes confirmados antes del bloqueo ya están en `presentes`.
+    db.session.refresh(sesion_conteo)
+    esperados = conjunto_bits.desde_bytes(sesion_conteo.esperados)
+    presentes = conjunto_bits.desde_bytes(sesion_conteo.presentes)
+    # Sólo se consultan los códigos de los animales faltantes.
+    ids_faltantes = list(conjunto_bits.ids(esperados & ~presentes))
+    faltantes = db.session.execute(select(Animal.id, Animal.codigo_unico).where(Animal.id.in_(ids_faltantes)).order_by(Animal.id)).all() if ids_faltantes else []
+    nuevo_conteo, nueva_alerta = registrar_conteo(sesion_conteo.user_id, conjunto_bits.contar(esperados), conjunto_bits.contar(presentes & esperados),
+                                                  faltantes, sesion_conteo.iniciada_en)
+    db.session.flush()
+    sesion_conteo.conteo_id = nuevo_conteo.id
+    db.session.commit()
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify(estado_sesion_conteo(sesion_conteo, alerta=nueva_alerta.mensaje if nueva_alerta else None))
+    if nueva_alerta:
+        flash(nueva_alerta.mensaje, 'danger')
+    else:
+        flash('Conteo guardado exitosamente. Todos los animales están presentes.', 'success')
+    return redirect(url_for('auth.dashboard_cuidador'))
+
+@bp.route('/ver_reportes')
+def ver_reportes():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    # Con ?archivados=1 se lee la vista que incluye los conteos archivados.
+    modelo = ConteoHistorico if request.args.get('archivados') else Conteo
+    consulta = modelo.query.options(joinedload(modelo.cuidador), joinedload(modelo.alerta))
+    desde, hasta = leer_fecha('desde'), leer_fecha('hasta', fin_de_dia=True)
+    if desde:
+        consulta = consulta.filter(modelo.fecha_hora >= desde)
+    if hasta:
+        consulta = consulta.filter(modelo.fecha_hora <= hasta)
+    if request.args.get('user_id', type=int):
+        consulta = consulta.filter(modelo.user_id == request.args.get('user_id', type=int))
+    pagina = paginar(consulta, {'fecha': (modelo.fecha_hora, True)}, 'fecha', modelo.id)
+    cuidadores = User.query.filter_by(rol='Cuidador').order_by(User.username).all()
+    return render_template('ver_reportes.html', conteos=pagina.elementos, pagina=pagina, cuidadores=cuidadores)
+
+def alerta_como_dict(alerta):
+    datos = como_dict(alerta)
+    datos['conteo'] = {'fecha_hora': alerta.conteo.fecha_hora, 'cuidador': {'username': alerta.conteo.cuidador.username}}
+    return datos
+
+@bp.route('/gestionar_alertas')
+def gestionar_alertas():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    resuelta = request.args.get('resuelta') == '1'
+    consulta = Alerta.query.options(joinedload(Alerta.conteo).joinedload(Conteo.cuidador)).filter_by(resuelta=resuelta)
+    pagina = pagina_en_cache(('alerta', 'conteo', 'user'), lambda: paginar(consulta, {'id': (Alerta.id, True)}, 'id', Alerta.id), alerta_como_dict)
+    return render_template('gestionar_alertas.html', alertas=pagina.elementos, pagina=pagina, resuelta=resuelta)
+
+def marcar_alerta_resuelta(alerta):
+    alerta.resuelta = True
+    alerta.resuelta_en = datetime.utcnow()
+    segundos = int((alerta.resuelta_en - alerta.conteo.fecha_hora).total_seconds())
+    acumular_resumen(ResumenDiarioAlertas, [{'fecha': alerta.resuelta_en.date(), 'alertas_creadas': 0, 'alertas_resueltas': 1, 'segundos_resolucion': segundos}], ('fecha',))
+
+@bp.route('/alerta/resolver/<int:alerta_id>')
+def resolver_alerta(alerta_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    alerta_a_resolver = Alerta.query.options(joinedload(Alerta.conteo)).get_or_404(alerta_id)
+    if not alerta_a_resolver.resuelta:
+        marcar_alerta_resuelta(alerta_a_resolver)
+        db.session.commit()
+    flash(f'La alerta #{alerta_a_resolver.id} ha sido marcada como resuelta.', 'success')
+    return redirect(url_for('conteos.gestionar_alertas'))
+
+# Exportaciones para auditoría
+def consulta_exportacion(entidad):
+    desde, hasta = leer_fecha('desde'), leer_fecha('hasta', fin_de_dia=True)
+    animal_id = request.args.get('animal_id', type=int)
+    # Las exportaciones leen las vistas *_historico: incluyen lo archivado.
+    conteo, alerta, tratamiento, animal = ConteoHistorico, AlertaHistorica, TratamientoHistorico, AnimalHistorico
+    if entidad == 'conteos':
+        consulta = (select(conteo.id, conteo.fecha_hora, User.username.label('cuidador'), conteo.animales_esperados,
+                           conteo.animales_contados, alerta.id.label('alerta_id'))
+                    .join(User, conteo.user_id == User.id).outerjoin(alerta, alerta.conteo_id == conteo.id))
+        columna_fecha, orden = conteo.fecha_hora, (conteo.fecha_hora, conteo.id)
+    elif entidad == 'alertas':
+        consulta = (select(alerta.id, alerta.conteo_id, conteo.fecha_hora, alerta.resuelta, alerta.mensaje)
+                    .join(conteo, alerta.conteo_id == conteo.id))
+        columna_fecha, orden = conteo.fecha_hora, (conteo.fecha_hora, alerta.id)
+    else:
+        consulta = (select(tratamiento.id, tratamiento.animal_id, animal.codigo_unico, tratamiento.fecha_aplicacion,
+                           tratamiento.nombre_tratamiento, tratamiento.descripcion)
+                    .join(animal, tratamiento.animal_id == animal.id))
+        columna_fecha, orden = tratamiento.fecha_aplicacion, (tratamiento.fecha_aplicacion, tratamiento.id)
+        desde = desde.date() if desde else None
+        hasta = hasta.date() if hasta else None
+        if animal_id:
+            consulta = consulta.filter(tratamiento.animal_id == animal_id)
+    if animal_id and entidad != 'tratamientos':
+        consulta = consulta.filter(conteo.id.in_(select(AnimalFaltanteHistorico.conteo_id).where(AnimalFaltanteHistorico.animal_id == animal_id)))
+    if desde:
+        consulta = consulta.filter(columna_fecha >= desde)
+    if hasta:
+        consulta = consulta.filter(columna_fecha <= hasta)
+    return consulta.order_by(*orden)
+
+@bp.route('/exportar/<entidad>.<formato>')
+def exportar(entidad, formato):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if entidad not in ('conteos', 'alertas', 'tratamientos') or formato not in exportacion.FORMATOS:
+        abort(404)
+    consulta = consulta_exportacion(entidad)
+    resultado = db.session.execute(consulta.execution_options(yield_per=current_app.config['EXPORTACION_PARTICION']))
+    contenido = exportacion.generar(formato, list(resultado.keys()), resultado)
+    nombre_archivo = f"{entidad}-{datetime.utcnow():%Y%m%d-%H%M%S}.{formato}"
+    return Response(stream_with_context(contenido), content_type=exportacion.FORMATOS[formato],
+                    headers={'Content-Disposition': f'attachment; filename="{nombre_archivo}"'})
+
+# Tendencias de conteos y alertas a partir de los resúmenes
+@bp.route('/reportes/tendencias')
+def ver_tendencias():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    hasta = (leer_fecha('hasta') or datetime.utcnow()).date()
+    desde = (leer_fecha('desde') or datetime.combine(hasta - timedelta(weeks=12), datetime.min.time())).date()
+    semana = func.strftime('%Y-%W', ResumenDiarioCuidador.fecha).label('semana')
+    discrepancias = db.session.execute(
+        select(semana, User.username, func.sum(ResumenDiarioCuidador.conteos).label('conteos'),
+               func.sum(ResumenDiarioCuidador.conteos_con_discrepancia).label('con_discrepancia'),
+               func.sum(ResumenDiarioCuidador.animales_faltantes).label('animales_faltantes'))
+        .join(User, User.id == ResumenDiarioCuidador.user_id)
+        .where(ResumenDiarioCuidador.fecha.between(desde, hasta))
+        .group_by(semana, User.username).order_by(semana.desc(), User.username)
+    ).all()
+    semana_alertas = func.strftime('%Y-%W', ResumenDiarioAlertas.fecha).label('semana')
+    resolucion = db.session.execute(
+        select(semana_alertas, func.sum(ResumenDiarioAlertas.alertas_creadas).label('creadas'),
+               func.sum(ResumenDiarioAlertas.alertas_resueltas).label('resueltas'),
+               func.sum(ResumenDiarioAlertas.segundos_resolucion).label('segundos'))
+        .where(ResumenDiarioAlertas.fecha.between(desde, hasta))
+        .group_by(semana_alertas).order_by(semana_alertas.desc())
+    ).all()
+    mas_faltantes = db.session.execute(
+        select(AnimalHistorico.id, AnimalHistorico.codigo_unico, AnimalHistorico.tipo, ResumenFaltasAnimal.veces, ResumenFaltasAnimal.ultima_vez)
+        .join(AnimalHistorico, AnimalHistorico.id == ResumenFaltasAnimal.animal_id)
+        .order_by(ResumenFaltasAnimal.veces.desc()).limit(20)
+    ).all()
+    return render_template('tendencias.html', desde=desde, hasta=hasta, discrepancias=discrepancias, resolucion=resolucion, mas_faltantes=mas_faltantes)
@@ -0,0 +1,219 @@
+"""Corrales, potreros y planificación de la rotación de pastoreo."""
+import time
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+import planificador
+from extensiones import cache, db, metricas
+from modelos import AsignacionRotacion, Corral, GrupoPastoreo, PlanRotacion, Potrero, como_dict
+from paginacion import paginar
+from rutas import pagina_en_cache
+
+bp = Blueprint('infraestructura', __name__)
+
+# CRUD Corrales
+@bp.route('/gestionar_corrales')
+def gestionar_corrales():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    corrales = cache.memorizar('corrales', ('corral',), lambda: [como_dict(corral) for corral in Corral.query.order_by(Corral.id)])
+    return render_template('gestionar_corrales.html', corrales=corrales)
+
+@bp.route('/corral/add', methods=['GET', 'POST'])
+def add_corral():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        nuevo_corral = Corral(nombre=request.form['nombre'], capacidad=request.form['capacidad'] or None, tipo_corral=request.form['tipo_corral'] or None)
+        db.session.add(nuevo_corral)
+        db.session.commit()
+        flash(f"Corral '{nuevo_corral.nombre}' añadido exitosamente.", 'success')
+        return redirect(url_for('infraestructura.gestionar_corrales'))
+    return render_template('add_corral.html')
+
+@bp.route('/corral/edit/<int:corral_id>', methods=['GET', 'POST'])
+def edit_corral(corral_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    corral_a_editar = Corral.query.get_or_404(corral_id)
+    if request.method == 'POST':
+        corral_a_editar.nombre, corral_a_editar.capacidad, corral_a_editar.tipo_corral = request.form['nombre'], request.form['capacidad'] or None, request.form['tipo_corral'] or None
+        db.session.commit()
+        flash(f"Corral '{corral_a_editar.nombre}' actualizado.", 'success')
+        return redirect(url_for('infraestructura.gestionar_corrales'))
+    return render_template('edit_corral.html', corral=corral_a_editar)
+
+@bp.route('/corral/delete/<int:corral_id>')
+def delete_corral(corral_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    corral_a_borrar = Corral.query.get_or_404(corral_id)
+    db.session.delete(corral_a_borrar)
+    db.session.commit()
+    flash(f"Corral '{corral_a_borrar.nombre}' borrado permanentemente.", 'success')
+    return redirect(url_for('infraestructura.gestionar_corrales'))
+
+# CRUD Potreros
+@bp.route('/gestionar_potreros')
+def gestionar_potreros():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    consulta = Potrero.query
+    if request.args.get('estado_pasto'):
+        consulta = consulta.filter(Potrero.estado_pasto == request.args['estado_pasto'])
+    pagina = pagina_en_cache(('potrero',), lambda: paginar(consulta, {'nombre': (Potrero.nombre, False)}, 'nombre', Potrero.id))
+    return render_template('gestionar_potreros.html', potreros=pagina.elementos, pagina=pagina)
+
+@bp.route('/potrero/add', methods=['GET', 'POST'])
+def add_potrero():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        ultimo_uso = request.form['ultimo_uso']
+        nuevo_potrero = Potrero(
+            nombre=request.form['nombre'],
+            area_hectareas=float(request.form['area_hectareas']) if request.form['area_hectareas'] else None,
+            estado_pasto=request.form['estado_pasto'],
+            ultimo_uso=datetime.strptime(ultimo_uso, '%Y-%m-%d').date() if ultimo_uso else None
+        )
+        db.session.add(nuevo_potrero)
+        db.session.commit()
+        flash('Potrero añadido exitosamente.', 'success')
+        return redirect(url_for('infraestructura.gestionar_potreros'))
+    return render_template('add_potrero.html')
+
+@bp.route('/potrero/edit/<int:id>', methods=['GET', 'POST'])
+def edit_potrero(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    potrero = Potrero.query.get_or_404(id)
+    if request.method == 'POST':
+        potrero.nombre = request.form['nombre']
+        potrero.area_hectareas = float(request.form['area_hectareas']) if request.form['area_hectareas'] else None
+        potrero.estado_pasto = request.form['estado_pasto']
+        ultimo_uso = request.form['ultimo_uso']
+        potrero.ultimo_uso = datetime.strptime(ultimo_uso, '%Y-%m-%d').date() if ultimo_uso else None
+        db.session.commit()
+        flash('Potrero actualizado exitosamente.', 'success')
+        return redirect(url_for('infraestructura.gestionar_potreros'))
+    return render_template('edit_potrero.html', potrero=potrero)
+
+@bp.route('/potrero/delete/<int:id>')
+def delete_potrero(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    potrero = Potrero.query.get_or_404(id)
+    db.session.delete(potrero)
+    db.session.commit()
+    flash('Potrero eliminado permanentemente.', 'success')
+    return redirect(url_for('infraestructura.gestionar_potreros'))
+
+# Planificación de rotación de pastoreo
+@bp.route('/planificacion_pastoreo')
+def planificacion_pastoreo():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    grupos = GrupoPastoreo.query.order_by(GrupoPastoreo.nombre).all()
+    planes = PlanRotacion.query.order_by(PlanRotacion.id.desc()).limit(10).all()
+    plan_id = request.args.get('plan_id', type=int)
+    plan = db.session.get(PlanRotacion, plan_id) if plan_id else (planes[0] if planes else None)
+    grilla = {}
+    if plan is not None:
+        # Una fila por grupo con el lugar de cada semana, en una sola consulta.
+        filas = db.session.execute(
+            select(AsignacionRotacion.semana, GrupoPastoreo.nombre, GrupoPastoreo.cabezas, Potrero.nombre, Corral.nombre,
+                   AsignacionRotacion.potrero_id, AsignacionRotacion.corral_id)
+            .join(GrupoPastoreo, GrupoPastoreo.id == AsignacionRotacion.grupo_id)
+            .outerjoin(Potrero, Potrero.id == AsignacionRotacion.potrero_id)
+            .outerjoin(Corral, Corral.id == AsignacionRotacion.corral_id)
+            .where(AsignacionRotacion.plan_id == plan.id)
+            .order_by(GrupoPastoreo.nombre, AsignacionRotacion.semana)
+        ).all()
+        for semana, grupo, cabezas, potrero, corral, potrero_id, corral_id in filas:
+            if potrero_id:
+                celda = ('potrero', potrero or f'Potrero #{potrero_id} (eliminado)')
+            elif corral_id:
+                celda = ('corral', corral or f'Corral #{corral_id} (eliminado)')
+            else:
+                celda = ('sin_lugar', 'Sin lugar')
+            grilla.setdefault((grupo, cabezas), [None] * plan.semanas)[semana] = celda
+    return render_template('planificacion_pastoreo.html', grupos=grupos, planes=planes, plan=plan, grilla=grilla,
+                           descanso_dias=current_app.config['ROTACION_DESCANSO_DIAS'], carga_por_hectarea=current_app.config['ROTACION_CARGA_POR_HECTAREA'],
+                           hoy=datetime.utcnow().date(), timedelta=timedelta)
+
+@bp.route('/planificacion_pastoreo/generar', methods=['POST'])
+def generar_plan_rotacion():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    semanas = request.form.get('semanas', type=int)
+    descanso_dias = request.form.get('descanso_dias', current_app.config['ROTACION_DESCANSO_DIAS'], type=int)
+    carga = request.form.get('carga_por_hectarea', current_app.config['ROTACION_CARGA_POR_HECTAREA'], type=float)
+    if not semanas or not 1 <= semanas <= current_app.config['ROTACION_MAX_SEMANAS'] or not descanso_dias or descanso_dias < 1 or not carga or carga <= 0:
+        flash(f"Indica entre 1 y {current_app.config['ROTACION_MAX_SEMANAS']} semanas, un descanso y una carga mayores que cero.", 'warning')
+        return redirect(url_for('infraestructura.planificacion_pastoreo'))
+    try:
+        fecha_inicio = datetime.strptime(request.form['fecha_inicio'], '%Y-%m-%d').date() if request.form.get('fecha_inicio') else datetime.utcnow().date()
+    except ValueError:
+        flash('Fecha de inicio inválida.', 'warning')
+        return redirect(url_for('infraestructura.planificacion_pastoreo'))
+    grupos = [planificador.Grupo(*fila) for fila in db.session.execute(select(GrupoPastoreo.id, GrupoPastoreo.cabezas).order_by(GrupoPastoreo.id))]
+    if not grupos:
+        flash('Registra al menos un grupo de pastoreo antes de planificar.', 'warning')
+        return redirect(url_for('infraestructura.planificacion_pastoreo'))
+    potreros = [
+        planificador.PotreroPlan(id_, area, estado, (fecha_inicio - ultimo_uso).days if ultimo_uso else None)
+        for id_, area, estado, ultimo_uso in db.session.execute(
+            select(Potrero.id, Potrero.area_hectareas, Potrero.estado_pasto, Potrero.ultimo_uso).order_by(Potrero.id))
+    ]
+    corrales = [planificador.CorralPlan(*fila) for fila in db.session.execute(select(Corral.id, Corral.capacidad).order_by(Corral.capacidad.desc(), Corral.id))]
+    inicio = time.perf_counter()
+    try:
+        with metricas.medir('planificar_rotacion'):
+            asignaciones, puntaje, sin_asignar = planificador.planificar(grupos, potreros, corrales, semanas, descanso_dias, carga)
+    except ImportError:
+        flash('El planificador requiere NumPy (pip install numpy).', 'danger')
+        return redirect(url_for('infraestructura.planificacion_pastoreo'))
+    plan = PlanRotacion(fecha_inicio=fecha_inicio, semanas=semanas, descanso_dias=descanso_dias, carga_por_hectarea=carga,
+                        puntaje=puntaje, sin_asignar=sin_asignar, duracion_ms=round((time.perf_counter() - inicio) * 1000, 1),
+                        user_id=session['user_id'])
+    db.session.add(plan)
+    db.session.flush()
+    # Inserción Core sobre la tabla: el bulk insert del ORM omite las columnas en
+    # None y partiría las filas en un executemany por combinación de nulos.
+    db.session.execute(insert(AsignacionRotacion.__table__), [dict(asignacion._asdict(), plan_id=plan.id) for asignacion in asignaciones])
+    db.session.commit()
+    if sin_asignar:
+        flash(f'Plan #{plan.id} generado en {plan.duracion_ms} ms, pero {sin_asignar} asignación(es) semanales quedaron sin potrero ni corral.', 'warning')
+    else:
+        flash(f'Plan #{plan.id} generado en {plan.duracion_ms} ms.', 'success')
+    return redirect(url_for('infraestructura.planificacion_pastoreo', plan_id=plan.id))
+
+@bp.route('/plan_rotacion/delete/<int:plan_id>')
+def delete_plan_rotacion(plan_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    plan = PlanRotacion.query.get_or_404(plan_id)
+    db.session.execute(delete(AsignacionRotacion).where(AsignacionRotacion.plan_id == plan.id))
+    db.session.delete(plan)
+    db.session.commit()
+    flash(f'Plan #{plan_id} eliminado.', 'success')
+    return redirect(url_for('infraestructura.planificacion_pastoreo'))
+
+@bp.route('/grupo_pastoreo/add', methods=['POST'])
+def add_grupo_pastoreo():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    cabezas = request.form.get('cabezas', type=int)
+    if not request.form.get('nombre') or not cabezas or cabezas < 1:
+        flash('Indica un nombre y una cantidad de cabezas mayor que cero.', 'warning')
+        return redirect(url_for('infraestructura.planificacion_pastoreo'))
+    db.session.add(GrupoPastoreo(nombre=request.form['nombre'], cabezas=cabezas))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        flash(f"Ya existe un grupo llamado '{request.form['nombre']}'.", 'danger')
+        return redirect(url_for('infraestructura.planificacion_pastoreo'))
+    flash(f"Grupo '{request.form['nombre']}' añadido.", 'success')
+    return redirect(url_for('infraestructura.planificacion_pastoreo'))
+
+@bp.route('/grupo_pastoreo/delete/<int:id>')
+def delete_grupo_pastoreo(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    grupo = GrupoPastoreo.query.get_or_404(id)
+    db.session.execute(delete(AsignacionRotacion).where(AsignacionRotacion.grupo_id == grupo.id))
+    db.session.delete(grupo)
+    db.session.commit()
+    flash(f"Grupo '{grupo.nombre}' eliminado.", 'success')
+    return redirect(url_for('infraestructura.planificacion_pastoreo'))
@@ -0,0 +1,233 @@
+"""Proveedores, alimentos con su libro de movimientos y pronóstico, y equipamiento."""
+from datetime import datetime, timedelta
+
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, session, url_for
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+import pronostico
+from extensiones import cache, db
+from modelos import Alimento, AlimentoNoEncontrado, Equipamiento, MovimientoAlimento, Proveedor, StockInsuficiente, ajustar_stock_alimento, aplicar_movimiento_alimento, borrar_alimento, como_dict
+from paginacion import paginar
+from rutas import pagina_en_cache
+
+bp = Blueprint('inventario', __name__)
+
+# CRUD Proveedores
+@bp.route('/gestionar_proveedores')
+def gestionar_proveedores():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    proveedores = cache.memorizar('proveedores', ('proveedor',), lambda: [como_dict(proveedor) for proveedor in Proveedor.query.order_by(Proveedor.id)])
+    return render_template('gestionar_proveedores.html', proveedores=proveedores)
+
+@bp.route('/proveedor/add', methods=['GET', 'POST'])
+def add_proveedor():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        nuevo_proveedor = Proveedor(
+            nombre=request.form['nombre'],
+            contacto=request.form['contacto'],
+            telefono=request.form['telefono'],
+            direccion=request.form['direccion']
+        )
+        db.session.add(nuevo_proveedor)
+        db.session.commit()
+        flash('Proveedor añadido exitosamente.', 'success')
+        return redirect(url_for('inventario.gestionar_proveedores'))
+    return render_template('add_proveedor.html')
+
+@bp.route('/proveedor/edit/<int:id>', methods=['GET', 'POST'])
+def edit_proveedor(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    proveedor = Proveedor.query.get_or_404(id)
+    if request.method == 'POST':
+        proveedor.nombre = request.form['nombre']
+        proveedor.contacto = request.form['contacto']
+        proveedor.telefono = request.form['telefono']
+        proveedor.direccion = request.form['direccion']
+        db.session.commit()
+        flash('Proveedor actualizado exitosamente.', 'success')
+        return redirect(url_for('inventario.gestionar_proveedores'))
+    return render_template('edit_proveedor.html', proveedor=proveedor)
+
+@bp.route('/proveedor/delete/<int:id>')
+def delete_proveedor(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    proveedor = Proveedor.query.get_or_404(id)
+    db.session.delete(proveedor)
+    db.session.commit()
+    flash('Proveedor eliminado permanentemente.', 'success')
+    return redirect(url_for('inventario.gestionar_proveedores'))
+
+# CRUD Alimentos
+@bp.route('/gestionar_alimentos')
+def gestionar_alimentos():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    pagina = pagina_en_cache(('alimento',), lambda: paginar(Alimento.query, {
+        'nombre': (Alimento.nombre, False),
+        'stock': (Alimento.stock_kg, False),
+    }, 'nombre', Alimento.id))
+    return render_template('gestionar_alimentos.html', alimentos=pagina.elementos, pagina=pagina)
+
+@bp.route('/alimento/add', methods=['GET', 'POST'])
+def add_alimento():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        nuevo_alimento = Alimento(
+            nombre=request.form['nombre'],
+            descripcion=request.form['descripcion'],
+            stock_kg=0
+        )
+        db.session.add(nuevo_alimento)
+        db.session.flush()
+        ajustar_stock_alimento(nuevo_alimento.id, 0, float(request.form['stock_kg']), session['user_id'], 'Stock inicial')
+        db.session.commit()
+        flash('Alimento añadido al inventario.', 'success')
+        return redirect(url_for('inventario.gestionar_alimentos'))
+    return render_template('add_alimento.html')
+
+@bp.route('/alimento/edit/<int:id>', methods=['GET', 'POST'])
+def edit_alimento(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    alimento = Alimento.query.get_or_404(id)
+    if request.method == 'POST':
+        alimento.nombre = request.form['nombre']
+        alimento.descripcion = request.form['descripcion']
+        stock_leido = float(request.form.get('stock_kg_leido', alimento.stock_kg))
+        if ajustar_stock_alimento(alimento.id, stock_leido, float(request.form['stock_kg']), session['user_id'], 'Ajuste de inventario') is None:
+            db.session.rollback()
+            flash('El stock cambió mientras editabas (se registraron otros movimientos). Revisa el valor actual e inténtalo de nuevo.', 'warning')
+            return redirect(url_for('inventario.edit_alimento', id=id))
+        db.session.commit()
+        flash('Inventario de alimento actualizado.', 'success')
+        return redirect(url_for('inventario.gestionar_alimentos'))
+    return render_template('edit_alimento.html', alimento=alimento)
+
+@bp.route('/alimento/delete/<int:id>')
+def delete_alimento(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    alimento = Alimento.query.get_or_404(id)
+    borrar_alimento(alimento)
+    db.session.commit()
+    flash('Alimento eliminado del inventario.', 'success')
+    return redirect(url_for('inventario.gestionar_alimentos'))
+
+@bp.route('/alimento/movimiento', methods=['GET', 'POST'])
+def registrar_movimiento_alimento():
+    if 'user_id' not in session or session['user_rol'] not in ('Administrador', 'Cuidador'): return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        tipo = request.form['tipo']
+        cantidad = request.form.get('cantidad_kg', type=float)
+        if tipo not in ('Consumo', 'Reposición') or not cantidad or cantidad <= 0:
+            flash('Indica un tipo de movimiento y una cantidad mayor que cero.', 'warning')
+            return redirect(url_for('inventario.registrar_movimiento_alimento'))
+        alimento_id = request.form.get('alimento_id', type=int)
+        try:
+            movimiento = aplicar_movimiento_alimento(alimento_id, tipo, cantidad, session['user_id'],
+                                                       request.form.get('proveedor_id', type=int) if tipo == 'Reposición' else None,
+                                                       request.form.get('nota') or None)
+            db.session.commit()
+        except AlimentoNoEncontrado as error:
+            db.session.rollback()
+            abort(404, description=str(error))
+        except StockInsuficiente as error:
+            db.session.rollback()
+            flash(str(error), 'danger')
+            return redirect(url_for('inventario.registrar_movimiento_alimento', alimento_id=alimento_id))
+        flash(f'{tipo} de {cantidad} kg registrado. Stock actual: {movimiento.stock_resultante} kg.', 'success')
+        if session['user_rol'] == 'Administrador':
+            return redirect(url_for('inventario.movimientos_alimento', id=alimento_id))
+        return redirect(url_for('auth.dashboard_cuidador'))
+    alimentos = db.session.execute(select(Alimento.id, Alimento.nombre, Alimento.stock_kg).order_by(Alimento.nombre)).all()
+    proveedores = db.session.execute(select(Proveedor.id, Proveedor.nombre).order_by(Proveedor.nombre)).all()
+    return render_template('registrar_movimiento_alimento.html', alimentos=alimentos, proveedores=proveedores,
+                           alimento_id=request.args.get('alimento_id', type=int))
+
+@bp.route('/alimento/<int:id>/movimientos')
+def movimientos_alimento(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    alimento = Alimento.query.get_or_404(id)
+    consulta = MovimientoAlimento.query.options(joinedload(MovimientoAlimento.proveedor)).filter_by(alimento_id=id)
+    if request.args.get('tipo'):
+        consulta = consulta.filter_by(tipo=request.args['tipo'])
+    pagina = paginar(consulta, {'fecha': (MovimientoAlimento.fecha, True)}, 'fecha', MovimientoAlimento.id)
+    return render_template('movimientos_alimento.html', alimento=alimento, movimientos=pagina.elementos, pagina=pagina)
+
+@bp.route('/alimentos/pronostico')
+def pronostico_alimentos():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    ventana = max(1, min(request.args.get('ventana', current_app.config['PRONOSTICO_VENTANA_DIAS'], type=int), 3650))
+    plazo = max(0, request.args.get('plazo', current_app.config['PRONOSTICO_PLAZO_ENTREGA_DIAS'], type=int))
+    hoy = datetime.utcnow().date()
+    alimentos = {id_: (nombre, stock) for id_, nombre, stock in db.session.execute(select(Alimento.id, Alimento.nombre, Alimento.stock_kg))}
+    # Una fila por alimento y día: el volumen no crece con la cantidad de registros diarios.
+    dia = func.date(MovimientoAlimento.fecha)
+    consumos = db.session.execute(
+        select(MovimientoAlimento.alimento_id, dia, -func.sum(MovimientoAlimento.cantidad_kg))
+        .where(MovimientoAlimento.tipo == 'Consumo', MovimientoAlimento.fecha >= datetime.combine(hoy - timedelta(days=ventana - 1), datetime.min.time()))
+        .group_by(MovimientoAlimento.alimento_id, dia)
+    ).all()
+    try:
+        filas = pronostico.pronosticar({id_: stock for id_, (_, stock) in alimentos.items()}, consumos, hoy, ventana, plazo)
+    except ImportError:
+        flash('El pronóstico requiere NumPy (pip install numpy).', 'danger')
+        return redirect(url_for('inventario.gestionar_alimentos'))
+    for fila in filas:
+        fila['nombre'] = alimentos[fila['alimento_id']][0]
+    return render_template('pronostico_alimentos.html', filas=filas, ventana=ventana, plazo=plazo)
+
+# CRUD Equipamiento
+@bp.route('/gestionar_equipamiento')
+def gestionar_equipamiento():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    consulta = Equipamiento.query
+    if request.args.get('estado'):
+        consulta = consulta.filter(Equipamiento.estado == request.args['estado'])
+    pagina = paginar(consulta, {
+        'nombre': (Equipamiento.nombre, False),
+        'id': (Equipamiento.id, False),
+    }, 'nombre', Equipamiento.id)
+    return render_template('gestionar_equipamiento.html', equipos=pagina.elementos, pagina=pagina)
+
+@bp.route('/equipamiento/add', methods=['GET', 'POST'])
+def add_equipamiento():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    if request.method == 'POST':
+        fecha_adquisicion = request.form['fecha_adquisicion']
+        proximo_mantenimiento = request.form['proximo_mantenimiento']
+        nuevo_equipo = Equipamiento(
+            nombre=request.form['nombre'],
+            estado=request.form['estado'],
+            fecha_adquisicion=datetime.strptime(fecha_adquisicion, '%Y-%m-%d').date() if fecha_adquisicion else None,
+            proximo_mantenimiento=datetime.strptime(proximo_mantenimiento, '%Y-%m-%d').date() if proximo_mantenimiento else None
+        )
+        db.session.add(nuevo_equipo)
+        db.session.commit()
+        flash('Equipo añadido exitosamente.', 'success')
+        return redirect(url_for('inventario.gestionar_equipamiento'))
+    return render_template('add_equipamiento.html')
+
+@bp.route('/equipamiento/edit/<int:id>', methods=['GET', 'POST'])
+def edit_equipamiento(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    equipo = Equipamiento.query.get_or_404(id)
+    if request.method == 'POST':
+        equipo.nombre = request.form['nombre']
+        equipo.estado = request.form['estado']
+        fecha_adquisicion = request.form['fecha_adquisicion']
+        proximo_mantenimiento = request.form['proximo_mantenimiento']
+        equipo.fecha_adquisicion = datetime.strptime(fecha_adquisicion, '%Y-%m-%d').date() if fecha_adquisicion else None
+        equipo.proximo_mantenimiento = datetime.strptime(proximo_mantenimiento, '%Y-%m-%d').date() if proximo_mantenimiento else None
+        db.session.commit()
+        flash('Equipo actualizado exitosamente.', 'success')
+        return redirect(url_for('inventario.gestionar_equipamiento'))
+    return render_template('edit_equipamiento.html', equipo=equipo)
+
+@bp.route('/equipamiento/delete/<int:id>')
+def delete_equipamiento(id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    equipo = Equipamiento.query.get_or_404(id)
+    db.session.delete(equipo)
+    db.session.commit()
+    flash('Equipo eliminado permanentemente.', 'success')
+    return redirect(url_for('inventario.gestionar_equipamiento'))
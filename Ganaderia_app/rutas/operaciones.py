@@ -0,0 +1,65 @@
+"""Cola de trabajos, estadísticas de la caché y /metrics."""
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+from sqlalchemy import func
+
+import trabajos
+from extensiones import cache, db, metricas
+from modelos import Trabajo
+from paginacion import paginar
+
+bp = Blueprint('operaciones', __name__)
+
+@bp.route('/cache/estadisticas')
+def estadisticas_cache():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    return jsonify(cache.estadisticas())
+
+# Cola de trabajos: estado y reintento manual de los fallidos
+@bp.route('/trabajos')
+def gestionar_trabajos():
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    estado = request.args.get('estado', 'Fallido')
+    if estado not in trabajos.ESTADOS:
+        abort(400)
+    totales = dict(db.session.query(Trabajo.estado, func.count()).group_by(Trabajo.estado).all())
+    pagina = paginar(Trabajo.query.filter_by(estado=estado), {'id': (Trabajo.id, True)}, 'id', Trabajo.id)
+    return render_template('gestionar_trabajos.html', trabajos=pagina.elementos, pagina=pagina, estado=estado, estados=trabajos.ESTADOS, totales=totales)
+
+@bp.route('/trabajo/reintentar/<int:trabajo_id>')
+def reintentar_trabajo(trabajo_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    trabajo = Trabajo.query.get_or_404(trabajo_id)
+    if trabajo.estado == 'Fallido':
+        trabajo.estado = 'Pendiente'
+        trabajo.intentos = 0
+        trabajo.proximo_intento = datetime.utcnow()
+        trabajo.terminado_en = None
+        db.session.commit()
+        flash(f'El trabajo #{trabajo.id} se volvió a encolar.', 'success')
+    return redirect(url_for('operaciones.gestionar_trabajos'))
+
+@bp.route('/trabajo/delete/<int:trabajo_id>')
+def delete_trabajo(trabajo_id):
+    if 'user_id' not in session or session['user_rol'] != 'Administrador': return redirect(url_for('auth.login'))
+    trabajo = Trabajo.query.get_or_404(trabajo_id)
+    estado = trabajo.estado
+    db.session.delete(trabajo)
+    db.session.commit()
+    flash(f'El trabajo #{trabajo_id} ha sido descartado.', 'success')
+    return redirect(url_for('operaciones.gestionar_trabajos', estado=estado))
+
+@bp.route('/metrics')
+def exponer_metricas():
+    token = current_app.config['METRICAS_TOKEN']
+    autorizado = session.get('user_rol') == 'Administrador' or (token and request.headers.get('Authorization') == f'Bearer {token}')
+    if not autorizado:
+        abort(401)
+    estadisticas = cache.estadisticas()
+    for clave in ('entradas', 'aciertos', 'fallos', 'invalidaciones'):
+        metricas.fijar(f'cache_{clave}', estadisticas[clave], 'Estadísticas de la caché de lectura.', backend=estadisticas['backend'])
+    totales = dict(db.session.query(Trabajo.estado, func.count()).group_by(Trabajo.estado).all())
+    for estado in trabajos.ESTADOS:
+        metricas.fijar('trabajos', totales.get(estado, 0), 'Trabajos en la cola por estado.', estado=estado)
+    return Response(metricas.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,189 @@
+"""Sincronización en lote del trabajo hecho sin conexión (formato en sincronizacion.py)."""
+from datetime import datetime, timedelta
+
+from flask import Blueprint, abort, current_app, jsonify, request, session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import conjunto_bits
+import historial
+import sincronizacion
+from extensiones import db
+from modelos import Animal, ClaveSincronizacion, LoteEscaneo, SesionConteo, Tratamiento, cerrar_dosis_pendientes, ids_escaneados_validos, periodos_tratamiento
+from rutas.conteos import registrar_conteo
+
+bp = Blueprint('sincronizacion', __name__, url_prefix='/api/v1')
+
+# Tolerancia para dispositivos con el reloj algo adelantado.
+DESFASE_RELOJ = timedelta(minutes=5)
+
+def aplicar_tratamientos(registros, informe):
+    ids_animales = {datos['animal_id'] for _, _, datos in registros}
+    existentes = set(db.session.scalars(select(Animal.id).where(Animal.id.in_(ids_animales))))
+    validos = []
+    for indice, clave, datos in registros:
+        if datos['animal_id'] in existentes:
+            validos.append((indice, clave, datos))
+        else:
+            informe.registrar('tratamientos', indice, clave, 'conflicto', mensaje='El animal no existe o fue archivado.')
+    if not validos:
+        return
+    # Un solo INSERT para todos; con la tabla (no el modelo) las filas con
+    # descripción nula no se separan en otra sentencia. SQLite numera las filas
+    # de un INSERT en el orden de los parámetros, así que basta ordenar los ids
+    # (sort_by_parameter_order haría un INSERT por fila en SQLite).
+    filas = []
+    for _, _, datos in validos:
+        fila = {campo: datos[campo] for campo in ('animal_id', 'nombre_tratamiento', 'descripcion', 'fecha_aplicacion')}
+        fila.update(periodos_tratamiento(datos['fecha_aplicacion'], datos['dias_retiro'], datos['dias_refuerzo']))
+        filas.append(fila)
+    tabla = Tratamiento.__table__
+    ids = sorted(db.session.scalars(insert(tabla).returning(tabla.c.id), filas))
+    # Las dosis nuevas cierran el refuerzo pendiente de las anteriores, también
+    # las que llegaron en este mismo paquete.
+    cerrar_dosis_pendientes({fila['animal_id'] for fila in filas})
+    for (indice, clave, _), id_ in zip(validos, ids):
+        informe.registrar('tratamientos', indice, clave, 'aplicado', id=id_)
+
+def aplicar_escaneos(registros, user_id, informe):
+    ids_sesiones = {datos['sesion_id'] for _, _, datos in registros}
+    sesiones = {sesion_conteo.id: sesion_conteo for sesion_conteo in SesionConteo.query.filter(SesionConteo.id.in_(ids_sesiones), SesionConteo.user_id == user_id)}
+    codigos = sorted({codigo for _, _, datos in registros for codigo in datos['codigos']})
+    # SQLite limita los parámetros por sentencia: los códigos se buscan por tramos.
+    tramo = current_app.config['CONTEO_LOTE_MAX_CODIGOS']
+    por_codigo = {}
+    for inicio in range(0, len(codigos), tramo):
+        por_codigo.update(db.session.execute(
+            select(Animal.codigo_unico, Animal.id).where(Animal.codigo_unico.in_(codigos[inicio:inicio + tramo]))).all())
+    lotes, vistos = [], set()
+    for indice, clave, datos in registros:
+        sesion_conteo = sesiones.get(datos['sesion_id'])
+        lote = (datos['sesion_id'], datos['numero'])
+        if sesion_conteo is None:
+            informe.registrar('escaneos', indice, clave, 'conflicto', mensaje='La sesión de conteo no existe.')
+        elif sesion_conteo.estado != 'Abierta':
+            informe.registrar('escaneos', indice, clave, 'conflicto', id=sesion_conteo.id, mensaje='La sesión de conteo ya fue finalizada.')
+        elif not ids_escaneados_validos(datos['ids'], sesion_conteo.esperados):
+            informe.registrar('escaneos', indice, clave, 'invalido', id=sesion_conteo.id, mensaje="Los 'ids' deben ser ids de animales existentes.")
+        elif lote in vistos:
+            informe.registrar('escaneos', indice, clave, 'duplicado', id=sesion_conteo.id, mensaje=f"El lote #{datos['numero']} se repite en el paquete.")
+        else:
+            vistos.add(lote)
+            datos['ids'].update(por_codigo[codigo] for codigo in datos['codigos'] if codigo in por_codigo)
+            lotes.append((indice, clave, datos))
+    if not lotes:
+        return
+    # Los lotes que ya llegaron por /conteo/sesion/<id>/lote no se insertan ni se vuelven a sumar.
+    ahora = datetime.utcnow()
+    sentencia = sqlite_insert(LoteEscaneo).values([
+        {'sesion_id': datos['sesion_id'], 'numero': datos['numero'], 'cantidad': len(datos['ids']), 'recibido_en': ahora} for _, _, datos in lotes
+    ]).on_conflict_do_nothing().returning(LoteEscaneo.sesion_id, LoteEscaneo.numero)
+    nuevos = set(map(tuple, db.session.execute(sentencia)))
+    escaneados = {}
+    for indice, clave, datos in lotes:
+        sesion_conteo = sesiones[datos['sesion_id']]
+        if (datos['sesion_id'], datos['numero']) not in nuevos:
+            informe.registrar('escaneos', indice, clave, 'duplicado', id=sesion_conteo.id, mensaje=f"El lote #{datos['numero']} ya había sido registrado.")
+            continue
+        escaneados[sesion_conteo.id] = escaneados.get(sesion_conteo.id, 0) | conjunto_bits.desde_ids(datos['ids'])
+        esperados = conjunto_bits.desde_bytes(sesion_conteo.esperados)
+        informe.registrar('escaneos', indice, clave, 'aplicado', id=sesion_conteo.id,
+                          fuera_del_rebano=sorted(id_ for id_ in datos['ids'] if not (esperados >> id_) & 1),
+                          codigos_desconocidos=[codigo for codigo in datos['codigos'] if codigo not in por_codigo])
+    # Un solo UPDATE del mapa de presentes por sesión.
+    for sesion_id, mapa in escaneados.items():
+        sesion_conteo = sesiones[sesion_id]
+        sesion_conteo.presentes = conjunto_bits.a_bytes(conjunto_bits.desde_bytes(sesion_conteo.presentes) | mapa)
+
+def aplicar_conteos(registros, user_id, informe):
+    ahora = datetime.utcnow()
+    rebanos = {}
+    for indice, clave, datos in sorted(registros, key=lambda registro: registro[2]['registrado_en']):
+        if datos['registrado_en'] > ahora + DESFASE_RELOJ:
+            informe.registrar('conteos', indice, clave, 'conflicto', mensaje='La fecha del conteo es futura; revisa el reloj del dispositivo.')
+            continue
+        registrado_en, referencia_en = min(datos['registrado_en'], ahora), min(datos['referencia_en'], ahora)
+        # Se compara con el rebaño del momento en que el dispositivo descargó la lista.
+        if referencia_en not in rebanos:
+            rebanos[referencia_en] = dict(historial.rebano_en(db.session.connection(), referencia_en))
+        codigos_esperados = rebanos[referencia_en]
+        faltantes = [(id_faltante, codigos_esperados[id_faltante]) for id_faltante in sorted(set(codigos_esperados) - datos['presentes'])]
+        nuevo_conteo, nueva_alerta = registrar_conteo(user_id, len(codigos_esperados), len(datos['presentes']), faltantes, referencia_en, registrado_en)
+        db.session.flush()
+        informe.registrar('conteos', indice, clave, 'aplicado', id=nuevo_conteo.id, alerta=nueva_alerta.mensaje if nueva_alerta else None)
+
+def aplicar_paquete(paquete, user_id, rol):
+    informe = sincronizacion.InformeSincronizacion()
+    pendientes = {tipo: [] for tipo in sincronizacion.TIPOS}
+    claves = set()
+    for tipo, indice, clave, datos in sincronizacion.registros(paquete):
+        if isinstance(datos, sincronizacion.RegistroInvalido):
+            informe.registrar(tipo, indice, clave, 'invalido', mensaje=str(datos))
+        elif tipo != 'tratamientos' and rol != 'Cuidador':
+            informe.registrar(tipo, indice, clave, 'invalido', mensaje='Sólo los cuidadores registran conteos y escaneos.')
+        elif clave in claves:
+            informe.registrar(tipo, indice, clave, 'duplicado', mensaje='La clave se repite en el paquete.')
+        else:
+            claves.add(clave)
+            pendientes[tipo].append((indice, clave, datos))
+    if not claves:
+        return informe
+    # Reservar las claves toma primero el bloqueo de escritura: dos envíos
+    # simultáneos del mismo paquete se serializan y cada registro se aplica una vez.
+    ahora = datetime.utcnow()
+    sentencia = sqlite_insert(ClaveSincronizacion).values([
+        {'user_id': user_id, 'clave': clave, 'tipo': tipo, 'recibida_en': ahora} for tipo, registros in pendientes.items() for _, clave, _ in registros
+    ]).on_conflict_do_nothing().returning(ClaveSincronizacion.clave)
+    reservadas = set(db.session.scalars(sentencia))
+    anteriores = {}
+    if len(reservadas) < len(claves):
+        anteriores = dict(db.session.execute(select(ClaveSincronizacion.clave, ClaveSincronizacion.registro_id)
+                                             .where(ClaveSincronizacion.user_id == user_id, ClaveSincronizacion.clave.in_(claves - reservadas))).all())
+    for tipo, registros in pendientes.items():
+        for indice, clave, _ in registros:
+            if clave not in reservadas:
+                informe.registrar(tipo, indice, clave, 'duplicado', id=anteriores.get(clave), mensaje='Ya recibido en una sincronización anterior.')
+        pendientes[tipo] = [registro for registro in registros if registro[1] in reservadas]
+    # Desde aquí cada resultado corresponde a una clave reservada.
+    aplicados_desde = len(informe.resultados)
+    if pendientes['tratamientos']:
+        aplicar_tratamientos(pendientes['tratamientos'], informe)
+    if pendientes['escaneos']:
+        aplicar_escaneos(pendientes['escaneos'], user_id, informe)
+    if pendientes['conteos']:
+        aplicar_conteos(pendientes['conteos'], user_id, informe)
+    # Las claves de registros en conflicto o rechazados al aplicarlos se liberan
+    # para que el cliente pueda corregirlos y reenviarlos; las demás guardan el
+    # id de lo que crearon.
+    propios = informe.resultados[aplicados_desde:]
+    liberadas = [resultado['clave'] for resultado in propios if resultado['estado'] in ('conflicto', 'invalido')]
+    if liberadas:
+        db.session.execute(delete(ClaveSincronizacion).where(ClaveSincronizacion.user_id == user_id, ClaveSincronizacion.clave.in_(liberadas)))
+    registros_creados = [{'user_id': user_id, 'clave': resultado['clave'], 'registro_id': resultado['id']}
+                         for resultado in propios if resultado['estado'] not in ('conflicto', 'invalido') and resultado['id'] is not None]
+    if registros_creados:
+        db.session.execute(update(ClaveSincronizacion), registros_creados)
+    return informe
+
+@bp.route('/sincronizar', methods=['POST'])
+def sincronizar():
+    if 'user_id' not in session:
+        abort(401, description='Inicia sesión para sincronizar.')
+    comprimido = request.content_encoding == 'gzip' or request.mimetype in ('application/gzip', 'application/x-gzip')
+    maximo = current_app.config['SINCRONIZACION_MAX_BYTES']
+    # Se rechaza antes de leer el cuerpo; sin Content-Length se lee con tope.
+    if request.content_length is not None and request.content_length > maximo:
+        abort(413, description=f'El paquete supera los {maximo} bytes.')
+    try:
+        paquete = sincronizacion.leer_paquete(request.stream.read(maximo + 1), comprimido, maximo)
+    except sincronizacion.PaqueteDemasiadoGrande as error:
+        abort(413, description=str(error))
+    except sincronizacion.PaqueteInvalido as error:
+        abort(400, description=str(error))
+    total = sum(len(registros) for registros in paquete.values())
+    if total > current_app.config['SINCRONIZACION_MAX_REGISTROS']:
+        abort(413, description=f"El paquete trae {total} registros; el máximo es {current_app.config['SINCRONIZACION_MAX_REGISTROS']}.")
+    # Todo el paquete se aplica en una transacción, con un único commit.
+    informe = aplicar_paquete(paquete, session['user_id'], session['user_rol'])
+    db.session.commit()
+    return jsonify(informe.como_dict())
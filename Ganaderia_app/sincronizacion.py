@@ -0,0 +1,199 @@
+"""Lectura y validación de paquetes de sincronización del trabajo hecho sin conexión.
+
+En los potreros sin cobertura el cuidador registra conteos, lotes de escaneo y
+tratamientos en su dispositivo y los sube juntos en un solo POST a
+/api/v1/sincronizar. El cuerpo es un objeto JSON, comprimido con gzip si la
+petición trae `Content-Encoding: gzip` (o tipo `application/gzip`):
+
+    {"conteos": [{"clave": "...", "registrado_en": "2024-05-02T07:15:00",
+                  "referencia_en": "2024-05-02T06:40:00", "presentes": [1, 2, 3]}],
+     "escaneos": [{"clave": "...", "sesion_id": 12, "numero": 3, "ids": [4, 5], "codigos": ["VAC-010"]}],
+     "tratamientos": [{"clave": "...", "animal_id": 7, "nombre_tratamiento": "Ivermectina",
+                       "descripcion": null, "fecha_aplicacion": "2024-05-02",
+                       "dias_retiro": 28, "dias_refuerzo": null}]}
+
+Cada registro lleva una `clave` generada por el cliente (un UUID, por
+ejemplo). Una clave ya recibida se informa como duplicada y no se vuelve a
+aplicar, así que el paquete entero puede reenviarse si la respuesta se perdió.
+Este módulo sólo lee y valida; los registros se aplican en rutas/sincronizacion.py.
+"""
+import json
+import zlib
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+TIPOS = ('conteos', 'escaneos', 'tratamientos')
+LARGO_CLAVE = 64
+# Igual que modelos.MAX_DIAS_TRATAMIENTO.
+MAX_DIAS_TRATAMIENTO = 3650
+ESTADOS = ('aplicado', 'duplicado', 'conflicto', 'invalido')
+
+
+class PaqueteInvalido(Exception):
+    pass
+
+
+class PaqueteDemasiadoGrande(PaqueteInvalido):
+    pass
+
+
+class RegistroInvalido(Exception):
+    pass
+
+
+def leer_paquete(cuerpo, comprimido, max_bytes):
+    """{tipo: [registro, ...]} a partir del cuerpo de la petición."""
+    if len(cuerpo) > max_bytes:
+        raise PaqueteDemasiadoGrande(f'El paquete supera los {max_bytes} bytes.')
+    if comprimido:
+        # Se descomprime con tope para que un paquete pequeño no se expanda sin límite.
+        descompresor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        try:
+            cuerpo = descompresor.decompress(cuerpo, max_bytes)
+        except zlib.error as error:
+            raise PaqueteInvalido(f'El paquete no es gzip válido: {error}.')
+        if descompresor.unconsumed_tail:
+            raise PaqueteDemasiadoGrande(f'El paquete descomprimido supera los {max_bytes} bytes.')
+        if not descompresor.eof:
+            raise PaqueteInvalido('El paquete gzip está incompleto.')
+    try:
+        paquete = json.loads(cuerpo)
+    except ValueError:
+        raise PaqueteInvalido('El paquete no es JSON válido.')
+    if not isinstance(paquete, dict):
+        raise PaqueteInvalido('Se esperaba un objeto JSON.')
+    desconocidos = set(paquete) - set(TIPOS)
+    if desconocidos:
+        raise PaqueteInvalido(f"Tipos de registro desconocidos: {', '.join(sorted(desconocidos))}.")
+    if not all(isinstance(registros, list) for registros in paquete.values()):
+        raise PaqueteInvalido('Cada tipo de registro debe ser una lista.')
+    return {tipo: paquete.get(tipo, []) for tipo in TIPOS}
+
+
+def _clave(registro):
+    clave = registro.get('clave')
+    if not isinstance(clave, str) or not clave.strip() or len(clave) > LARGO_CLAVE:
+        raise RegistroInvalido(f"'clave' debe ser un texto de 1 a {LARGO_CLAVE} caracteres.")
+    return clave
+
+
+def _entero(registro, campo):
+    valor = registro.get(campo)
+    if not isinstance(valor, int) or isinstance(valor, bool):
+        raise RegistroInvalido(f"'{campo}' debe ser un entero.")
+    return valor
+
+
+def _lista(registro, campo, tipo, descripcion):
+    valores = registro.get(campo) or []
+    if not isinstance(valores, list) or not all(isinstance(valor, tipo) and not isinstance(valor, bool) for valor in valores):
+        raise RegistroInvalido(f"'{campo}' debe ser una lista de {descripcion}.")
+    return valores
+
+
+def _ids(registro, campo):
+    ids = _lista(registro, campo, int, 'ids enteros')
+    if any(id_ < 1 for id_ in ids):
+        raise RegistroInvalido(f"'{campo}' sólo admite ids positivos.")
+    return set(ids)
+
+
+def _dias(registro, campo):
+    if registro.get(campo) is None:
+        return None
+    dias = _entero(registro, campo)
+    if not 0 <= dias <= MAX_DIAS_TRATAMIENTO:
+        raise RegistroInvalido(f"'{campo}' debe estar entre 0 y {MAX_DIAS_TRATAMIENTO}.")
+    return dias
+
+
+def _momento(registro, campo):
+    try:
+        momento = datetime.fromisoformat(registro.get(campo))
+    except (TypeError, ValueError):
+        raise RegistroInvalido(f"'{campo}' debe ser una fecha y hora ISO 8601.")
+    # La base guarda UTC sin zona horaria.
+    if momento.tzinfo:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return momento
+
+
+def _texto(registro, campo, largo=None, obligatorio=False):
+    valor = registro.get(campo)
+    if valor is None and not obligatorio:
+        return None
+    if not isinstance(valor, str) or (obligatorio and not valor.strip()) or (largo and len(valor) > largo):
+        raise RegistroInvalido(f"'{campo}' debe ser un texto no vacío de hasta {largo} caracteres." if largo else f"'{campo}' debe ser un texto.")
+    return valor.strip() or None
+
+
+def validar_conteo(registro):
+    registrado_en = _momento(registro, 'registrado_en')
+    # Sin referencia, el rebaño esperado es el del momento del conteo.
+    referencia_en = _momento(registro, 'referencia_en') if registro.get('referencia_en') else registrado_en
+    if referencia_en > registrado_en:
+        raise RegistroInvalido("'referencia_en' no puede ser posterior a 'registrado_en'.")
+    return {'registrado_en': registrado_en, 'referencia_en': referencia_en, 'presentes': _ids(registro, 'presentes')}
+
+
+def validar_escaneo(registro):
+    return {
+        'sesion_id': _entero(registro, 'sesion_id'),
+        'numero': _entero(registro, 'numero'),
+        'ids': _ids(registro, 'ids'),
+        'codigos': _lista(registro, 'codigos', str, 'códigos'),
+    }
+
+
+def validar_tratamiento(registro):
+    try:
+        fecha = date.fromisoformat(registro.get('fecha_aplicacion'))
+    except (TypeError, ValueError):
+        raise RegistroInvalido("'fecha_aplicacion' debe ser una fecha AAAA-MM-DD.")
+    dias_retiro, dias_refuerzo = _dias(registro, 'dias_retiro'), _dias(registro, 'dias_refuerzo')
+    try:
+        fecha + timedelta(days=max(dias_retiro or 0, dias_refuerzo or 0))
+    except OverflowError:
+        raise RegistroInvalido('El período de retiro o de refuerzo termina fuera del calendario.')
+    return {
+        'animal_id': _entero(registro, 'animal_id'),
+        'nombre_tratamiento': _texto(registro, 'nombre_tratamiento', 150, obligatorio=True),
+        'descripcion': _texto(registro, 'descripcion'),
+        'fecha_aplicacion': fecha,
+        'dias_retiro': dias_retiro,
+        'dias_refuerzo': dias_refuerzo,
+    }
+
+
+VALIDADORES = {'conteos': validar_conteo, 'escaneos': validar_escaneo, 'tratamientos': validar_tratamiento}
+
+
+def registros(paquete):
+    """Genera (tipo, indice, clave, datos | RegistroInvalido) de cada registro del paquete."""
+    for tipo in TIPOS:
+        for indice, registro in enumerate(paquete[tipo]):
+            if not isinstance(registro, dict):
+                yield tipo, indice, None, RegistroInvalido('Se esperaba un objeto JSON.')
+                continue
+            try:
+                yield tipo, indice, _clave(registro), VALIDADORES[tipo](registro)
+            except RegistroInvalido as error:
+                clave = registro.get('clave')
+                yield tipo, indice, clave if isinstance(clave, str) else None, error
+
+
+class InformeSincronizacion:
+    def __init__(self):
+        self.resultados = []
+
+    def registrar(self, tipo, indice, clave, estado, id=None, mensaje=None, **extra):
+        resultado = {'tipo': tipo, 'indice': indice, 'clave': clave, 'estado': estado, 'id': id, 'mensaje': mensaje}
+        resultado.update(extra)
+        self.resultados.append(resultado)
+
+    def como_dict(self):
+        totales = Counter(resultado['estado'] for resultado in self.resultados)
+        return {
+            'totales': {estado: totales[estado] for estado in ESTADOS},
+            'resultados': sorted(self.resultados, key=lambda resultado: (TIPOS.index(resultado['tipo']), resultado['indice'])),
+        }
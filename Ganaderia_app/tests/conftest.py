@@ -0,0 +1,120 @@
+"""Fixtures comunes: una aplicación con su propia base SQLite por prueba.
+
+Con TESTING activo instrumentacion verifica PRESUPUESTO_CONSULTAS en cada
+petición: una ruta con presupuesto que lo supera falla con
+PresupuestoConsultasExcedido en lugar de responder.
+
+    cd Ganaderia_app && python -m pytest
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import conjunto_bits  # noqa: E402
+from app import crear_app  # noqa: E402
+from extensiones import db  # noqa: E402
+from migraciones import aplicar_migraciones  # noqa: E402
+from modelos import (Alimento, Animal, Corral, GrupoPastoreo, Potrero, SesionConteo, Tratamiento, User,  # noqa: E402
+                     aplicar_movimiento_alimento, periodos_tratamiento)
+from rutas.conteos import registrar_conteo  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    aplicacion = crear_app({
+        'TESTING': True,
+        'SECRET_KEY': 'pruebas',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'ganaderia.db'}",
+        'CACHE_BACKEND': 'memoria',
+    })
+    with aplicacion.app_context():
+        db.create_all()
+        aplicar_migraciones(db.engine)
+    yield aplicacion
+    with aplicacion.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def usuarios(app):
+    """{rol: user_id} con un administrador y un cuidador."""
+    with app.app_context():
+        # El hash no se usa: las pruebas inician sesión escribiendo la cookie.
+        creados = {rol: User(username=rol.lower(), password_hash='-', rol=rol) for rol in ('Administrador', 'Cuidador')}
+        db.session.add_all(creados.values())
+        db.session.commit()
+        return {rol: usuario.id for rol, usuario in creados.items()}
+
+
+def iniciar_sesion(cliente, user_id, rol):
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = user_id
+        sesion['username'] = rol.lower()
+        sesion['user_rol'] = rol
+    return cliente
+
+
+@pytest.fixture
+def admin(app, usuarios):
+    return iniciar_sesion(app.test_client(), usuarios['Administrador'], 'Administrador')
+
+
+@pytest.fixture
+def cuidador(app, usuarios):
+    return iniciar_sesion(app.test_client(), usuarios['Cuidador'], 'Cuidador')
+
+
+def crear_animales(cantidad, tipo='Vaca', estado='En rebaño', prefijo='VAC', desde=1, corral_id=None):
+    animales = [Animal(codigo_unico=f'{prefijo}-{numero:03d}', tipo=tipo, nombre=None, estado=estado, corral_id=corral_id)
+                for numero in range(desde, desde + cantidad)]
+    db.session.add_all(animales)
+    db.session.flush()
+    return [animal.id for animal in animales]
+
+
+@pytest.fixture
+def datos(app, usuarios):
+    """Un rebaño con tratamientos, conteos con alertas, alimento, potreros y una
+    sesión de conteo abierta: varias filas en cada tabla para que una consulta
+    por fila (N+1) supere el presupuesto."""
+    with app.app_context():
+        corral = Corral(nombre='Corral Norte', capacidad=40, tipo_corral='Engorde')
+        db.session.add(corral)
+        db.session.flush()
+        vacas = crear_animales(8, corral_id=corral.id)
+        toros = crear_animales(4, tipo='Toro', prefijo='TOR')
+        inactivo = crear_animales(1, estado='Inactivo', prefijo='INA')[0]
+        hoy = date.today()
+        for animal_id in vacas[:4]:
+            db.session.add(Tratamiento(nombre_tratamiento='Ivermectina', descripcion=None, fecha_aplicacion=hoy - timedelta(days=5),
+                                       animal_id=animal_id, **periodos_tratamiento(hoy - timedelta(days=5), 28, 10)))
+        alimento = Alimento(nombre='Maíz', descripcion=None, stock_kg=0)
+        potreros = [Potrero(nombre=f'Potrero {numero}', area_hectareas=5.0 + numero, estado_pasto='Bueno', ultimo_uso=hoy - timedelta(days=40))
+                    for numero in range(1, 5)]
+        grupos = [GrupoPastoreo(nombre='Lecheras', cabezas=8), GrupoPastoreo(nombre='Toros', cabezas=4)]
+        db.session.add_all([alimento, *potreros, *grupos])
+        db.session.commit()
+        aplicar_movimiento_alimento(alimento.id, 'Reposición', 500, usuarios['Administrador'])
+        for _ in range(6):
+            aplicar_movimiento_alimento(alimento.id, 'Consumo', 20, usuarios['Cuidador'])
+        db.session.commit()
+        # Las alertas se crean por el mismo camino que un conteo real.
+        todos = dict(db.session.execute(db.select(Animal.id, Animal.codigo_unico).where(Animal.estado == 'En rebaño')).all())
+        alertas = []
+        for faltan in (1, 2, 3):
+            faltantes = sorted(todos.items())[:faltan]
+            _, alerta = registrar_conteo(usuarios['Cuidador'], len(todos), len(todos) - faltan, faltantes, datetime.utcnow())
+            db.session.commit()
+            alertas.append(alerta.id)
+        sesion_conteo = SesionConteo(user_id=usuarios['Cuidador'], iniciada_en=datetime.utcnow(),
+                                     esperados=conjunto_bits.a_bytes(conjunto_bits.desde_ids(todos)))
+        db.session.add(sesion_conteo)
+        db.session.commit()
+        return {
+            'vacas': vacas, 'toros': toros, 'inactivo': inactivo, 'corral': corral.id, 'alimento': alimento.id,
+            'alertas': alertas, 'sesion': sesion_conteo.id,
+        }
@@ -0,0 +1,94 @@
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+import pronostico
+from extensiones import db
+from modelos import Alimento, MovimientoAlimento, StockInsuficiente, aplicar_movimiento_alimento
+
+
+def stock(app, alimento_id):
+    with app.app_context():
+        return db.session.get(Alimento, alimento_id).stock_kg
+
+
+def test_consumos_concurrentes_no_pierden_movimientos(app, usuarios, datos):
+    # El fixture deja 500 - 6 × 20 = 380 kg: alcanzan 19 consumos de 20 kg.
+    resultados = []
+
+    def consumir():
+        with app.app_context():
+            try:
+                aplicar_movimiento_alimento(datos['alimento'], 'Consumo', 20, usuarios['Cuidador'])
+                db.session.commit()
+                resultados.append('ok')
+            except StockInsuficiente:
+                db.session.rollback()
+                resultados.append('sin stock')
+
+    hilos = [threading.Thread(target=consumir) for _ in range(25)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sorted(resultados) == ['ok'] * 19 + ['sin stock'] * 6
+    assert stock(app, datos['alimento']) == 0
+    with app.app_context():
+        movimientos = MovimientoAlimento.query.filter_by(alimento_id=datos['alimento']).order_by(MovimientoAlimento.id).all()
+        assert sum(movimiento.cantidad_kg for movimiento in movimientos) == 0
+        # Cada fila del libro guarda el stock que dejó, sin saltos ni repetidos.
+        assert sorted(movimiento.stock_resultante for movimiento in movimientos[7:]) == [20.0 * n for n in range(19)]
+
+
+def test_consumo_sin_stock_o_alimento_inexistente(app, admin, cuidador, datos):
+    respuesta = cuidador.post('/alimento/movimiento', data={'alimento_id': datos['alimento'], 'tipo': 'Consumo', 'cantidad_kg': '1000'},
+                              follow_redirects=True)
+    assert 'No hay stock suficiente' in respuesta.get_data(as_text=True)
+    assert stock(app, datos['alimento']) == 380
+    assert cuidador.post('/alimento/movimiento', data={'alimento_id': '999', 'tipo': 'Consumo', 'cantidad_kg': '1'}).status_code == 404
+    assert admin.post('/api/v1/movimientos_alimento', json={'alimento_id': 999, 'tipo': 'Consumo', 'cantidad_kg': 1}).status_code == 404
+    assert admin.post('/api/v1/movimientos_alimento', json={'alimento_id': datos['alimento'], 'tipo': 'Consumo', 'cantidad_kg': 1000}).status_code == 409
+
+
+def test_ajuste_con_stock_desactualizado(app, admin, cuidador, datos):
+    cuidador.post('/alimento/movimiento', data={'alimento_id': datos['alimento'], 'tipo': 'Consumo', 'cantidad_kg': '30'})
+    formulario = {'nombre': 'Maíz', 'descripcion': '', 'stock_kg': '400'}
+    respuesta = admin.post(f"/alimento/edit/{datos['alimento']}", data={**formulario, 'stock_kg_leido': '380'}, follow_redirects=True)
+    assert 'El stock cambió mientras editabas' in respuesta.get_data(as_text=True)
+    assert stock(app, datos['alimento']) == 350
+    admin.post(f"/alimento/edit/{datos['alimento']}", data={**formulario, 'stock_kg_leido': '350'})
+    assert stock(app, datos['alimento']) == 400
+    with app.app_context():
+        ajuste = MovimientoAlimento.query.filter_by(tipo='Ajuste').one()
+        assert (ajuste.cantidad_kg, ajuste.stock_resultante) == (50, 400)
+
+
+def test_pronostico():
+    hoy = date(2024, 6, 30)
+    consumos = [(1, (hoy - timedelta(days=dias)).isoformat(), 10.0) for dias in range(30)]
+    filas = pronostico.pronosticar({1: 50.0, 2: 80.0}, consumos, hoy, ventana_dias=30, plazo_entrega=7)
+    assert [fila['alimento_id'] for fila in filas] == [1, 2]
+    uno, dos = filas
+    assert uno['consumo_diario_kg'] == 10.0 and uno['stock_seguridad_kg'] == 0
+    assert uno['dias_hasta_agotar'] == 5.0
+    assert hoy < uno['fecha_agotamiento'] <= date(2024, 7, 5)
+    assert uno['reordenar'] and uno['cantidad_sugerida_kg'] == 250.0
+    assert (dos['dias_hasta_agotar'], dos['fecha_agotamiento'], dos['reordenar']) == (None, None, False)
+
+
+def test_pronostico_sin_fecha_mas_alla_de_date_max():
+    hoy = date(2024, 6, 30)
+    [fila] = pronostico.pronosticar({1: 1e12}, [(1, hoy.isoformat(), 0.001)], hoy, ventana_dias=30)
+    assert fila['dias_hasta_agotar'] > (date.max - hoy).days
+    assert fila['fecha_agotamiento'] is None
+
+
+@pytest.mark.parametrize('stock_kg', [380.0, 1e15])
+def test_pagina_de_pronostico(app, admin, datos, stock_kg):
+    with app.app_context():
+        db.session.get(Alimento, datos['alimento']).stock_kg = stock_kg
+        db.session.commit()
+    respuesta = admin.get('/alimentos/pronostico?ventana=30')
+    assert respuesta.status_code == 200
+    assert 'Maíz' in respuesta.get_data(as_text=True)
@@ -0,0 +1,92 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from conftest import iniciar_sesion
+from extensiones import db
+from modelos import Animal, User, VersionTabla
+
+
+def test_etag_responde_304_hasta_que_cambia_la_tabla(admin, datos):
+    primera = admin.get('/api/v1/animales')
+    assert primera.status_code == 200
+    etag = primera.headers['ETag']
+    repetida = admin.get('/api/v1/animales', headers={'If-None-Match': etag})
+    assert repetida.status_code == 304
+    assert repetida.get_data() == b''
+    # Una respuesta 304 no consulta la tabla: sólo lee su versión.
+    assert int(repetida.headers['X-Consultas-SQL']) == 1
+
+    assert admin.patch(f"/api/v1/animales/{datos['vacas'][0]}", json={'nombre': 'Lola'}).status_code == 200
+    cambiada = admin.get('/api/v1/animales', headers={'If-None-Match': etag})
+    assert cambiada.status_code == 200
+    assert cambiada.headers['ETag'] != etag
+    assert cambiada.get_json()['datos'][0]['nombre'] == 'Lola'
+    # Otras tablas no se ven afectadas.
+    corrales = admin.get('/api/v1/corrales')
+    assert admin.get('/api/v1/corrales', headers={'If-None-Match': corrales.headers['ETag']}).status_code == 304
+
+
+def test_etag_distinto_por_consulta_y_por_usuario(app, admin, cuidador, datos):
+    etag = admin.get('/api/v1/animales').headers['ETag']
+    assert admin.get('/api/v1/animales?estado=Inactivo', headers={'If-None-Match': etag}).status_code == 200
+    assert cuidador.get('/api/v1/animales', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_last_modified(app, admin, datos):
+    with app.app_context():
+        version = db.session.get(VersionTabla, 'animal')
+        version.modificada_en = datetime.utcnow() - timedelta(minutes=5)
+        db.session.commit()
+    respuesta = admin.get('/api/v1/animales')
+    ultima = respuesta.last_modified
+    assert ultima is not None
+    assert admin.get('/api/v1/animales', headers={'If-Modified-Since': respuesta.headers['Last-Modified']}).status_code == 304
+    anterior = (ultima - timedelta(seconds=1)).strftime('%a, %d %b %Y %H:%M:%S GMT')
+    assert admin.get('/api/v1/animales', headers={'If-Modified-Since': anterior}).status_code == 200
+
+
+def test_sin_last_modified_en_el_segundo_de_la_modificacion(app, admin, datos):
+    # Se empieza al comienzo de un segundo para que la petición no caiga en el siguiente.
+    while datetime.now(timezone.utc).microsecond > 500_000:
+        time.sleep(0.01)
+    with app.app_context():
+        db.session.get(VersionTabla, 'animal').modificada_en = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.session.commit()
+    assert admin.get('/api/v1/animales').last_modified is None
+
+
+def test_permisos_y_errores_en_json(app, cuidador, datos):
+    assert app.test_client().get('/api/v1/animales').status_code == 401
+    respuesta = cuidador.get('/api/v1/alertas')
+    assert respuesta.status_code == 403 and 'error' in respuesta.get_json()
+    assert cuidador.delete('/api/v1/conteos/1').status_code == 405
+    assert cuidador.get('/api/v1/desconocido').status_code == 404
+    assert cuidador.get('/api/v1/animales/99999').status_code == 404
+
+
+def test_crear_y_validar(admin, datos):
+    respuesta = admin.post('/api/v1/animales', json={'tipo': 'Cerdo', 'estado': 'En rebaño'})
+    assert respuesta.status_code == 201
+    assert respuesta.get_json()['codigo_unico'] == 'CER-001'
+    assert admin.post('/api/v1/animales', json={'tipo': 'Toro'}).status_code == 400
+    assert admin.post('/api/v1/animales', json={'codigo_unico': 'X-1', 'tipo': 'Toro', 'estado': 'En rebaño'}).status_code == 400
+    assert admin.patch('/api/v1/potreros/1', json={'area_hectareas': 'mucha'}).status_code == 400
+    assert admin.post('/api/v1/corrales', json={'nombre': 'Corral Norte'}).status_code == 409
+
+
+def test_borrar_animal_lo_inactiva(app, admin, datos):
+    assert admin.delete(f"/api/v1/animales/{datos['vacas'][0]}").status_code == 204
+    with app.app_context():
+        assert db.session.get(Animal, datos['vacas'][0]).estado == 'Inactivo'
+
+
+def test_cuidador_solo_ve_sus_conteos(app, datos):
+    with app.app_context():
+        otro = User(username='otro', password_hash='-', rol='Cuidador')
+        db.session.add(otro)
+        db.session.commit()
+        otro_id = otro.id
+    cliente = iniciar_sesion(app.test_client(), otro_id, 'Cuidador')
+    assert cliente.get('/api/v1/conteos').get_json()['datos'] == []
+    assert cliente.post('/api/v1/conteos', json={'presentes': datos['vacas']}).status_code == 201
+    assert len(cliente.get('/api/v1/conteos').get_json()['datos']) == 1
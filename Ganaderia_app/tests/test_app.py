@@ -0,0 +1,99 @@
+import json
+import os
+import runpy
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from flask import Flask, session
+
+import configuracion
+from app import crear_app
+from extensiones import db
+from migraciones import aplicar_migraciones
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+def aplicacion(tmp_path, **config):
+    return crear_app({'TESTING': True, 'SECRET_KEY': 'pruebas', 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'ganaderia.db'}",
+                      'CACHE_BACKEND': 'memoria', **config})
+
+
+def test_clave_secreta_compartida_entre_procesos(tmp_path):
+    directorio = str(tmp_path / 'instance')
+    with ProcessPoolExecutor(4) as procesos:
+        claves = set(procesos.map(configuracion.clave_secreta, [directorio] * 8))
+    assert len(claves) == 1
+    # Se conserva entre reinicios y no quedan candidatas sueltas.
+    assert configuracion.clave_secreta(directorio) in claves
+    assert os.listdir(directorio) == ['secret_key']
+    assert os.stat(os.path.join(directorio, 'secret_key')).st_mode & 0o777 == 0o600
+
+
+def entrar():
+    session['user_id'] = 7
+    return ''
+
+
+def quien():
+    return str(session.get('user_id'))
+
+
+def test_sesion_firmada_por_un_worker_vale_en_otro(tmp_path):
+    # Sin SECRET_KEY configurada cada worker toma la de su carpeta instance.
+    workers = []
+    for _ in range(2):
+        app = Flask('ganaderia', instance_path=str(tmp_path))
+        configuracion.cargar_configuracion(app)
+        app.add_url_rule('/entrar', view_func=entrar)
+        app.add_url_rule('/quien', view_func=quien)
+        workers.append(app)
+    primero, segundo = (app.test_client() for app in workers)
+    primero.get('/entrar')
+    segundo.set_cookie('session', primero.get_cookie('session').value)
+    assert segundo.get('/quien').get_data(as_text=True) == '7'
+
+
+def test_orden_de_carga_de_la_configuracion(tmp_path, monkeypatch):
+    archivo = tmp_path / 'ganaderia.json'
+    archivo.write_text(json.dumps({'CACHE_TTL': 10, 'TRABAJOS_HILOS': 3, 'ROTACION_MAX_SEMANAS': 8}))
+    monkeypatch.setenv('GANADERIA_CONFIG', str(archivo))
+    monkeypatch.setenv('GANADERIA_TRABAJOS_HILOS', '0')
+    monkeypatch.setenv('GANADERIA_BLUEPRINTS', '["auth", "api"]')
+    app = aplicacion(tmp_path, ROTACION_MAX_SEMANAS=4)
+    assert (app.config['CACHE_TTL'], app.config['TRABAJOS_HILOS'], app.config['ROTACION_MAX_SEMANAS']) == (10, 0, 4)
+    assert set(app.blueprints) == {'auth', 'api'}
+    rutas = {regla.rule for regla in app.url_map.iter_rules()}
+    assert '/api/v1/<recurso>' in rutas and '/gestionar_animales' not in rutas
+
+
+def test_precalentar_compila_las_plantillas(tmp_path):
+    app = aplicacion(tmp_path, PRECALENTAR=True)
+    compiladas = {nombre for _, nombre in app.jinja_env.cache.keys()}
+    assert compiladas == set(app.jinja_env.list_templates(extensions=('html',)))
+    assert not aplicacion(tmp_path).jinja_env.cache
+
+
+def test_gunicorn_no_arranca_con_migraciones_pendientes(tmp_path, monkeypatch):
+    # El perfil fija estas variables con setdefault: se definen antes para no dejarlas en el entorno.
+    monkeypatch.setenv('CACHE_BACKEND', 'memoria')
+    monkeypatch.setenv('GANADERIA_PRECALENTAR', 'false')
+    perfil = runpy.run_path(GUNICORN_CONF)
+    assert perfil['preload_app'] and perfil['workers'] >= 1
+    app = aplicacion(tmp_path)
+    errores = []
+    servidor = types.SimpleNamespace(app=types.SimpleNamespace(wsgi=lambda: app),
+                                     log=types.SimpleNamespace(error=lambda mensaje, *args: errores.append(mensaje % args)))
+    with app.app_context():
+        db.create_all()
+    with pytest.raises(SystemExit):
+        perfil['on_starting'](servidor)
+    assert 'flask --app wsgi migrar' in errores[0]
+    with app.app_context():
+        aplicar_migraciones(db.engine)
+    perfil['on_starting'](servidor)
+    perfil['post_fork'](servidor, None)
+    assert len(errores) == 1
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,124 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import update
+
+import migraciones
+from comandos import archivar_datos_frios
+from conftest import crear_animales
+from extensiones import db
+from modelos import (Alerta, Animal, AnimalHistorico, Conteo, ConteoHistorico, HistorialEstadoAnimal, Tratamiento, TratamientoHistorico,
+                     VersionTabla)
+from rutas.conteos import registrar_conteo
+
+HACE_TIEMPO = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def frios(app, usuarios, datos):
+    """Un animal inactivo desde 2020 con un tratamiento y dos conteos de 2020:
+    uno con la alerta resuelta y otro con la alerta pendiente."""
+    with app.app_context():
+        viejo = crear_animales(1, prefijo='VIE')[0]
+        db.session.add(Tratamiento(nombre_tratamiento='Ivermectina', descripcion=None, fecha_aplicacion=date(2019, 12, 1), animal_id=viejo))
+        db.session.commit()
+        db.session.execute(update(Animal).where(Animal.id == viejo).values(estado='Inactivo'))
+        db.session.execute(update(HistorialEstadoAnimal).where(HistorialEstadoAnimal.animal_id == viejo).values(valido_desde=HACE_TIEMPO))
+        conteos = []
+        for resuelta in (True, False):
+            conteo, alerta = registrar_conteo(usuarios['Cuidador'], 1, 0, [(datos['vacas'][0], 'VAC-001')], HACE_TIEMPO, HACE_TIEMPO)
+            alerta.resuelta = resuelta
+            db.session.flush()
+            conteos.append(conteo.id)
+        db.session.commit()
+        return {'animal': viejo, 'conteo_resuelto': conteos[0], 'conteo_pendiente': conteos[1]}
+
+
+def versiones(*tablas):
+    return {fila.tabla: fila.version for fila in VersionTabla.query.filter(VersionTabla.tabla.in_(tablas))}
+
+
+def test_archivar_y_leer_desde_el_archivo(app, admin, datos, frios):
+    with app.app_context():
+        antes = versiones('animal', 'conteo')
+        resultado = archivar_datos_frios()
+        assert (resultado.animales, resultado.conteos) == (1, 1)
+
+        assert db.session.get(Animal, frios['animal']) is None
+        assert db.session.get(AnimalHistorico, frios['animal']).archivado
+        assert TratamientoHistorico.query.filter_by(animal_id=frios['animal'], archivado=True).count() == 1
+        assert db.session.get(ConteoHistorico, frios['conteo_resuelto']).archivado
+        # El conteo con alerta pendiente y el inactivo reciente siguen en la base principal.
+        assert db.session.get(Conteo, frios['conteo_pendiente']) is not None
+        assert Alerta.query.filter_by(conteo_id=frios['conteo_pendiente']).count() == 1
+        assert db.session.get(Animal, datos['inactivo']) is not None
+        despues = versiones('animal', 'conteo')
+        assert all(despues[tabla] > antes.get(tabla, 0) for tabla in ('animal', 'conteo'))
+
+    respuesta = admin.get(f"/animal/{frios['animal']}/historial")
+    assert respuesta.status_code == 200
+    assert 'Ivermectina' in respuesta.get_data(as_text=True)
+
+
+def test_archivar_de_nuevo_no_mueve_nada(app, frios):
+    with app.app_context():
+        archivar_datos_frios()
+        antes = versiones('animal', 'conteo', 'tratamiento')
+        resultado = archivar_datos_frios()
+        assert (resultado.animales, resultado.conteos) == (0, 0)
+        assert versiones('animal', 'conteo', 'tratamiento') == antes
+        assert AnimalHistorico.query.filter_by(id=frios['animal']).count() == 1
+
+
+def test_api_no_responde_304_con_datos_archivados(app, admin, frios):
+    primera = admin.get('/api/v1/animales?tamano=200')
+    assert frios['animal'] in [animal['id'] for animal in primera.get_json()['datos']]
+    with app.app_context():
+        archivar_datos_frios()
+    segunda = admin.get('/api/v1/animales?tamano=200', headers={'If-None-Match': primera.headers['ETag']})
+    assert segunda.status_code == 200
+    assert frios['animal'] not in [animal['id'] for animal in segunda.get_json()['datos']]
+
+
+def test_un_animal_nuevo_no_hereda_el_historial_archivado(app, frios):
+    with app.app_context():
+        # El animal frío es el de id más alto: sin AUTOINCREMENT SQLite reutilizaría su id.
+        assert db.session.scalar(db.select(db.func.max(Animal.id))) == frios['animal']
+        archivar_datos_frios()
+        nuevo = crear_animales(1, prefijo='NUE')[0]
+        assert nuevo > frios['animal']
+        assert [animal.archivado for animal in AnimalHistorico.query.filter_by(id=nuevo)] == [False]
+        assert TratamientoHistorico.query.filter_by(animal_id=nuevo).count() == 0
+        assert HistorialEstadoAnimal.query.filter_by(animal_id=nuevo).count() == 1
+
+
+def test_la_migracion_siembra_la_secuencia_con_el_archivo(app, frios):
+    with app.app_context():
+        archivar_datos_frios()
+        with db.engine.begin() as conexion:
+            conexion.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'animal'")
+            migraciones.ids_sin_reutilizar(conexion)
+        assert crear_animales(1, prefijo='NUE')[0] > frios['animal']
+
+
+def test_copia_con_clave_en_conflicto_no_pisa_el_archivo(app, frios):
+    with app.app_context():
+        with db.engine.begin() as conexion:
+            conexion.exec_driver_sql(
+                "INSERT INTO archivo.animal (id, codigo_unico, tipo, estado) VALUES (?, 'OTRO-001', 'Vaca', 'Vendido')", (frios['animal'],))
+        with pytest.raises(RuntimeError, match='misma clave'):
+            archivar_datos_frios()
+        assert db.session.get(Animal, frios['animal']) is not None
+        with db.engine.connect() as conexion:
+            assert conexion.exec_driver_sql('SELECT codigo_unico FROM archivo.animal').scalars().all() == ['OTRO-001']
+            assert conexion.exec_driver_sql('SELECT COUNT(*) FROM archivo.conteo').scalar() == 0
+
+
+def test_copia_interrumpida_se_completa(app, frios):
+    with app.app_context():
+        # Filas ya copiadas en una ejecución que no llegó a borrarlas de la base principal.
+        with db.engine.begin() as conexion:
+            conexion.exec_driver_sql('INSERT INTO archivo.animal SELECT * FROM main.animal WHERE id = ?', (frios['animal'],))
+        resultado = archivar_datos_frios()
+        assert (resultado.animales, resultado.conteos) == (1, 1)
+        assert AnimalHistorico.query.filter_by(id=frios['animal']).count() == 1
@@ -0,0 +1,50 @@
+import benchmark
+import resumenes
+from extensiones import db
+from modelos import Alerta, Animal, Conteo, Tratamiento
+
+
+def fila(ruta='index', concurrencia=1, **valores):
+    return {'ruta': ruta, 'concurrencia': concurrencia, 'peticiones': 3, 'errores': 0, 'p50_ms': 1.0, 'p95_ms': 2.0,
+            'p99_ms': 3.0, 'throughput_rps': 10.0, 'consultas_sql': 2, 'rss_pico_mb': 50.0, **valores}
+
+
+def test_percentil_y_milisegundos():
+    assert benchmark.percentil([], 95) is None
+    assert benchmark.percentil([4, 1, 3, 2], 50) == 2.5
+    assert benchmark.percentil([1, 2, 3, 4, 5], 100) == 5
+    assert benchmark.en_ms(None) is None
+    assert benchmark.en_ms(0.0123456) == 12.35
+
+
+def test_comparar_detecta_regresiones():
+    base = {'resultados': [fila(), fila('login')]}
+    actuales = [fila(p95_ms=2.4), fila('login', p95_ms=2.6, consultas_sql=3, errores=1), fila('nueva', p95_ms=100.0)]
+    assert benchmark.comparar(actuales, base, 0.25) == [
+        'login (c=1): p95 2.0 -> 2.6 ms',
+        'login (c=1): consultas SQL 2 -> 3',
+        'login (c=1): errores 0 -> 1',
+    ]
+
+
+def test_comparar_e_imprimir_sin_muestras(capsys):
+    vacia = fila(peticiones=0, p50_ms=None, p95_ms=None, p99_ms=None, throughput_rps=None, consultas_sql=None)
+    assert benchmark.comparar([vacia], {'resultados': [fila()]}, 0.25) == []
+    assert benchmark.comparar([fila()], {'resultados': [vacia]}, 0.25) == []
+    benchmark.imprimir([vacia])
+    assert capsys.readouterr().out.splitlines()[2].split()[4:9] == ['-'] * 5
+
+
+def test_rutas_sin_errores_sobre_base_sintetica(app):
+    app.config['VERIFICAR_PRESUPUESTO_CONSULTAS'] = True
+    app.config['PRESUPUESTO_CONSULTAS'] = {}
+    with app.app_context():
+        benchmark.sembrar(db.engine.url.database, animales=300, conteos=200, tratamientos=100, alertas=20, abiertas=10)
+        with db.engine.begin() as conexion:
+            resumenes.reconstruir(conexion)
+        assert [db.session.query(modelo).count() for modelo in (Animal, Conteo, Tratamiento, Alerta)] == [300, 200, 100, 20]
+    ctx = benchmark.contexto_rutas(app)
+    for ruta in benchmark.rutas_benchmark(ctx):
+        resultado = benchmark.medir_ruta(app, ruta, concurrencia=2, repeticiones=2)
+        assert resultado['peticiones'] == 2 and resultado['errores'] == 0, ruta.nombre
+        assert resultado['p95_ms'] is not None
@@ -0,0 +1,88 @@
+import pytest
+
+import busqueda
+from extensiones import db
+from modelos import Animal, Tratamiento
+
+JSON = {'Accept': 'application/json'}
+
+
+def buscar(cliente, q, **parametros):
+    return cliente.get('/buscar', query_string={'q': q, **parametros}, headers=JSON).get_json()
+
+
+def codigos(respuesta):
+    return [fila['codigo_unico'] for fila in respuesta['resultados']]
+
+
+def verificar_indices(conexion):
+    # FTS5 compara el índice con la tabla de contenido y lanza un error si difieren.
+    for tabla in busqueda.INDICES:
+        conexion.exec_driver_sql(f"INSERT INTO {tabla}_fts ({tabla}_fts) VALUES ('integrity-check')")
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('vac 00', '"vac"* "00"*'),
+    ('"VAC-001" OR NEAR(x)', '"VAC"* "001"* "OR"* "NEAR"* "x"*'),
+    ('ivermectína*', '"ivermectína"*'),
+    ('  -- ** ', ''),
+    (None, ''),
+])
+def test_expresion_fts(texto, esperado):
+    assert busqueda.expresion_fts(texto) == esperado
+
+
+def test_resaltar_escapa_el_html():
+    assert busqueda.resaltar('<b>\x02Lola\x03</b>') == '&lt;b&gt;<mark>Lola</mark>&lt;/b&gt;'
+
+
+def test_busqueda_por_prefijo_y_sin_acentos(admin, datos):
+    respuesta = buscar(admin, 'vac 00')
+    # INA-001 es una vaca: coincide por tipo, que pesa menos que el código.
+    assert codigos(respuesta) == [f'VAC-{numero:03d}' for numero in range(1, 9)] + ['INA-001']
+    assert respuesta['totales'] == {'animales': 9, 'tratamientos': 0, 'alertas': 3}
+    assert buscar(admin, 'tor 003')['resultados'][0]['codigo_resaltado'] == '<mark>TOR</mark>-<mark>003</mark>'
+    tratamientos = buscar(admin, 'IVERMECTÍNA', en='tratamientos')
+    assert sorted(codigos(tratamientos)) == ['VAC-001', 'VAC-002', 'VAC-003', 'VAC-004']
+    assert len(buscar(admin, 'vac-002', en='alertas')['resultados']) == 2
+
+
+def test_paginacion_por_numero(admin, datos):
+    primera = buscar(admin, 'vac', tamano='5')
+    segunda = buscar(admin, 'vac', tamano='5', pagina='2')
+    assert primera['hay_siguiente'] and not segunda['hay_siguiente']
+    assert codigos(primera) + codigos(segunda) == [f'VAC-{numero:03d}' for numero in range(1, 9)] + ['INA-001']
+
+
+def test_triggers_siguen_inserciones_cambios_y_borrados(app, admin, datos):
+    with app.app_context():
+        vaca = db.session.get(Animal, datos['vacas'][0])
+        vaca.nombre = 'Margarita'
+        db.session.execute(db.insert(Animal), [{'codigo_unico': f'BUF-{numero:03d}', 'tipo': 'Búfalo', 'estado': 'En rebaño'} for numero in range(1, 4)])
+        tratamiento = Tratamiento.query.filter_by(animal_id=datos['vacas'][1]).one()
+        db.session.delete(tratamiento)
+        db.session.commit()
+        verificar_indices(db.session.connection())
+    assert codigos(buscar(admin, 'margarita')) == ['VAC-001']
+    assert buscar(admin, 'margarita')['resultados'][0]['resaltado'] == '<mark>Margarita</mark>'
+    assert codigos(buscar(admin, 'bufalo')) == ['BUF-001', 'BUF-002', 'BUF-003']
+    assert 'VAC-002' not in codigos(buscar(admin, 'ivermectina', en='tratamientos'))
+
+    with app.app_context():
+        db.session.get(Animal, datos['vacas'][0]).nombre = 'Rosa'
+        db.session.execute(db.delete(Animal).where(Animal.tipo == 'Búfalo'))
+        db.session.commit()
+        verificar_indices(db.session.connection())
+    assert buscar(admin, 'margarita')['resultados'] == []
+    assert buscar(admin, 'bufalo')['resultados'] == []
+
+
+def test_texto_vacio_o_con_sintaxis_fts(admin, datos):
+    assert buscar(admin, '')['resultados'] == []
+    assert buscar(admin, '" AND (')['resultados'] == []
+    assert admin.get('/buscar?q=vac&en=usuarios').status_code == 404
+    assert admin.get('/buscar?q=<script>').status_code == 200
+
+
+def test_buscar_requiere_administrador(cuidador):
+    assert cuidador.get('/buscar?q=vac').status_code == 302
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from cache import BackendMemoria, BackendSQLite, Cache
+from extensiones import cache, db
+from modelos import Alerta, Corral
+
+
+def test_memoria_lru_y_ttl(monkeypatch):
+    backend = BackendMemoria(max_entradas=2)
+    memo = Cache(backend, ttl=60)
+    memo.memorizar('a', ('animal',), lambda: 1)
+    memo.memorizar('b', ('corral',), lambda: 2)
+    assert memo.memorizar('a', ('animal',), lambda: 'no se llama') == 1
+    memo.memorizar('c', ('corral',), lambda: 3)
+    # 'b' era la menos usada.
+    assert len(backend) == 2 and memo.memorizar('b', ('corral',), lambda: 'nuevo') == 'nuevo'
+    ahora = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: ahora + 61)
+    assert memo.memorizar('a', ('animal',), lambda: 'vencida') == 'vencida'
+
+
+@pytest.mark.parametrize('backend', ['memoria', 'sqlite'])
+def test_invalidar_por_etiqueta(tmp_path, backend):
+    crear = (lambda: BackendMemoria()) if backend == 'memoria' else (lambda: BackendSQLite(str(tmp_path / 'cache.db')))
+    memo = Cache(crear())
+    memo.memorizar('alertas', ('alerta', 'conteo'), lambda: [1])
+    memo.memorizar('corrales', ('corral',), lambda: [2])
+    memo.invalidar({'conteo'})
+    assert memo.memorizar('alertas', ('alerta', 'conteo'), lambda: 'recalculado') == 'recalculado'
+    assert memo.memorizar('corrales', ('corral',), lambda: 'no se llama') == [2]
+
+
+def test_sqlite_compartida_entre_workers(tmp_path):
+    # Dos backends sobre el mismo archivo hacen de dos workers.
+    uno, otro = Cache(BackendSQLite(str(tmp_path / 'cache.db'))), Cache(BackendSQLite(str(tmp_path / 'cache.db')))
+    uno.memorizar('corrales', ('corral',), lambda: ['Norte'])
+    assert otro.memorizar('corrales', ('corral',), lambda: 'no se llama') == ['Norte']
+    otro.invalidar({'corral'})
+    assert uno.memorizar('corrales', ('corral',), lambda: ['Sur']) == ['Sur']
+
+
+def test_commit_invalida_y_rollback_no(app):
+    with app.app_context():
+        cache.memorizar('corrales', ('corral',), lambda: 'en caché')
+        db.session.add(Corral(nombre='Descartado', capacidad=1))
+        db.session.flush()
+        db.session.rollback()
+        assert cache.memorizar('corrales', ('corral',), lambda: 'recalculado') == 'en caché'
+        db.session.add(Corral(nombre='Sur', capacidad=10))
+        db.session.commit()
+        assert cache.memorizar('corrales', ('corral',), lambda: 'recalculado') == 'recalculado'
+
+
+def test_sentencias_masivas_tambien_invalidan(app):
+    with app.app_context():
+        cache.memorizar('alertas', ('alerta',), lambda: 'en caché')
+        db.session.execute(db.update(Alerta).values(resuelta=True))
+        db.session.commit()
+        assert cache.memorizar('alertas', ('alerta',), lambda: 'recalculado') == 'recalculado'
+
+
+def test_listado_en_cache_se_actualiza_al_resolver(admin, datos):
+    primera = admin.get('/gestionar_alertas?resuelta=0')
+    repetida = admin.get('/gestionar_alertas?resuelta=0')
+    assert int(repetida.headers['X-Consultas-SQL']) < int(primera.headers['X-Consultas-SQL'])
+    assert repetida.get_data() == primera.get_data()
+    admin.get(f"/alerta/resolver/{datos['alertas'][0]}")
+    despues = admin.get('/gestionar_alertas?resuelta=0').get_data(as_text=True)
+    assert f"Alerta #{datos['alertas'][0]}<" not in despues and f"Alerta #{datos['alertas'][1]}<" in despues
@@ -0,0 +1,51 @@
+import threading
+
+import migraciones
+from conftest import crear_animales
+from extensiones import db
+from modelos import Animal, SecuenciaCodigo, reservar_codigos
+
+
+def test_codigos_consecutivos_por_prefijo(app):
+    with app.app_context():
+        assert reservar_codigos('Vaca') == ['VAC-001']
+        assert reservar_codigos('vaca lechera', 3) == ['VAC-002', 'VAC-003', 'VAC-004']
+        assert reservar_codigos('Toro') == ['TOR-001']
+        db.session.commit()
+
+
+def test_reservas_simultaneas_no_se_repiten(app):
+    codigos, errores = [], []
+
+    def reservar():
+        try:
+            with app.app_context():
+                for _ in range(10):
+                    codigos.extend(reservar_codigos('Vaca', 2))
+                    db.session.commit()
+        except Exception as error:
+            errores.append(error)
+
+    hilos = [threading.Thread(target=reservar) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
+    assert sorted(codigos) == [f'VAC-{numero:03d}' for numero in range(1, 121)]
+
+
+def test_alta_de_animal_usa_la_secuencia(app, admin):
+    for _ in range(2):
+        admin.post('/animal/add', data={'tipo': 'Toro', 'nombre': '', 'estado': 'En rebaño'})
+    with app.app_context():
+        assert sorted(animal.codigo_unico for animal in Animal.query) == ['TOR-001', 'TOR-002']
+
+
+def test_la_migracion_parte_del_mayor_codigo_emitido(app):
+    with app.app_context():
+        crear_animales(1, prefijo='VAC', desde=41, estado='Inactivo')
+        db.session.execute(db.delete(SecuenciaCodigo))
+        migraciones.secuencia_codigos(db.session.connection())
+        assert reservar_codigos('Vaca') == ['VAC-042']
+        db.session.commit()
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+import pytest
+
+import exportacion
+
+
+def test_csv_envia_el_encabezado_antes_de_leer_filas():
+    leidas = []
+
+    def filas():
+        for numero in range(3):
+            leidas.append(numero)
+            yield (numero, f'fila {numero}')
+
+    generador = exportacion.generar_csv(['id', 'texto'], filas())
+    assert next(generador) == 'id,texto\r\n'
+    assert leidas == []
+    assert ''.join(generador) == '0,fila 0\r\n1,fila 1\r\n2,fila 2\r\n'
+
+
+def test_ndjson_envia_la_primera_linea_sin_esperar_un_bloque():
+    generador = exportacion.generar_ndjson(['id', 'fecha'], iter([(1, date(2024, 5, 1)), (2, datetime(2024, 5, 2, 6, 30))]))
+    assert json.loads(next(generador)) == {'id': 1, 'fecha': '2024-05-01'}
+    assert [json.loads(linea) for linea in ''.join(generador).splitlines()] == [{'id': 2, 'fecha': '2024-05-02T06:30:00'}]
+    assert list(exportacion.generar_ndjson(['id'], iter([]))) == []
+
+
+@pytest.mark.parametrize('formato', ['csv', 'ndjson'])
+def test_bloques_acotados(monkeypatch, formato):
+    monkeypatch.setattr(exportacion, 'TAMANO_BLOQUE', 100)
+    bloques = list(exportacion.generar(formato, ['id', 'texto'], ((numero, 'x' * 20) for numero in range(50))))
+    assert len(bloques) > 10
+    assert all(len(bloque) < 200 for bloque in bloques)
+
+
+def test_exportar_conteos_y_tratamientos(admin, datos):
+    respuesta = admin.get('/exportar/conteos.csv')
+    assert respuesta.status_code == 200
+    assert respuesta.is_streamed
+    assert respuesta.headers['Content-Disposition'].startswith('attachment; filename="conteos-')
+    filas = list(csv.DictReader(io.StringIO(respuesta.get_data(as_text=True))))
+    assert len(filas) == 3
+    assert all(fila['cuidador'] == 'cuidador' and fila['alerta_id'] for fila in filas)
+
+    respuesta = admin.get(f"/exportar/tratamientos.ndjson?animal_id={datos['vacas'][0]}")
+    lineas = [json.loads(linea) for linea in respuesta.get_data(as_text=True).splitlines()]
+    assert [(linea['codigo_unico'], linea['nombre_tratamiento']) for linea in lineas] == [('VAC-001', 'Ivermectina')]
+
+
+def test_exportar_filtra_por_fecha_y_rechaza_entidades_desconocidas(admin, datos):
+    assert admin.get('/exportar/alertas.csv?hasta=2000-01-01').get_data(as_text=True).splitlines() == ['id,conteo_id,fecha_hora,resuelta,mensaje']
+    assert admin.get('/exportar/alertas.csv?desde=fecha').status_code == 400
+    assert admin.get('/exportar/usuarios.csv').status_code == 404
+    assert admin.get('/exportar/conteos.xml').status_code == 404
+
+
+def test_exportar_requiere_administrador(cuidador):
+    assert cuidador.get('/exportar/conteos.csv').status_code == 302
@@ -0,0 +1,99 @@
+import time
+from datetime import datetime, timedelta
+
+import historial
+from extensiones import db
+from modelos import Alerta, Animal, Conteo, HistorialEstadoAnimal
+
+JSON = {'Accept': 'application/json'}
+
+
+def estados(app, animal_id):
+    with app.app_context():
+        return db.session.scalars(db.select(HistorialEstadoAnimal.estado).filter_by(animal_id=animal_id).order_by(HistorialEstadoAnimal.id)).all()
+
+
+def instante():
+    # Los triggers guardan milisegundos: se separan los momentos para que no empaten.
+    time.sleep(0.005)
+    momento = datetime.utcnow()
+    time.sleep(0.005)
+    return momento
+
+
+def test_triggers_registran_altas_y_cambios_de_estado(app, admin, datos):
+    vaca = datos['vacas'][0]
+    assert estados(app, vaca) == ['En rebaño']
+    admin.patch(f'/api/v1/animales/{vaca}', json={'nombre': 'Sin cambio de estado'})
+    admin.patch(f'/api/v1/animales/{vaca}', json={'estado': 'En rebaño'})
+    assert estados(app, vaca) == ['En rebaño']
+    admin.patch(f'/api/v1/animales/{vaca}', json={'estado': 'En cuarentena'})
+    admin.delete(f'/api/v1/animales/{vaca}')
+    assert estados(app, vaca) == ['En rebaño', 'En cuarentena', 'Inactivo']
+    with app.app_context():
+        db.session.execute(db.insert(Animal), [{'codigo_unico': 'MAS-001', 'tipo': 'Vaca', 'estado': 'Vendido'}])
+        db.session.execute(db.update(Animal).where(Animal.codigo_unico == 'MAS-001').values(estado='En rebaño'))
+        db.session.commit()
+        nuevo = db.session.scalar(db.select(Animal.id).filter_by(codigo_unico='MAS-001'))
+    assert estados(app, nuevo) == ['Vendido', 'En rebaño']
+
+
+def test_rebano_y_composicion_en_el_pasado(app, datos):
+    antes = instante()
+    with app.app_context():
+        db.session.get(Animal, datos['vacas'][0]).estado = 'Vendido'
+        db.session.get(Animal, datos['toros'][0]).estado = 'En cuarentena'
+        db.session.add(Animal(codigo_unico='VAC-100', tipo='Vaca', estado='En rebaño'))
+        db.session.commit()
+        conexion = db.session.connection()
+        assert historial.composicion_en(conexion, antes) == {'En rebaño': 12, 'Inactivo': 1}
+        assert historial.composicion_en(conexion, datetime.utcnow()) == {'En cuarentena': 1, 'En rebaño': 11, 'Inactivo': 1, 'Vendido': 1}
+        codigos_antes = [codigo for _, codigo in historial.rebano_en(conexion, antes)]
+        assert 'VAC-001' in codigos_antes and 'TOR-001' in codigos_antes and 'VAC-100' not in codigos_antes
+        assert [codigo for _, codigo in historial.rebano_en(conexion, antes, 'Inactivo')] == ['INA-001']
+        # Antes del historial no había rebaño registrado.
+        assert historial.composicion_en(conexion, historial.inicio_historial(conexion) - timedelta(seconds=1)) == {}
+
+
+def test_conteo_compara_con_el_rebano_del_formulario(app, cuidador, datos):
+    formulario = cuidador.get('/iniciar_conteo').get_data(as_text=True)
+    referencia = formulario.split('name="referencia_en" value="')[1].split('"')[0]
+    time.sleep(0.005)
+    with app.app_context():
+        # Mientras se contaba: una vaca se vendió y entró un animal nuevo.
+        db.session.get(Animal, datos['vacas'][0]).estado = 'Vendido'
+        db.session.add(Animal(codigo_unico='VAC-100', tipo='Vaca', estado='En rebaño'))
+        db.session.commit()
+    presentes = [str(id_) for id_ in datos['vacas'][1:] + datos['toros']]
+    cuidador.post('/guardar_conteo', data={'animales_presentes': presentes, 'referencia_en': referencia})
+    with app.app_context():
+        alerta = Alerta.query.order_by(Alerta.id.desc()).first()
+        assert alerta.mensaje == 'Discrepancia en conteo. Faltan 1 animales: VAC-001'
+        assert alerta.conteo.animales_esperados == 12
+
+
+def test_referencia_vencida_usa_el_rebano_actual(app, cuidador, datos):
+    vencida = (datetime.utcnow() - timedelta(hours=app.config['CONTEO_VIGENCIA_FORMULARIO_HORAS'] + 1)).strftime(historial.FORMATO_MOMENTO)
+    with app.app_context():
+        db.session.get(Animal, datos['vacas'][0]).estado = 'Vendido'
+        alertas = Alerta.query.count()
+        db.session.commit()
+    presentes = [str(id_) for id_ in datos['vacas'][1:] + datos['toros']]
+    for referencia in (vencida, 'no es una fecha', ''):
+        cuidador.post('/guardar_conteo', data={'animales_presentes': presentes, 'referencia_en': referencia})
+    with app.app_context():
+        # Con la referencia vencida se habría esperado un rebaño vacío (anterior al historial).
+        assert [conteo.animales_esperados for conteo in Conteo.query.order_by(Conteo.id.desc()).limit(3)] == [11, 11, 11]
+        assert Alerta.query.count() == alertas
+
+
+def test_pagina_de_composicion(admin, datos):
+    respuesta = admin.get('/rebano/composicion', headers=JSON).get_json()
+    assert respuesta['composicion'] == {'En rebaño': 12, 'Inactivo': 1}
+    assert len(respuesta['en_rebano']) == 12
+    # Una fecha sola es el cierre de ese día.
+    ayer = (datetime.utcnow() - timedelta(days=1)).date().isoformat()
+    respuesta = admin.get(f'/rebano/composicion?momento={ayer}', headers=JSON).get_json()
+    assert respuesta['momento'] == f'{ayer}T23:59:59.999999' and respuesta['composicion'] == {}
+    assert admin.get('/rebano/composicion?momento=ayer').status_code == 400
+    assert admin.get('/rebano/composicion').status_code == 200
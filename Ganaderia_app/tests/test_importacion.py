@@ -0,0 +1,62 @@
+import io
+
+from extensiones import db
+from modelos import Animal
+
+JSON = {'Accept': 'application/json'}
+
+
+def importar(cliente, contenido, nombre, **formulario):
+    return cliente.post('/animal/importar', headers=JSON, content_type='multipart/form-data',
+                        data={'archivo': (io.BytesIO(contenido), nombre), **formulario}).get_json()
+
+
+def test_importar_csv_por_lotes(app, admin):
+    filas = ''.join(f'Vaca,V{numero},En rebaño\n' for numero in range(25))
+    informe = importar(admin, ('tipo,nombre,estado\n' + filas).encode(), 'animales.csv', tamano_lote='10')
+    assert (informe['insertados'], informe['lotes'], informe['total_errores']) == (25, 3, 0)
+    with app.app_context():
+        codigos = sorted(animal.codigo_unico for animal in Animal.query)
+        assert codigos == [f'VAC-{numero:03d}' for numero in range(1, 26)]
+
+
+def test_filas_invalidas_no_detienen_el_ingreso(app, admin):
+    lineas = [
+        '{"tipo": "Vaca", "nombre": "Lola", "estado": "En rebaño"}',
+        '{"tipo": "Jirafa", "estado": "En rebaño"}',
+        '{"tipo": "Cerdo", "estado": "Perdido"}',
+        '{no es json',
+        '[1, 2]',
+        '{"tipo": ["Vaca"], "estado": "En rebaño"}',
+        '{"tipo": "Cerdo", "nombre": 7, "estado": "En rebaño"}',
+        '{"tipo": "Pollo", "nombre": "' + 'x' * 101 + '", "estado": "En rebaño"}',
+        '',
+        '{"tipo": "Cerdo", "estado": "En cuarentena"}',
+    ]
+    informe = importar(admin, '\n'.join(lineas).encode(), 'animales.ndjson')
+    assert informe['insertados'] == 2
+    assert [error['linea'] for error in informe['errores']] == [2, 3, 4, 5, 6, 7, 8]
+    with app.app_context():
+        assert sorted((animal.tipo, animal.estado) for animal in Animal.query) == [('Cerdo', 'En cuarentena'), ('Vaca', 'En rebaño')]
+
+
+def test_tamano_de_lote_acotado(app, admin):
+    app.config['IMPORTACION_TAMANO_LOTE_MAXIMO'] = 4
+    filas = ''.join('Chivo,,En rebaño\n' for _ in range(10))
+    informe = importar(admin, ('tipo,nombre,estado\n' + filas).encode(), 'a.csv', tamano_lote='100000')
+    assert (informe['insertados'], informe['lotes']) == (10, 3)
+
+
+def test_archivo_ilegible_detiene_la_importacion(app, admin):
+    informe = importar(admin, b'tipo,nombre,estado\nVaca,,En reba\xf1o\n', 'a.csv')
+    assert informe['insertados'] == 0
+    assert informe['errores'][0]['linea'] is None
+
+
+def test_comando_importar(app, tmp_path):
+    ruta = tmp_path / 'animales.csv'
+    ruta.write_text('tipo,nombre,estado\nCordero,,En rebaño\nCordero,,En rebaño\n', encoding='utf-8')
+    resultado = app.test_cli_runner().invoke(args=['importar-animales', str(ruta)])
+    assert resultado.exit_code == 0, resultado.output
+    with app.app_context():
+        assert db.session.query(Animal).filter_by(tipo='Cordero').count() == 2
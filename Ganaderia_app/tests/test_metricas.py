@@ -0,0 +1,88 @@
+import os
+import re
+import time
+
+import pytest
+
+from metricas import Perfilador, Registro
+
+
+def valor(texto, linea):
+    encontrada = re.search(rf'^{re.escape(linea)} (\S+)$', texto, re.MULTILINE)
+    return float(encontrada.group(1)) if encontrada else 0.0
+
+
+def test_formato_de_texto_prometheus():
+    registro = Registro('prueba')
+    registro.incrementar('peticiones_total', 'Peticiones.', endpoint='index', estado=200)
+    registro.incrementar('peticiones_total', 'Peticiones.', valor=2, endpoint='index', estado=200)
+    registro.fijar('cola', 7, 'Trabajos.', estado='Pendiente "urgente"')
+    for segundos in (0.003, 0.2, 30):
+        registro.observar('duracion_segundos', segundos, 'Latencia.', endpoint='index')
+    texto = registro.exponer()
+    assert '# TYPE prueba_peticiones_total counter' in texto
+    assert 'prueba_peticiones_total{endpoint="index",estado="200"} 3' in texto
+    assert 'prueba_cola{estado="Pendiente \\"urgente\\""} 7' in texto
+    # Los buckets son acumulados y terminan en +Inf con el total.
+    assert 'prueba_duracion_segundos_bucket{endpoint="index",le="0.005"} 1' in texto
+    assert 'prueba_duracion_segundos_bucket{endpoint="index",le="0.25"} 2' in texto
+    assert 'prueba_duracion_segundos_bucket{endpoint="index",le="10"} 2' in texto
+    assert 'prueba_duracion_segundos_bucket{endpoint="index",le="+Inf"} 3' in texto
+    assert 'prueba_duracion_segundos_count{endpoint="index"} 3' in texto
+    assert valor(texto, 'prueba_duracion_segundos_sum{endpoint="index"}') == pytest.approx(30.203)
+
+
+def test_medir_seccion():
+    registro = Registro('prueba')
+    with registro.medir('reporte'):
+        pass
+    assert 'prueba_seccion_duracion_segundos_count{seccion="reporte"} 1' in registro.exponer()
+
+
+def test_metrics_requiere_administrador_o_token(app, cuidador, admin):
+    assert app.test_client().get('/metrics').status_code == 401
+    assert cuidador.get('/metrics').status_code == 401
+    assert admin.get('/metrics').status_code == 200
+    app.config['METRICAS_TOKEN'] = 'secreto'
+    assert app.test_client().get('/metrics', headers={'Authorization': 'Bearer otro'}).status_code == 401
+    respuesta = app.test_client().get('/metrics', headers={'Authorization': 'Bearer secreto'})
+    assert respuesta.status_code == 200
+    assert respuesta.content_type.startswith('text/plain; version=0.0.4')
+
+
+def test_peticiones_y_consultas_por_endpoint(admin, datos):
+    linea = 'ganaderia_peticiones_total{endpoint="animales.gestionar_animales",estado="200",metodo="GET"}'
+    antes = valor(admin.get('/metrics').get_data(as_text=True), linea)
+    admin.get('/gestionar_animales')
+    admin.get('/gestionar_animales')
+    texto = admin.get('/metrics').get_data(as_text=True)
+    assert valor(texto, linea) == antes + 2
+    assert valor(texto, 'ganaderia_sql_consultas_por_peticion_count{endpoint="animales.gestionar_animales"}') >= 2
+    assert 'ganaderia_plantilla_duracion_segundos_count{plantilla="gestionar_animales.html"}' in texto
+    assert 'ganaderia_trabajos{estado="Fallido"} 0' in texto
+    assert re.search(r'^ganaderia_cache_aciertos\{backend="BackendMemoria"\} \d+$', texto, re.MULTILINE)
+
+
+def test_perfilado_guarda_las_peticiones_lentas(app, admin, tmp_path):
+    directorio = tmp_path / 'perfiles'
+    app.config.update(PERFILADO_UMBRAL_MS=0.0, PERFILADO_MUESTREO=1.0, PERFILADO_MODO='cprofile', PERFILADO_DIRECTORIO=str(directorio))
+    admin.get('/gestionar_corrales')
+    perfiles = os.listdir(directorio)
+    assert len(perfiles) == 1 and perfiles[0].endswith('.prof') and '-infraestructura.gestionar_corrales-' in perfiles[0]
+
+    app.config['PERFILADO_UMBRAL_MS'] = 60_000.0
+    admin.get('/gestionar_corrales')
+    assert len(os.listdir(directorio)) == 1
+
+
+def test_perfilador_de_pilas(tmp_path):
+    perfilador = Perfilador('pilas', intervalo=0.001)
+    fin = time.perf_counter() + 0.05
+    while time.perf_counter() < fin:
+        pass
+    assert perfilador.detener() >= 0.05
+    ruta = perfilador.guardar(str(tmp_path), 'lenta')
+    with open(ruta, encoding='utf-8') as archivo:
+        primera = archivo.readline()
+    assert 'test_perfilador_de_pilas (test_metricas.py' in primera
+    assert int(primera.rsplit(' ', 1)[1]) > 0
@@ -0,0 +1,76 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from app import crear_app
+from extensiones import db
+from migraciones import MIGRACIONES, TABLAS_AUTOINCREMENT, aplicar_migraciones, migraciones_pendientes
+
+# Base con el esquema original (seis tablas, sin índices ni columnas nuevas).
+BASE_ORIGINAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'database.db')
+
+
+def contar_filas(ruta, tablas):
+    with sqlite3.connect(ruta) as conexion:
+        return {tabla: conexion.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0] for tabla in tablas}
+
+
+@pytest.fixture
+def app_original(tmp_path):
+    ruta = tmp_path / 'original.db'
+    shutil.copy(BASE_ORIGINAL, ruta)
+    aplicacion = crear_app({'TESTING': True, 'SECRET_KEY': 'pruebas', 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{ruta}', 'CACHE_BACKEND': 'memoria'})
+    yield aplicacion, ruta
+    with aplicacion.app_context():
+        db.engine.dispose()
+
+
+def test_migrar_la_base_original(app_original):
+    app, ruta = app_original
+    tablas = ('animal', 'conteo', 'alerta', 'tratamiento', 'user', 'corral')
+    filas = contar_filas(ruta, tablas)
+    with app.app_context():
+        assert [version for version, _ in migraciones_pendientes(db.engine)] == sorted(version for version, _, _ in MIGRACIONES)
+        db.create_all()
+        aplicadas = aplicar_migraciones(db.engine)
+        assert [version for version, _ in aplicadas] == sorted(version for version, _, _ in MIGRACIONES)
+        assert migraciones_pendientes(db.engine) == []
+        assert aplicar_migraciones(db.engine) == []
+        conexion = db.session.connection()
+        indices = {fila[0] for fila in conexion.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'ix_animal_estado_codigo', 'ix_conteo_user_fecha', 'ix_alerta_resuelta', 'ix_tratamiento_animal_fecha',
+                'ix_tratamiento_proxima_dosis'} <= indices
+        columnas = {fila[1] for fila in conexion.exec_driver_sql('PRAGMA table_info(tratamiento)')}
+        assert {'retiro_hasta', 'proxima_dosis', 'campana_id'} <= columnas
+        # Cada animal existente parte del historial con su estado actual.
+        sin_historial = conexion.exec_driver_sql(
+            'SELECT COUNT(*) FROM animal WHERE id NOT IN (SELECT animal_id FROM historial_estado_animal)').scalar()
+        assert sin_historial == 0
+        # Las tablas reconstruidas con AUTOINCREMENT conservan sus triggers.
+        for tabla in TABLAS_AUTOINCREMENT:
+            definicion = conexion.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)).scalar()
+            assert 'AUTOINCREMENT' in definicion
+        disparadores = {fila[0] for fila in conexion.exec_driver_sql("SELECT tbl_name FROM sqlite_master WHERE type = 'trigger'")}
+        assert {'animal', 'tratamiento', 'alerta'} <= disparadores
+        db.session.remove()
+    assert contar_filas(ruta, tablas) == filas
+
+
+def test_perfil_de_conexion(app):
+    with app.app_context():
+        conexion = db.session.connection()
+        assert conexion.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conexion.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+        assert conexion.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+
+
+def test_consultas_calientes_usan_indices(app):
+    with app.app_context():
+        conexion = db.session.connection()
+        plan = conexion.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM animal WHERE estado = 'En rebaño' ORDER BY codigo_unico LIMIT 20").all()
+        assert any('ix_animal_estado_codigo' in fila[-1] for fila in plan)
+        plan = conexion.exec_driver_sql('EXPLAIN QUERY PLAN SELECT id FROM alerta WHERE resuelta = 0 ORDER BY id DESC LIMIT 20').all()
+        assert any('ix_alerta_resuelta' in fila[-1] for fila in plan)
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from conftest import crear_animales
+from extensiones import db
+from modelos import Animal, Conteo
+from paginacion import codificar_cursor, paginar
+
+ORDENES = {'tipo': (Animal.tipo, False), 'id': (Animal.id, True)}
+
+
+def recorrer(app, consulta, ordenes, clave_primaria, orden, direccion, tamano):
+    """Todas las páginas siguiendo el cursor; devuelve los ids en orden."""
+    vistos, cursor = [], None
+    while True:
+        argumentos = {'orden': orden, 'dir': direccion, 'tamano': tamano, **({'cursor': cursor} if cursor else {})}
+        with app.test_request_context('/', query_string=argumentos):
+            pagina = paginar(consulta, ordenes, 'id', clave_primaria)
+        assert len(pagina.elementos) <= tamano
+        vistos.extend(elemento.id for elemento in pagina.elementos)
+        cursor = pagina.siguiente_cursor
+        if not cursor:
+            return vistos
+
+
+@pytest.fixture
+def rebano(app):
+    # Muchos empates en `tipo`: el desempate por id debe evitar saltos y repeticiones.
+    with app.app_context():
+        crear_animales(7, tipo='Vaca')
+        crear_animales(5, tipo='Toro', prefijo='TOR')
+        crear_animales(6, tipo='Ternero', prefijo='TER')
+        db.session.commit()
+
+
+@pytest.mark.parametrize('direccion', ['asc', 'desc'])
+@pytest.mark.parametrize('tamano', [1, 3, 5, 18, 50])
+def test_cursor_recorre_cada_fila_una_vez(app, rebano, direccion, tamano):
+    with app.app_context():
+        esperado = [animal.id for animal in Animal.query.order_by(
+            *((Animal.tipo.desc(), Animal.id.desc()) if direccion == 'desc' else (Animal.tipo, Animal.id)))]
+        assert recorrer(app, Animal.query, ORDENES, Animal.id, 'tipo', direccion, tamano) == esperado
+
+
+def test_cursor_con_fechas_empatadas(app, usuarios):
+    with app.app_context():
+        momentos = [datetime(2024, 5, 1, 6), datetime(2024, 5, 1, 6), datetime(2024, 5, 2, 6), datetime(2024, 5, 2, 6), datetime(2024, 5, 3)]
+        db.session.add_all(Conteo(fecha_hora=momento, animales_esperados=1, animales_contados=1, user_id=usuarios['Cuidador']) for momento in momentos)
+        db.session.commit()
+        esperado = [conteo.id for conteo in Conteo.query.order_by(Conteo.fecha_hora.desc(), Conteo.id.desc())]
+        vistos = recorrer(app, Conteo.query, {'fecha': (Conteo.fecha_hora, True), 'id': (Conteo.id, True)}, Conteo.id, 'fecha', 'desc', 2)
+        assert vistos == esperado
+
+
+def test_cursor_de_otro_orden_vuelve_al_inicio(app, rebano):
+    cursor = codificar_cursor('id:desc', [3])
+    with app.app_context(), app.test_request_context('/', query_string={'orden': 'tipo', 'tamano': 2, 'cursor': cursor}):
+        pagina = paginar(Animal.query, ORDENES, 'id', Animal.id)
+        assert pagina.cursor_actual is None
+        assert [animal.id for animal in pagina.elementos] == [animal.id for animal in Animal.query.order_by(Animal.tipo, Animal.id).limit(2)]
+
+
+@pytest.mark.parametrize('cursor', ['no-es-base64!', codificar_cursor('tipo:asc', ['Vaca'])])
+def test_cursor_invalido(app, rebano, cursor):
+    with app.app_context(), app.test_request_context('/', query_string={'orden': 'tipo', 'cursor': cursor}):
+        with pytest.raises(BadRequest):
+            paginar(Animal.query, ORDENES, 'id', Animal.id)
+
+
+def test_api_sigue_el_cursor(app, admin, rebano):
+    vistos, url = [], '/api/v1/animales?tamano=4'
+    while url:
+        cuerpo = admin.get(url).get_json()
+        vistos.extend(animal['id'] for animal in cuerpo['datos'])
+        url = f"/api/v1/animales?tamano=4&cursor={cuerpo['siguiente']}" if cuerpo['siguiente'] else None
+    with app.app_context():
+        assert vistos == sorted(animal.id for animal in Animal.query)
+
+
+def test_listado_filtra_en_el_servidor(app, admin, rebano):
+    with app.app_context():
+        crear_animales(2, estado='Inactivo', prefijo='INA')
+        db.session.commit()
+    activos = admin.get('/gestionar_animales?tamano=200').get_data(as_text=True)
+    assert 'VAC-001' in activos and 'INA-001' not in activos
+    inactivos = admin.get('/gestionar_animales?estado=Inactivo').get_data(as_text=True)
+    assert 'INA-001' in inactivos and 'VAC-001' not in inactivos
+    toros = admin.get('/gestionar_animales?tipo=Toro&tamano=200').get_data(as_text=True)
+    assert 'TOR-005' in toros and 'VAC-001' not in toros
+
+
+def test_orden_no_permitido_usa_el_orden_por_defecto(app, rebano):
+    with app.app_context(), app.test_request_context('/', query_string={'orden': 'nombre; DROP TABLE animal', 'tamano': 3}):
+        pagina = paginar(Animal.query, ORDENES, 'id', Animal.id)
+        assert [animal.id for animal in pagina.elementos] == [animal.id for animal in Animal.query.order_by(Animal.id.desc()).limit(3)]
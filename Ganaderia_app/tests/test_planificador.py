@@ -0,0 +1,110 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+import planificador
+from extensiones import db
+from modelos import AsignacionRotacion, PlanRotacion
+from planificador import CorralPlan, Grupo, PotreroPlan
+
+
+def instancia(semilla, grupos=6, potreros=10, corrales=2):
+    azar = random.Random(semilla)
+    return (
+        [Grupo(numero, azar.randint(3, 40)) for numero in range(1, grupos + 1)],
+        [PotreroPlan(100 + numero, azar.uniform(1, 30), azar.choice(('Bueno', 'Regular', 'Malo', None)), azar.choice((None, 0, 14, 60)))
+         for numero in range(potreros)],
+        [CorralPlan(200 + numero, azar.randint(10, 60)) for numero in range(corrales)],
+    )
+
+
+@pytest.mark.parametrize('semilla', range(8))
+def test_el_plan_respeta_capacidad_descanso_y_exclusividad(semilla):
+    grupos, potreros, corrales = instancia(semilla)
+    semanas, descanso_dias = 8, 21
+    asignaciones, _, sin_asignar = planificador.planificar(grupos, potreros, corrales, semanas, descanso_dias)
+    cabezas = {grupo.id: grupo.cabezas for grupo in grupos}
+    por_id = {potrero.id: potrero for potrero in potreros}
+    capacidad_corral = {corral.id: corral.capacidad for corral in corrales}
+    descanso = {potrero.id: descanso_dias if potrero.dias_sin_uso is None else potrero.dias_sin_uso for potrero in potreros}
+    assert len(asignaciones) == semanas * len(grupos)
+    assert sin_asignar == sum(1 for asignacion in asignaciones if asignacion.potrero_id is None and asignacion.corral_id is None)
+    for semana in range(semanas):
+        de_la_semana = [asignacion for asignacion in asignaciones if asignacion.semana == semana]
+        assert sorted(asignacion.grupo_id for asignacion in de_la_semana) == sorted(cabezas)
+        usados = [asignacion.potrero_id for asignacion in de_la_semana if asignacion.potrero_id]
+        assert len(usados) == len(set(usados))
+        for asignacion in de_la_semana:
+            if asignacion.potrero_id:
+                potrero = por_id[asignacion.potrero_id]
+                capacidad = potrero.area_hectareas * planificador.CALIDAD_PASTO.get(potrero.estado_pasto, planificador.CALIDAD_POR_DEFECTO) * planificador.CARGA_POR_HECTAREA
+                assert capacidad >= cabezas[asignacion.grupo_id]
+                assert descanso[asignacion.potrero_id] >= descanso_dias
+        for corral_id, capacidad in capacidad_corral.items():
+            assert sum(cabezas[asignacion.grupo_id] for asignacion in de_la_semana if asignacion.corral_id == corral_id) <= capacidad
+        descanso = {id_: 0 if id_ in usados else dias + 7 for id_, dias in descanso.items()}
+
+
+@pytest.mark.parametrize('semilla', range(20))
+def test_la_busqueda_local_no_deja_mejoras_de_un_paso(semilla):
+    grupos, potreros, _ = instancia(semilla, grupos=5, potreros=7)
+    cabezas = np.array([grupo.cabezas for grupo in grupos], dtype=float)
+    calidad = np.array([planificador.CALIDAD_PASTO.get(potrero.estado_pasto, planificador.CALIDAD_POR_DEFECTO) for potrero in potreros])
+    capacidad = np.array([potrero.area_hectareas for potrero in potreros]) * calidad * planificador.CARGA_POR_HECTAREA
+    descanso = np.full(len(potreros), 60.0)
+    puntaje = planificador.puntajes(np, cabezas, capacidad, descanso, calidad, 35)
+    asignado = planificador.asignar_semana(np, puntaje, np.argsort(-cabezas, kind='stable'))
+
+    def total(asignacion):
+        return sum(puntaje[grupo, potrero] for grupo, potrero in enumerate(asignacion) if potrero >= 0)
+
+    actual = total(asignado)
+    assert np.isfinite(actual)
+    for i, j in itertools.combinations(np.flatnonzero(asignado >= 0), 2):
+        cambiado = asignado.copy()
+        cambiado[i], cambiado[j] = cambiado[j], cambiado[i]
+        assert total(cambiado) <= actual + 1e-9
+    for grupo in np.flatnonzero(asignado >= 0):
+        for libre in set(range(len(potreros))) - set(asignado.tolist()):
+            cambiado = asignado.copy()
+            cambiado[grupo] = libre
+            assert total(cambiado) <= actual + 1e-9
+
+
+def test_sin_potreros_viables_usa_corrales():
+    grupos = [Grupo(1, 30), Grupo(2, 20), Grupo(3, 15)]
+    potreros = [PotreroPlan(10, 1.0, 'Bueno', None)]
+    asignaciones, puntaje, sin_asignar = planificador.planificar(grupos, potreros, [CorralPlan(20, 40)], 1)
+    # Los grupos grandes eligen primero: el de 30 entra al corral y no queda lugar para el de 20 ni el de 15.
+    assert sorted((asignacion.grupo_id, asignacion.corral_id) for asignacion in asignaciones) == [(1, 20), (2, None), (3, None)]
+    assert (puntaje, sin_asignar) == (0.0, 2)
+    assert planificador.planificar([], potreros, [], 4) == ([], 0.0, 0)
+
+
+def test_un_potrero_usado_descansa_antes_de_volver():
+    grupos = [Grupo(1, 10)]
+    potreros = [PotreroPlan(10, 10.0, 'Bueno', None), PotreroPlan(11, 10.0, 'Bueno', None)]
+    asignaciones, _, _ = planificador.planificar(grupos, potreros, [], 6, descanso_dias=14)
+    # Usado en la semana 0, al empezar la 2 lleva sólo 7 días de descanso: vuelve en la 3.
+    assert [asignacion.potrero_id for asignacion in asignaciones] == [10, 11, None, 10, 11, None]
+
+
+def test_generar_plan(app, admin, datos):
+    respuesta = admin.post('/planificacion_pastoreo/generar', data={'semanas': '4', 'descanso_dias': '21', 'carga_por_hectarea': '2'})
+    assert respuesta.status_code == 302
+    with app.app_context():
+        plan = PlanRotacion.query.one()
+        assert (plan.semanas, plan.descanso_dias) == (4, 21)
+        asignaciones = db.session.scalars(db.select(AsignacionRotacion).filter_by(plan_id=plan.id)).all()
+        assert len(asignaciones) == 4 * 2
+    pagina = admin.get(respuesta.headers['Location'])
+    assert pagina.status_code == 200 and 'Lecheras' in pagina.get_data(as_text=True)
+
+
+@pytest.mark.parametrize('formulario', [{'semanas': '0'}, {'semanas': '4', 'carga_por_hectarea': '-1'}, {'semanas': '4', 'fecha_inicio': '31-12-2024'}])
+def test_generar_plan_valida_el_formulario(app, admin, datos, formulario):
+    admin.post('/planificacion_pastoreo/generar', data=formulario)
+    with app.app_context():
+        assert PlanRotacion.query.count() == 0
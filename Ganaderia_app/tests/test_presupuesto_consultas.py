@@ -0,0 +1,79 @@
+"""Cada ruta de PRESUPUESTO_CONSULTAS se recorre con datos de varias filas: si
+una consulta por fila vuelve a colarse, la petición falla con
+PresupuestoConsultasExcedido."""
+from datetime import date, datetime
+
+import pytest
+
+import historial
+from instrumentacion import PresupuestoConsultasExcedido
+
+# (rol, método, ruta, cuerpo). Las rutas se completan con el fixture `datos`;
+# el cuerpo es una función de `datos` que devuelve kwargs para el cliente.
+RUTAS = [
+    ('Cuidador', 'GET', '/dashboard_cuidador', None),
+    ('Cuidador', 'GET', '/iniciar_conteo', None),
+    ('Cuidador', 'POST', '/guardar_conteo', lambda datos: {'data': {
+        'animales_presentes': [str(id_) for id_ in datos['vacas'][2:]],
+        'referencia_en': datetime.utcnow().strftime(historial.FORMATO_MOMENTO),
+    }}),
+    ('Cuidador', 'POST', '/conteo/sesion', lambda datos: {'headers': {'Accept': 'application/json'}}),
+    ('Cuidador', 'POST', '/conteo/sesion/{sesion}/lote', lambda datos: {'json': {
+        'numero': 1, 'ids': datos['vacas'][:3], 'codigos': ['TOR-001', 'TOR-002', 'NO-EXISTE'],
+    }}),
+    ('Cuidador', 'POST', '/conteo/sesion/{sesion}/finalizar', None),
+    ('Administrador', 'GET', '/alerta/resolver/{alerta}', None),
+    ('Administrador', 'GET', '/reportes/tendencias', None),
+    ('Administrador', 'GET', '/ver_reportes', None),
+    ('Administrador', 'GET', '/gestionar_alertas', None),
+    ('Administrador', 'GET', '/animal/{vaca}/historial', None),
+    ('Administrador', 'GET', '/tratamiento/campanas', None),
+    ('Administrador', 'POST', '/tratamiento/campanas', lambda datos: {'data': {
+        'nombre_tratamiento': 'Vacuna aftosa', 'fecha_aplicacion': date.today().isoformat(), 'tipo': 'Vaca',
+        'dias_retiro': '14', 'dias_refuerzo': '180', 'codigos': '',
+    }}),
+    ('Administrador', 'GET', '/tratamiento/pendientes', None),
+    ('Administrador', 'GET', '/buscar?q=VAC', None),
+    ('Administrador', 'POST', '/alimento/movimiento', lambda datos: {'data': {
+        'tipo': 'Consumo', 'cantidad_kg': '15', 'alimento_id': str(datos['alimento']),
+    }}),
+    ('Administrador', 'GET', '/alimentos/pronostico', None),
+    ('Administrador', 'GET', '/planificacion_pastoreo', None),
+    ('Administrador', 'GET', '/rebano/composicion', None),
+    ('Administrador', 'POST', '/planificacion_pastoreo/generar', lambda datos: {'data': {
+        'semanas': '6', 'descanso_dias': '21', 'carga_por_hectarea': '2.0', 'fecha_inicio': date.today().isoformat(),
+    }}),
+]
+
+
+def endpoint(app, metodo, ruta):
+    return app.url_map.bind('localhost').match(ruta.split('?')[0].format(vaca=1, alerta=1, sesion=1), method=metodo)[0]
+
+
+def test_todas_las_rutas_con_presupuesto_estan_cubiertas(app):
+    cubiertas = {endpoint(app, metodo, ruta) for _, metodo, ruta, _ in RUTAS}
+    assert set(app.config['PRESUPUESTO_CONSULTAS']) <= cubiertas
+
+
+@pytest.mark.parametrize('rol, metodo, ruta, cuerpo', RUTAS, ids=[f'{metodo} {ruta}' for _, metodo, ruta, _ in RUTAS])
+def test_ruta_dentro_del_presupuesto(app, admin, cuidador, datos, rol, metodo, ruta, cuerpo):
+    cliente = admin if rol == 'Administrador' else cuidador
+    url = ruta.format(vaca=datos['vacas'][0], alerta=datos['alertas'][0], sesion=datos['sesion'])
+    respuesta = cliente.open(url, method=metodo, **(cuerpo(datos) if cuerpo else {}))
+    assert respuesta.status_code < 400, respuesta.get_data(as_text=True)
+    # Una redirección a login significaría que la ruta no llegó a consultar nada.
+    assert '/login' not in respuesta.headers.get('Location', '')
+    presupuesto = app.config['PRESUPUESTO_CONSULTAS'][endpoint(app, metodo, ruta)]
+    assert int(respuesta.headers['X-Consultas-SQL']) <= presupuesto
+
+
+def test_exceder_el_presupuesto_falla_la_peticion(app, admin, datos):
+    app.config['PRESUPUESTO_CONSULTAS'] = {**app.config['PRESUPUESTO_CONSULTAS'], 'conteos.gestionar_alertas': 0}
+    with pytest.raises(PresupuestoConsultasExcedido):
+        admin.get('/gestionar_alertas')
+
+
+def test_rutas_sin_presupuesto_solo_informan(app, admin, datos):
+    respuesta = admin.get('/gestionar_animales')
+    assert respuesta.status_code == 200
+    assert int(respuesta.headers['X-Consultas-SQL']) > 0
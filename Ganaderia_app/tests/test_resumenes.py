@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import resumenes
+from extensiones import db
+from modelos import AnimalFaltante, ResumenDiarioAlertas, ResumenDiarioCuidador, ResumenFaltasAnimal
+
+TABLAS = (ResumenDiarioCuidador, ResumenFaltasAnimal, ResumenDiarioAlertas)
+
+
+def foto():
+    return {modelo.__tablename__: sorted(tuple(getattr(fila, columna.name) for columna in modelo.__table__.columns)
+                                         for fila in modelo.query) for modelo in TABLAS}
+
+
+def test_resumenes_incrementales(app, admin, cuidador, usuarios, datos):
+    admin.get(f"/alerta/resolver/{datos['alertas'][0]}")
+    cuidador.post('/guardar_conteo', data={'animales_presentes': [str(id_) for id_ in datos['vacas'] + datos['toros']]})
+    # Los resúmenes usan la fecha UTC del conteo.
+    hoy = datetime.utcnow().date()
+    with app.app_context():
+        cuidador_hoy = db.session.get(ResumenDiarioCuidador, (hoy, usuarios['Cuidador']))
+        assert (cuidador_hoy.conteos, cuidador_hoy.conteos_con_discrepancia, cuidador_hoy.animales_faltantes) == (4, 3, 6)
+        # El primer animal faltó en los tres conteos con discrepancia, el tercero sólo en uno.
+        assert db.session.get(ResumenFaltasAnimal, datos['vacas'][0]).veces == 3
+        assert db.session.get(ResumenFaltasAnimal, datos['vacas'][2]).veces == 1
+        alertas_hoy = db.session.get(ResumenDiarioAlertas, hoy)
+        assert (alertas_hoy.alertas_creadas, alertas_hoy.alertas_resueltas) == (3, 1)
+
+
+def test_reconstruir_coincide_con_lo_incremental(app, admin, datos):
+    admin.get(f"/alerta/resolver/{datos['alertas'][1]}")
+    with app.app_context():
+        incremental = foto()
+    resultado = app.test_cli_runner().invoke(args=['reconstruir-resumenes'])
+    assert resultado.exit_code == 0, resultado.output
+    with app.app_context():
+        assert foto() == incremental
+
+
+def test_reconstruir_completa_faltantes_desde_el_mensaje(app, datos):
+    with app.app_context():
+        db.session.execute(db.delete(AnimalFaltante))
+        db.session.commit()
+        insertados = resumenes.reconstruir(db.session.connection())
+        db.session.commit()
+        assert insertados == 6
+        assert db.session.get(ResumenFaltasAnimal, datos['vacas'][0]).veces == 3
+
+
+def test_codigos_en_mensaje():
+    assert resumenes.codigos_en_mensaje('Discrepancia en conteo. Faltan 2 animales: VAC-001, TOR-002') == ['VAC-001', 'TOR-002']
+    assert resumenes.codigos_en_mensaje('Otro texto') == []
+
+
+def test_tendencias_leen_los_resumenes(admin, datos):
+    respuesta = admin.get(f'/reportes/tendencias?desde={datetime.utcnow():%Y-%m-%d}')
+    assert respuesta.status_code == 200
+    assert 'cuidador' in respuesta.get_data(as_text=True)
@@ -0,0 +1,133 @@
+import pytest
+from sqlalchemy import update
+
+import conjunto_bits
+import rutas.conteos
+from conftest import iniciar_sesion
+from extensiones import db
+from modelos import Alerta, AnimalFaltante, Conteo, LoteEscaneo, SesionConteo, User
+
+JSON = {'Accept': 'application/json'}
+
+
+@pytest.mark.parametrize('ids', [[], [0], [1, 7, 8, 9, 64, 1000], range(0, 300, 3)])
+def test_mapa_de_bits_ida_y_vuelta(ids):
+    mapa = conjunto_bits.desde_ids(ids)
+    assert list(conjunto_bits.ids(conjunto_bits.desde_bytes(conjunto_bits.a_bytes(mapa)))) == sorted(ids)
+    assert conjunto_bits.contar(mapa) == len(set(ids))
+
+
+def test_mapa_de_bits_rechaza_ids_negativos():
+    with pytest.raises(ValueError):
+        conjunto_bits.desde_ids([3, -1])
+
+
+def abrir(cliente):
+    respuesta = cliente.post('/conteo/sesion', headers=JSON)
+    assert respuesta.status_code == 201
+    return respuesta.get_json()
+
+
+def lote(cliente, sesion_id, numero, ids=(), codigos=()):
+    return cliente.post(f'/conteo/sesion/{sesion_id}/lote', json={'numero': numero, 'ids': list(ids), 'codigos': list(codigos)})
+
+
+def test_sesion_completa(app, cuidador, datos):
+    sesion = abrir(cuidador)
+    esperados = len(datos['vacas']) + len(datos['toros'])
+    assert (sesion['esperados'], sesion['presentes'], sesion['faltantes']) == (esperados, 0, esperados)
+
+    respuesta = lote(cuidador, sesion['sesion_id'], 1, datos['vacas'][:5], ['TOR-001', 'TOR-002'])
+    assert respuesta.get_json()['presentes'] == 7
+    # Un animal inactivo escaneado se informa, pero no cuenta como presente.
+    respuesta = lote(cuidador, sesion['sesion_id'], 2, [datos['vacas'][5], datos['inactivo']])
+    assert respuesta.get_json()['fuera_del_rebano'] == [datos['inactivo']]
+    assert respuesta.get_json()['presentes'] == 8
+    # El reintento del mismo lote no se suma dos veces.
+    respuesta = lote(cuidador, sesion['sesion_id'], 2, [datos['vacas'][6]])
+    assert respuesta.get_json()['duplicado'] is True
+    assert respuesta.get_json()['presentes'] == 8
+
+    final = cuidador.post(f"/conteo/sesion/{sesion['sesion_id']}/finalizar", headers=JSON).get_json()
+    assert (final['estado'], final['presentes'], final['faltantes']) == ('Finalizada', 8, 4)
+    assert final['alerta']
+    with app.app_context():
+        conteo = db.session.get(Conteo, final['conteo_id'])
+        assert (conteo.animales_esperados, conteo.animales_contados) == (esperados, 8)
+        faltantes = {fila.animal_id for fila in AnimalFaltante.query.filter_by(conteo_id=conteo.id)}
+        assert faltantes == {*datos['vacas'][6:], *datos['toros'][2:]}
+        assert Alerta.query.filter_by(conteo_id=conteo.id, resuelta=False).count() == 1
+        assert LoteEscaneo.query.filter_by(sesion_id=sesion['sesion_id']).count() == 2
+
+    assert cuidador.post(f"/conteo/sesion/{sesion['sesion_id']}/finalizar", headers=JSON).status_code == 409
+    assert lote(cuidador, sesion['sesion_id'], 3, datos['vacas'][:1]).status_code == 409
+
+
+def test_sesion_sin_faltantes_no_genera_alerta(app, cuidador, datos):
+    sesion = abrir(cuidador)
+    lote(cuidador, sesion['sesion_id'], 1, datos['vacas'] + datos['toros'])
+    final = cuidador.post(f"/conteo/sesion/{sesion['sesion_id']}/finalizar", headers=JSON).get_json()
+    assert (final['faltantes'], final['alerta']) == (0, None)
+
+
+@pytest.mark.parametrize('cuerpo', [
+    [1, 2],
+    {'numero': '1', 'ids': [1]},
+    {'numero': True, 'ids': [1]},
+    {'numero': 1, 'ids': [True]},
+    {'numero': 1, 'ids': '1,2'},
+    {'numero': 1, 'ids': [], 'codigos': [1]},
+    {'numero': 1, 'ids': [0]},
+    {'numero': 1, 'ids': [10 ** 12]},
+])
+def test_lote_invalido(app, cuidador, datos, cuerpo):
+    assert cuidador.post(f"/conteo/sesion/{datos['sesion']}/lote", json=cuerpo).status_code == 400
+    with app.app_context():
+        assert db.session.get(SesionConteo, datos['sesion']).presentes == b''
+
+
+def test_sesion_de_otro_cuidador(app, usuarios, datos):
+    with app.app_context():
+        otro = User(username='otro', password_hash='-', rol='Cuidador')
+        db.session.add(otro)
+        db.session.commit()
+        otro_id = otro.id
+    cliente = iniciar_sesion(app.test_client(), otro_id, 'Cuidador')
+    assert lote(cliente, datos['sesion'], 1, datos['vacas'][:1]).status_code == 404
+    assert cliente.post(f"/conteo/sesion/{datos['sesion']}/finalizar").status_code == 404
+
+
+@pytest.fixture
+def finalizada_en_paralelo(monkeypatch):
+    """Otra petición finaliza la sesión justo después de que la ruta la leyó."""
+    cargar = rutas.conteos.cargar_sesion_conteo
+
+    def cargar_y_finalizar(sesion_id):
+        sesion_conteo = cargar(sesion_id)
+        with db.engine.begin() as conexion:
+            conexion.execute(update(SesionConteo).where(SesionConteo.id == sesion_id).values(estado='Finalizada'))
+        return sesion_conteo
+
+    monkeypatch.setattr(rutas.conteos, 'cargar_sesion_conteo', cargar_y_finalizar)
+
+
+def test_finalizar_dos_veces_a_la_vez_registra_un_conteo(app, cuidador, datos, finalizada_en_paralelo):
+    with app.app_context():
+        conteos = Conteo.query.count()
+    assert cuidador.post(f"/conteo/sesion/{datos['sesion']}/finalizar", headers=JSON).status_code == 409
+    with app.app_context():
+        assert Conteo.query.count() == conteos
+
+
+def test_lote_que_llega_durante_la_finalizacion_no_se_aplica(app, cuidador, datos, finalizada_en_paralelo):
+    assert lote(cuidador, datos['sesion'], 1, datos['vacas'][:3]).status_code == 409
+    with app.app_context():
+        assert db.session.get(SesionConteo, datos['sesion']).presentes == b''
+        assert LoteEscaneo.query.filter_by(sesion_id=datos['sesion']).count() == 0
+
+
+def test_cantidad_de_codigos_por_lote_acotada(app, cuidador, datos):
+    app.config['CONTEO_LOTE_MAX_CODIGOS'] = 50
+    assert lote(cuidador, datos['sesion'], 1, codigos=[f'VAC-{numero:03d}' for numero in range(51)]).status_code == 400
+    respuesta = lote(cuidador, datos['sesion'], 1, codigos=[f'VAC-{numero:03d}' for numero in range(50)])
+    assert respuesta.get_json()['presentes'] == len(datos['vacas'])
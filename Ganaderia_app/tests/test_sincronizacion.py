@@ -0,0 +1,125 @@
+import gzip
+import json
+from datetime import date, datetime, timedelta
+
+import conjunto_bits
+from extensiones import db
+from modelos import ClaveSincronizacion, Conteo, LoteEscaneo, SesionConteo, Tratamiento
+
+
+def sincronizar(cliente, paquete, **kwargs):
+    return cliente.post('/api/v1/sincronizar', json=paquete, **kwargs)
+
+
+def estados(respuesta):
+    return [(resultado['clave'], resultado['estado']) for resultado in respuesta.get_json()['resultados']]
+
+
+def tratamiento(clave, animal_id, fecha=None, **extra):
+    return {'clave': clave, 'animal_id': animal_id, 'nombre_tratamiento': 'Ivermectina', 'descripcion': None,
+            'fecha_aplicacion': (fecha or date.today()).isoformat(), 'dias_retiro': 28, 'dias_refuerzo': None, **extra}
+
+
+def test_reenviar_el_paquete_no_aplica_dos_veces(app, cuidador, datos):
+    ahora = datetime.utcnow()
+    paquete = {
+        'conteos': [{'clave': 'c-1', 'registrado_en': ahora.isoformat(), 'referencia_en': ahora.isoformat(), 'presentes': datos['vacas']}],
+        'escaneos': [{'clave': 'e-1', 'sesion_id': datos['sesion'], 'numero': 1, 'ids': datos['vacas'][:2], 'codigos': ['TOR-001']}],
+        'tratamientos': [tratamiento('t-1', datos['vacas'][0])],
+    }
+    primera = sincronizar(cuidador, paquete)
+    assert primera.status_code == 200
+    assert primera.get_json()['totales']['aplicado'] == 3
+    ids = {resultado['clave']: resultado['id'] for resultado in primera.get_json()['resultados']}
+
+    segunda = sincronizar(cuidador, paquete)
+    assert segunda.get_json()['totales'] == {'aplicado': 0, 'duplicado': 3, 'conflicto': 0, 'invalido': 0}
+    # El duplicado informa el id de lo que creó el primer envío.
+    assert {resultado['clave']: resultado['id'] for resultado in segunda.get_json()['resultados']} == ids
+    with app.app_context():
+        assert Tratamiento.query.filter_by(animal_id=datos['vacas'][0]).count() == 2
+        assert Conteo.query.count() == 4
+        assert LoteEscaneo.query.filter_by(sesion_id=datos['sesion']).count() == 1
+        presentes = conjunto_bits.desde_bytes(db.session.get(SesionConteo, datos['sesion']).presentes)
+        assert sorted(conjunto_bits.ids(presentes)) == sorted(datos['vacas'][:2] + [datos['toros'][0]])
+
+
+def test_codigos_de_escaneo_se_buscan_por_tramos(app, cuidador, datos):
+    app.config['CONTEO_LOTE_MAX_CODIGOS'] = 2
+    paquete = {'escaneos': [
+        {'clave': 'e-1', 'sesion_id': datos['sesion'], 'numero': 1, 'ids': [], 'codigos': ['TOR-001', 'TOR-002', 'VAC-001']},
+        {'clave': 'e-2', 'sesion_id': datos['sesion'], 'numero': 2, 'ids': [], 'codigos': ['TOR-003', 'TOR-001', 'XXX-999']},
+    ]}
+    respuesta = sincronizar(cuidador, paquete).get_json()
+    assert [resultado['codigos_desconocidos'] for resultado in respuesta['resultados']] == [[], ['XXX-999']]
+    with app.app_context():
+        presentes = conjunto_bits.desde_bytes(db.session.get(SesionConteo, datos['sesion']).presentes)
+        assert sorted(conjunto_bits.ids(presentes)) == sorted(datos['toros'][:3] + datos['vacas'][:1])
+
+
+def test_clave_repetida_en_el_paquete(cuidador, datos):
+    paquete = {'tratamientos': [tratamiento('t-1', datos['vacas'][0]), tratamiento('t-1', datos['vacas'][1])]}
+    assert estados(sincronizar(cuidador, paquete)) == [('t-1', 'aplicado'), ('t-1', 'duplicado')]
+
+
+def test_conflicto_libera_la_clave_para_reenviar_corregido(app, cuidador, datos):
+    paquete = {'tratamientos': [tratamiento('t-1', 99999), tratamiento('t-2', datos['vacas'][1])]}
+    assert estados(sincronizar(cuidador, paquete)) == [('t-1', 'conflicto'), ('t-2', 'aplicado')]
+    with app.app_context():
+        assert {clave.clave for clave in ClaveSincronizacion.query} == {'t-2'}
+
+    paquete['tratamientos'][0]['animal_id'] = datos['vacas'][0]
+    assert estados(sincronizar(cuidador, paquete)) == [('t-1', 'aplicado'), ('t-2', 'duplicado')]
+
+
+def test_conteo_con_fecha_futura_es_conflicto(cuidador, datos):
+    futuro = (datetime.utcnow() + timedelta(hours=2)).isoformat()
+    paquete = {'conteos': [{'clave': 'c-1', 'registrado_en': futuro, 'referencia_en': futuro, 'presentes': []}]}
+    assert estados(sincronizar(cuidador, paquete)) == [('c-1', 'conflicto')]
+
+
+def test_escaneos_de_sesion_finalizada_o_con_ids_fuera_de_rango(cuidador, datos):
+    cuidador.post(f"/conteo/sesion/{datos['sesion']}/finalizar")
+    paquete = {'escaneos': [
+        {'clave': 'e-1', 'sesion_id': datos['sesion'], 'numero': 1, 'ids': [], 'codigos': []},
+        {'clave': 'e-2', 'sesion_id': datos['sesion'], 'numero': 2, 'ids': [10 ** 9], 'codigos': []},
+    ]}
+    assert estados(sincronizar(cuidador, paquete)) == [('e-1', 'conflicto'), ('e-2', 'conflicto')]
+    abierta = cuidador.post('/conteo/sesion', headers={'Accept': 'application/json'}).get_json()['sesion_id']
+    paquete = {'escaneos': [{'clave': 'e-3', 'sesion_id': abierta, 'numero': 1, 'ids': [10 ** 9], 'codigos': []}]}
+    assert estados(sincronizar(cuidador, paquete)) == [('e-3', 'invalido')]
+
+
+def test_lote_ya_recibido_por_la_ruta_es_duplicado(cuidador, datos):
+    cuidador.post(f"/conteo/sesion/{datos['sesion']}/lote", json={'numero': 1, 'ids': datos['vacas'][:2], 'codigos': []})
+    paquete = {'escaneos': [{'clave': 'e-1', 'sesion_id': datos['sesion'], 'numero': 1, 'ids': datos['vacas'][:2], 'codigos': []}]}
+    assert estados(sincronizar(cuidador, paquete)) == [('e-1', 'duplicado')]
+
+
+def test_registros_invalidos_y_roles(admin, datos):
+    ahora = datetime.utcnow().isoformat()
+    paquete = {
+        'conteos': [{'clave': 'c-1', 'registrado_en': ahora, 'referencia_en': ahora, 'presentes': []}],
+        'tratamientos': [tratamiento('t-1', datos['vacas'][0], dias_retiro=10 ** 6), tratamiento('t-2', datos['vacas'][0], dias_retiro='28'),
+                         tratamiento('t-3', datos['vacas'][0], fecha=date(9999, 12, 1), dias_retiro=3650)],
+    }
+    assert estados(sincronizar(admin, paquete)) == [('c-1', 'invalido'), ('t-1', 'invalido'), ('t-2', 'invalido'), ('t-3', 'invalido')]
+
+
+def test_paquete_gzip(cuidador, datos):
+    cuerpo = gzip.compress(json.dumps({'tratamientos': [tratamiento('t-1', datos['vacas'][0])]}).encode())
+    respuesta = cuidador.post('/api/v1/sincronizar', data=cuerpo, headers={'Content-Encoding': 'gzip'}, content_type='application/json')
+    assert estados(respuesta) == [('t-1', 'aplicado')]
+
+
+def test_paquetes_demasiado_grandes_o_malformados(app, cuidador, datos):
+    app.config['SINCRONIZACION_MAX_BYTES'] = 1024
+    grande = {'tratamientos': [tratamiento(f't-{numero}', datos['vacas'][0]) for numero in range(20)]}
+    assert sincronizar(cuidador, grande).status_code == 413
+    # Comprimido cabe en el límite, pero descomprimido lo supera.
+    bomba = gzip.compress(b'{"tratamientos": [' + b' ' * 100000 + b']}')
+    assert len(bomba) < 1024
+    respuesta = cuidador.post('/api/v1/sincronizar', data=bomba, headers={'Content-Encoding': 'gzip'}, content_type='application/json')
+    assert respuesta.status_code == 413
+    assert cuidador.post('/api/v1/sincronizar', data=b'{no es json', content_type='application/json').status_code == 400
+    assert app.test_client().post('/api/v1/sincronizar', json={}).status_code == 401
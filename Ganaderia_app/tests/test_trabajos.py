@@ -0,0 +1,133 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import trabajos
+from conftest import crear_animales
+from extensiones import db
+from modelos import Trabajo
+from rutas.conteos import registrar_conteo
+
+
+@pytest.fixture
+def manejadores(monkeypatch):
+    llamadas = []
+
+    def anotar(payload, config):
+        llamadas.append(payload)
+
+    def romper(payload, config):
+        raise ConnectionError('sin red')
+
+    monkeypatch.setitem(trabajos.MANEJADORES, 'anotar', anotar)
+    monkeypatch.setitem(trabajos.MANEJADORES, 'romper', romper)
+    return llamadas
+
+
+def encolar(app, tipo, **columnas):
+    with app.app_context():
+        trabajo = Trabajo(tipo=tipo, payload=json.dumps({'n': 1}), **columnas)
+        db.session.add(trabajo)
+        db.session.commit()
+        return trabajo.id
+
+
+def leer(app, trabajo_id):
+    with app.app_context():
+        return db.session.get(Trabajo, trabajo_id)
+
+
+def test_las_notificaciones_se_encolan_con_la_alerta(app, usuarios):
+    app.config['NOTIFICACIONES_ALERTA'] = {'email': ['a@b.c', 'd@e.f'], 'webhook': [], 'sms': ['600']}
+    with app.app_context():
+        faltantes = [(id_, f'VAC-{id_:03d}') for id_ in crear_animales(3)[1:]]
+        db.session.commit()
+        registrar_conteo(usuarios['Cuidador'], 3, 1, faltantes)
+        db.session.rollback()
+        assert Trabajo.query.count() == 0
+        registrar_conteo(usuarios['Cuidador'], 3, 1, faltantes)
+        db.session.commit()
+        assert sorted(trabajo.tipo for trabajo in Trabajo.query) == ['email', 'email', 'sms']
+        assert 'Faltan 2 animales' in json.loads(Trabajo.query.first().payload)['mensaje']
+
+
+def test_completar(app, manejadores):
+    trabajo_id = encolar(app, 'anotar')
+    with app.app_context():
+        assert trabajos.procesar_pendientes(db.engine, app.config) == 1
+    assert manejadores == [{'n': 1}]
+    trabajo = leer(app, trabajo_id)
+    assert (trabajo.estado, trabajo.intentos, trabajo.reservado_por) == ('Completado', 1, None)
+
+
+def test_reintento_con_espera_exponencial(app, manejadores, monkeypatch):
+    monkeypatch.setattr(trabajos.random, 'uniform', lambda a, b: 1.0)
+    trabajo_id = encolar(app, 'romper', max_intentos=3)
+    with app.app_context():
+        antes = datetime.utcnow()
+        assert trabajos.procesar_pendientes(db.engine, app.config) == 1
+        trabajo = db.session.get(Trabajo, trabajo_id)
+        assert (trabajo.estado, trabajo.intentos) == ('Pendiente', 1)
+        assert trabajo.ultimo_error == 'ConnectionError: sin red'
+        assert trabajo.proximo_intento >= antes + timedelta(seconds=trabajos.BACKOFF_BASE)
+        # No se vuelve a reclamar antes de tiempo.
+        assert trabajos.reclamar(db.engine, 'otro') == []
+    assert trabajos.espera_reintento(2) == timedelta(seconds=2 * trabajos.BACKOFF_BASE)
+    assert trabajos.espera_reintento(50) == timedelta(seconds=trabajos.BACKOFF_MAXIMO)
+
+
+def test_agotados_los_intentos_queda_fallido(app, manejadores):
+    trabajo_id = encolar(app, 'romper', max_intentos=2)
+    with app.app_context():
+        for _ in range(2):
+            db.session.execute(db.update(Trabajo).values(proximo_intento=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.commit()
+            trabajos.procesar_pendientes(db.engine, app.config)
+        trabajo = db.session.get(Trabajo, trabajo_id)
+        assert (trabajo.estado, trabajo.intentos) == ('Fallido', 2)
+        assert trabajo.terminado_en is not None
+
+
+def test_tipo_sin_manejador_falla(app):
+    trabajo_id = encolar(app, 'desconocido', max_intentos=1)
+    with app.app_context():
+        trabajos.procesar_pendientes(db.engine, app.config)
+    assert leer(app, trabajo_id).estado == 'Fallido'
+
+
+def test_reserva_vencida_vuelve_a_la_cola(app):
+    trabajo_id = encolar(app, 'anotar', estado='En curso', intentos=1, reservado_por='muerto',
+                         reservado_hasta=datetime.utcnow() - timedelta(seconds=1))
+    encolar(app, 'anotar', estado='En curso', intentos=1, reservado_por='vivo',
+            reservado_hasta=datetime.utcnow() + timedelta(minutes=1))
+    with app.app_context():
+        reclamados = trabajos.reclamar(db.engine, 'nuevo', limite=10)
+    assert [(trabajo['id'], trabajo['intentos']) for trabajo in reclamados] == [(trabajo_id, 2)]
+
+
+def test_cada_trabajo_se_reclama_una_sola_vez(app):
+    for _ in range(40):
+        encolar(app, 'anotar')
+    reclamados = []
+
+    def reclamar_todo(nombre):
+        with app.app_context():
+            while lote := trabajos.reclamar(db.engine, nombre, limite=3):
+                reclamados.extend(trabajo['id'] for trabajo in lote)
+
+    hilos = [threading.Thread(target=reclamar_todo, args=(f'hilo-{numero}',)) for numero in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sorted(reclamados) == list(range(1, 41))
+
+
+def test_reintento_manual(app, admin):
+    trabajo_id = encolar(app, 'romper', estado='Fallido', intentos=5, terminado_en=datetime.utcnow())
+    assert f'#{trabajo_id}' in admin.get('/trabajos').get_data(as_text=True)
+    admin.get(f'/trabajo/reintentar/{trabajo_id}')
+    trabajo = leer(app, trabajo_id)
+    assert (trabajo.estado, trabajo.intentos, trabajo.terminado_en) == ('Pendiente', 0, None)
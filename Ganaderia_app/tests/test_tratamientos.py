@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+from extensiones import db
+from modelos import CampanaTratamiento, Tratamiento
+
+JSON = {'Accept': 'application/json'}
+HOY = date.today()
+
+
+def dosis(app, animal_id):
+    """{fecha_aplicacion: proxima_dosis} de los tratamientos del animal."""
+    with app.app_context():
+        return dict(db.session.execute(db.select(Tratamiento.fecha_aplicacion, Tratamiento.proxima_dosis).filter_by(animal_id=animal_id)).all())
+
+
+def formulario(fecha, **extra):
+    return {'nombre_tratamiento': 'Ivermectina', 'descripcion': '', 'fecha_aplicacion': fecha.isoformat(), **extra}
+
+
+def id_tratamiento(app, animal_id, fecha):
+    with app.app_context():
+        return db.session.scalar(db.select(Tratamiento.id).filter_by(animal_id=animal_id, fecha_aplicacion=fecha))
+
+
+def test_pendientes_por_retiro_y_dosis(admin, datos):
+    respuesta = admin.get('/tratamiento/pendientes', headers=JSON).get_json()
+    assert [fila['codigo_unico'] for fila in respuesta['en_retiro']] == ['VAC-001', 'VAC-002', 'VAC-003', 'VAC-004']
+    assert {fila['proxima_dosis'] for fila in respuesta['dosis']} == {(HOY + timedelta(days=5)).isoformat()}
+    assert admin.get('/tratamiento/pendientes?dias=3', headers=JSON).get_json()['dosis'] == []
+    assert admin.get('/tratamiento/pendientes').status_code == 200
+
+
+def test_una_dosis_nueva_cierra_la_anterior(app, admin, datos):
+    vaca = datos['vacas'][0]
+    admin.post(f'/animal/{vaca}/add_tratamiento', data=formulario(HOY, dias_refuerzo='10'))
+    assert dosis(app, vaca) == {HOY - timedelta(days=5): None, HOY: HOY + timedelta(days=10)}
+    # Una dosis cargada con fecha atrasada no cierra la posterior y nace cerrada.
+    admin.post(f'/animal/{vaca}/add_tratamiento', data=formulario(HOY - timedelta(days=20), dias_refuerzo='10'))
+    assert dosis(app, vaca)[HOY] == HOY + timedelta(days=10)
+    assert dosis(app, vaca)[HOY - timedelta(days=20)] is None
+
+
+def test_editar_un_tratamiento_viejo_no_revive_su_dosis(app, admin, datos):
+    vaca = datos['vacas'][0]
+    anterior = HOY - timedelta(days=5)
+    admin.post(f'/animal/{vaca}/add_tratamiento', data=formulario(HOY, dias_refuerzo='10'))
+    proxima = (HOY + timedelta(days=5)).isoformat()
+    admin.post(f'/tratamiento/edit/{id_tratamiento(app, vaca, anterior)}', data=formulario(anterior, proxima_dosis=proxima))
+    assert dosis(app, vaca) == {anterior: None, HOY: HOY + timedelta(days=10)}
+
+
+def test_mover_la_fecha_despues_cierra_la_otra_dosis(app, admin, datos):
+    vaca = datos['vacas'][1]
+    atrasada = HOY - timedelta(days=20)
+    admin.post(f'/animal/{vaca}/add_tratamiento', data=formulario(atrasada, dias_refuerzo='10'))
+    proxima = (HOY + timedelta(days=10)).isoformat()
+    admin.post(f'/tratamiento/edit/{id_tratamiento(app, vaca, atrasada)}', data=formulario(HOY, proxima_dosis=proxima))
+    assert dosis(app, vaca) == {HOY - timedelta(days=5): None, HOY: HOY + timedelta(days=10)}
+
+
+def test_api_cierra_las_dosis_al_crear_y_al_editar(app, admin, datos):
+    vaca = datos['vacas'][2]
+    anterior = HOY - timedelta(days=5)
+    nuevo = admin.post('/api/v1/tratamientos', json={'nombre_tratamiento': 'Ivermectina', 'fecha_aplicacion': HOY.isoformat(), 'animal_id': vaca,
+                                                      'proxima_dosis': (HOY + timedelta(days=10)).isoformat()})
+    assert nuevo.status_code == 201
+    assert dosis(app, vaca)[anterior] is None
+    respuesta = admin.patch(f'/api/v1/tratamientos/{id_tratamiento(app, vaca, anterior)}', json={'proxima_dosis': HOY.isoformat()})
+    assert respuesta.status_code == 200 and respuesta.get_json()['proxima_dosis'] is None
+    # Con la fecha movida después de la otra, la que queda atrás es la nueva.
+    admin.patch(f'/api/v1/tratamientos/{id_tratamiento(app, vaca, anterior)}',
+                json={'fecha_aplicacion': (HOY + timedelta(days=1)).isoformat(), 'proxima_dosis': (HOY + timedelta(days=20)).isoformat()})
+    assert dosis(app, vaca) == {HOY: None, HOY + timedelta(days=1): HOY + timedelta(days=20)}
+
+
+def test_campana_aplica_a_la_seleccion_y_cierra_dosis(app, admin, datos):
+    admin.post('/tratamiento/campanas', data={**formulario(HOY, nombre_tratamiento='Ivermectina'), 'tipo': 'Vaca', 'dias_refuerzo': '30',
+                                             'codigos': 'VAC-001 VAC-002 XXX-1'})
+    with app.app_context():
+        campana = CampanaTratamiento.query.one()
+        assert (campana.animales, campana.criterio) == (2, 'tipo Vaca, 3 código(s)')
+    for vaca in datos['vacas'][:2]:
+        assert dosis(app, vaca) == {HOY - timedelta(days=5): None, HOY: HOY + timedelta(days=30)}
+    assert dosis(app, datos['vacas'][2]) == {HOY - timedelta(days=5): HOY + timedelta(days=5)}
+    # Sin animales que coincidan no se registra nada.
+    admin.post('/tratamiento/campanas', data={**formulario(HOY), 'tipo': 'Cabra'})
+    with app.app_context():
+        assert CampanaTratamiento.query.count() == 1
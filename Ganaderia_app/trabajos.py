@@ -0,0 +1,188 @@
+"""Cola persistente de trabajos en segundo plano.
+
+Los trabajos se guardan en la tabla `trabajo` de la misma base, dentro de la
+transacción que los origina (si el conteo no se confirma, tampoco se encola la
+notificación). Un `Trabajador` con varios hilos los reclama de forma atómica,
+reintenta con espera exponencial los que fallan y, agotados los intentos, los
+deja en estado 'Fallido' para revisarlos desde /trabajos.
+
+Cada manejador recibe el payload y la configuración; si el trabajador se creó
+con `contexto` (p. ej. `app.app_context`), corre además dentro de él.
+
+    flask trabajador --hilos 4
+"""
+import json
+import logging
+import random
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+ESTADOS = ('Pendiente', 'En curso', 'Completado', 'Fallido')
+# Espera antes del reintento n: BACKOFF_BASE * 2 ** (n - 1), con tope y un ±20 % al azar.
+BACKOFF_BASE = 30
+BACKOFF_MAXIMO = 3600
+# Un trabajo 'En curso' cuyo trabajador murió vuelve a la cola al vencer este plazo.
+DURACION_RESERVA = timedelta(minutes=5)
+
+MANEJADORES = {}
+
+
+def manejador(tipo):
+    def registrar(funcion):
+        MANEJADORES[tipo] = funcion
+        return funcion
+    return registrar
+
+
+def _fecha(valor):
+    # Mismo formato que usa SQLAlchemy para DateTime en SQLite.
+    return valor.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def espera_reintento(intentos):
+    segundos = min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** (intentos - 1))
+    return timedelta(seconds=segundos * random.uniform(0.8, 1.2))
+
+
+def reclamar(engine, trabajador, limite=1):
+    ahora = datetime.utcnow()
+    with engine.begin() as conexion:
+        return conexion.exec_driver_sql(
+            "UPDATE trabajo SET estado = 'En curso', intentos = intentos + 1, "
+            'reservado_por = ?, reservado_hasta = ? '
+            'WHERE id IN (SELECT id FROM trabajo '
+            "  WHERE (estado = 'Pendiente' AND proximo_intento <= ?) "
+            "     OR (estado = 'En curso' AND reservado_hasta < ?) "
+            '  ORDER BY proximo_intento, id LIMIT ?) '
+            'RETURNING id, tipo, payload, intentos, max_intentos',
+            (trabajador, _fecha(ahora + DURACION_RESERVA), _fecha(ahora), _fecha(ahora), limite),
+        ).mappings().all()
+
+
+def completar(engine, trabajo_id):
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(
+            "UPDATE trabajo SET estado = 'Completado', terminado_en = ?, reservado_por = NULL, "
+            'reservado_hasta = NULL, ultimo_error = NULL WHERE id = ?',
+            (_fecha(datetime.utcnow()), trabajo_id),
+        )
+
+
+def fallar(engine, trabajo, error):
+    ahora = datetime.utcnow()
+    agotado = trabajo['intentos'] >= trabajo['max_intentos']
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(
+            'UPDATE trabajo SET estado = ?, proximo_intento = ?, terminado_en = ?, ultimo_error = ?, '
+            'reservado_por = NULL, reservado_hasta = NULL WHERE id = ?',
+            (
+                'Fallido' if agotado else 'Pendiente',
+                _fecha(ahora if agotado else ahora + espera_reintento(trabajo['intentos'])),
+                _fecha(ahora) if agotado else None,
+                f'{type(error).__name__}: {error}'[:2000],
+                trabajo['id'],
+            ),
+        )
+    return agotado
+
+
+def ejecutar(engine, config, trabajo, contexto=None):
+    try:
+        funcion = MANEJADORES.get(trabajo['tipo'])
+        if funcion is None:
+            raise LookupError(f"No hay manejador para el tipo '{trabajo['tipo']}'.")
+        with contexto() if contexto else nullcontext():
+            funcion(json.loads(trabajo['payload']), config)
+    except Exception as error:
+        if fallar(engine, trabajo, error):
+            logger.error('Trabajo %s (%s) agotó sus intentos: %s', trabajo['id'], trabajo['tipo'], error)
+        else:
+            logger.warning('Trabajo %s (%s) falló, se reintentará: %s', trabajo['id'], trabajo['tipo'], error)
+        return False
+    completar(engine, trabajo['id'])
+    return True
+
+
+def procesar_pendientes(engine, config, trabajador='cli', limite=None, contexto=None):
+    """Procesa trabajos disponibles hasta vaciar la cola (o alcanzar `limite`)."""
+    procesados = 0
+    while limite is None or procesados < limite:
+        reclamados = reclamar(engine, trabajador)
+        if not reclamados:
+            break
+        ejecutar(engine, config, reclamados[0], contexto)
+        procesados += 1
+    return procesados
+
+
+class Trabajador:
+    def __init__(self, engine, config, hilos=2, espera=1.0, nombre='trabajador', contexto=None):
+        self.engine = engine
+        self.config = config
+        self.contexto = contexto
+        self.hilos = hilos
+        self.espera = espera
+        self.nombre = nombre
+        self._detener = threading.Event()
+        self._hilos = []
+
+    def iniciar(self):
+        for numero in range(self.hilos):
+            hilo = threading.Thread(target=self._bucle, args=(f'{self.nombre}-{numero}',), daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        return self
+
+    def detener(self, timeout=None):
+        self._detener.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+
+    def _bucle(self, nombre):
+        while not self._detener.is_set():
+            try:
+                reclamados = reclamar(self.engine, nombre)
+            except Exception:
+                logger.exception('No se pudo reclamar trabajos')
+                reclamados = []
+            if not reclamados:
+                self._detener.wait(self.espera)
+                continue
+            ejecutar(self.engine, self.config, reclamados[0], self.contexto)
+
+
+# --- Manejadores de notificaciones ---
+
+@manejador('email')
+def enviar_email(payload, config):
+    # smtplib y urllib se importan al enviar: los workers web no los necesitan.
+    import smtplib
+    from email.message import EmailMessage
+
+    mensaje = EmailMessage()
+    mensaje['From'] = config.get('SMTP_REMITENTE', 'alertas@ganaderia.local')
+    mensaje['To'] = payload['destino']
+    mensaje['Subject'] = payload['asunto']
+    mensaje.set_content(payload['mensaje'])
+    with smtplib.SMTP(config.get('SMTP_HOST', 'localhost'), config.get('SMTP_PUERTO', 1025), timeout=10) as servidor:
+        servidor.send_message(mensaje)
+
+
+@manejador('webhook')
+def enviar_webhook(payload, config):
+    import urllib.request
+
+    cuerpo = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    peticion = urllib.request.Request(payload['destino'], data=cuerpo, headers={'Content-Type': 'application/json'}, method='POST')
+    # urlopen lanza HTTPError ante respuestas 4xx/5xx, lo que provoca el reintento.
+    with urllib.request.urlopen(peticion, timeout=10):
+        pass
+
+
+@manejador('sms')
+def enviar_sms(payload, config):
+    # Simulación de la pasarela: sólo deja constancia en el log.
+    logger.info('SMS a %s: %s', payload['destino'], payload['mensaje'])
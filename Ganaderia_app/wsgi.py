@@ -0,0 +1,4 @@
+"""Punto de entrada WSGI: `gunicorn -c gunicorn.conf.py wsgi:app` o `flask --app wsgi ...`."""
+from app import crear_app
+
+app = crear_app()